@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+Замеры горячих путей: хэширование, обход каталога, пароли, стеганография.
+
+Запуск:
+    python bench.py                          # все замеры
+    python bench.py hash scan                # только замеры с такими префиксами
+    python bench.py --scale 4 --output new.json --compare old.json
+
+Данные генерируются во временном каталоге детерминированно (random.seed),
+поэтому два прогона на одной машине сравнимы. Время - лучший из --repeat
+прогонов, пиковая память - отдельным прогоном под tracemalloc (он замедляет
+код, поэтому время под ним не меряем).
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARKS = {}
+
+
+def bench(name, unit):
+    """Регистрирует замер. Функция получает (workdir, scale) и возвращает
+    (подготовленный вызов, объём работы в единицах unit)."""
+    def register(func):
+        BENCHMARKS[name] = (func, unit)
+        return func
+    return register
+
+
+def _write_random(path, size, rnd):
+    with open(path, "wb") as f:
+        chunk = 1 << 20
+        while size > 0:
+            n = min(chunk, size)
+            f.write(rnd.randbytes(n))
+            size -= n
+
+
+def _small_tree(workdir, files, rnd):
+    root = os.path.join(workdir, "small_tree")
+    if not os.path.exists(root):
+        for i in range(files):
+            d = os.path.join(root, f"d{i % 50:02d}", f"s{i % 7}")
+            os.makedirs(d, exist_ok=True)
+            _write_random(os.path.join(d, f"f{i}.bin"), rnd.randint(100, 4096), rnd)
+    return root
+
+
+def _passwords(count, rnd):
+    alphabet = ("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+                "абвгдежзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+                "0123456789!@#$%^&*()-_=+")
+    return ["".join(rnd.choice(alphabet) for _ in range(rnd.randint(4, 16)))
+            for _ in range(count)]
+
+
+def _container(workdir, lines, rnd):
+    path = os.path.join(workdir, f"container_{lines}.txt")
+    if not os.path.exists(path):
+        words = ["съешь", "же", "ещё", "этих", "мягких", "французских", "булок", "да", "выпей", "чаю"]
+        with open(path, "w", encoding="windows-1251") as f:
+            for _ in range(lines):
+                f.write(" ".join(rnd.choice(words) for _ in range(rnd.randint(3, 12))) + "\n")
+    return path
+
+
+# --- хэширование ----------------------------------------------------------
+
+@bench("hash.file", "MB")
+def bench_hash_file(workdir, scale):
+    from xor16 import xor16_file
+    size = 64 * scale << 20
+    path = os.path.join(workdir, "big.bin")
+    if not os.path.exists(path):
+        _write_random(path, size, random.Random(1))
+    return (lambda: xor16_file(path)), size / 1e6
+
+
+@bench("hash.bytes", "MB")
+def bench_hash_bytes(workdir, scale):
+    from xor16 import xor16_bytes
+    data = random.Random(2).randbytes(16 * scale << 20)
+    return (lambda: xor16_bytes(data)), len(data) / 1e6
+
+
+# --- обход каталога -------------------------------------------------------
+
+@bench("scan.small.cold", "files")
+def bench_scan_small_cold(workdir, scale):
+    from integrity import api
+    files = 5000 * scale
+    root = _small_tree(workdir, files, random.Random(3))
+    manifest = os.path.join(workdir, "small_cold.json")
+    return (lambda: api.scan(root, manifest)), files
+
+
+@bench("scan.small.warm", "files")
+def bench_scan_small_warm(workdir, scale):
+    from integrity import api
+    files = 5000 * scale
+    root = _small_tree(workdir, files, random.Random(3))
+    manifest = os.path.join(workdir, "small_warm.json")
+    api.scan(root, manifest)
+    time.sleep(2.1)  # чтобы записи вышли из "racy"-окна stat-кэша
+    api.verify(root, manifest)
+    return (lambda: api.verify(root, manifest)), files
+
+
+@bench("scan.small.metrics", "files")
+def bench_scan_small_metrics(workdir, scale):
+    # то же, что scan.small.cold, но с включёнными метриками - цена инструментирования
+    import metrics
+    from integrity import api
+    files = 5000 * scale
+    root = _small_tree(workdir, files, random.Random(3))
+    manifest = os.path.join(workdir, "small_metrics.json")
+
+    def run():
+        metrics.enable()
+        try:
+            api.scan(root, manifest)
+        finally:
+            metrics.disable()
+    return run, files
+
+
+@bench("scan.moves", "files")
+def bench_scan_moves(workdir, scale):
+    # половину каталогов переименовали после сканирования: сверка с поиском перемещений
+    import shutil
+    from integrity import api
+    files = 5000 * scale
+    root = os.path.join(workdir, "moved_tree")
+    manifest = os.path.join(workdir, "moved.json")
+    if not os.path.exists(root):
+        shutil.copytree(_small_tree(workdir, files, random.Random(3)), root)
+        api.scan(root, manifest)
+        for name in sorted(os.listdir(root))[::2]:
+            os.rename(os.path.join(root, name), os.path.join(root, "moved_" + name))
+    return (lambda: api.verify(root, manifest, moves=True)), files
+
+
+@bench("scan.excluded", "files")
+def bench_scan_excluded(workdir, scale):
+    # дерево, где почти всё - .git и node_modules; файлов/с - по всем файлам на диске
+    from integrity import api
+    from integrity.rules import DEFAULT_EXCLUDES, Rules
+    kept = 500 * scale
+    skipped = 10 * kept
+    root = os.path.join(workdir, "excluded_tree")
+    if not os.path.exists(root):
+        rnd = random.Random(7)
+        for i in range(kept + skipped):
+            top = "src" if i < kept else (".git/objects", "node_modules/pkg")[i % 2]
+            d = os.path.join(root, top, f"d{i % 30:02d}")
+            os.makedirs(d, exist_ok=True)
+            _write_random(os.path.join(d, f"f{i}.bin"), rnd.randint(100, 4096), rnd)
+    manifest = os.path.join(workdir, "excluded.json")
+    rules = Rules(DEFAULT_EXCLUDES)
+    return (lambda: api.scan(root, manifest, rules=rules)), kept + skipped
+
+
+# задержка каждой операции (readdir, stat, open) - как у NFS/FUSE
+SCAN_LATENCY = 0.002
+
+
+def _manifest_body(path):
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()  # заголовок с временем сканирования
+        return f.read()
+
+
+def _bench_scan_latency(concurrency):
+    def factory(workdir, scale):
+        from integrity import aio, api
+        files = 300 * scale
+        root = os.path.join(workdir, "latency_tree")
+        if not os.path.exists(root):
+            rnd = random.Random(6)
+            for i in range(files):
+                d = os.path.join(root, f"d{i % 20:02d}", f"s{i % 3}")
+                os.makedirs(d, exist_ok=True)
+                _write_random(os.path.join(d, f"f{i}.bin"), rnd.randint(100, 4096), rnd)
+        manifest = os.path.join(workdir, f"latency_{concurrency}.json")
+        reference = os.path.join(workdir, "latency_sync.json")
+
+        def run():
+            aio.OP_DELAY = SCAN_LATENCY
+            try:
+                api.scan(root, manifest, aio=concurrency)
+            finally:
+                aio.OP_DELAY = 0
+
+        # манифест тот же, что у обычного обхода
+        run()
+        api.scan(root, reference)
+        if _manifest_body(manifest) != _manifest_body(reference):
+            raise AssertionError(f"--aio {concurrency}: манифест отличается от обычного обхода")
+        return run, files
+    return factory
+
+
+for _concurrency in (1, 4, 16, 64):
+    bench(f"scan.latency.{_concurrency}", "files")(_bench_scan_latency(_concurrency))
+
+
+@bench("scan.huge", "MB")
+def bench_scan_huge(workdir, scale):
+    from integrity import api
+    root = os.path.join(workdir, "huge_tree")
+    size = 32 * scale << 20
+    if not os.path.exists(root):
+        os.makedirs(root)
+        rnd = random.Random(4)
+        for i in range(4):
+            _write_random(os.path.join(root, f"huge{i}.bin"), size, rnd)
+    manifest = os.path.join(workdir, "huge.json")
+    return (lambda: api.scan(root, manifest)), 4 * size / 1e6
+
+
+def _synthetic_manifest(workdir, scale, fmt):
+    """Манифест на 200k * scale записей без дерева на диске (fmt: json или сжатие снимка)."""
+    from integrity.manifest import write_manifest
+    from integrity.snapshot import SnapshotFormat
+    count = 200000 * scale
+    path = os.path.join(workdir, f"synthetic_{fmt}.json")
+    if not os.path.exists(path):
+        rnd = random.Random(8)
+        records = ((os.path.join(f"d{i // 1000:04d}", f"file{i:07d}.bin"),
+                    {"hash": rnd.getrandbits(16), "size": rnd.randint(1, 1 << 20),
+                     "mtime_ns": 1700000000000000000 + i, "ino": 1000 + i, "dev": 2049})
+                   for i in range(count))
+        snapshot = None
+        if fmt != "json":
+            compression, _, signed = fmt.partition(".")
+            snapshot = SnapshotFormat(compression, SNAPSHOT_KEY if signed else None)
+        write_manifest(path, records, 0, snapshot=snapshot)
+    return path, count
+
+
+SNAPSHOT_KEY = b"bench"
+
+
+def _bench_manifest_load(fmt):
+    def factory(workdir, scale):
+        from integrity.manifest import open_manifest
+        path, count = _synthetic_manifest(workdir, scale, fmt)
+        key = SNAPSHOT_KEY if fmt.endswith(".signed") else None
+
+        def run():
+            _, records = open_manifest(path, key)
+            for _ in records:
+                pass
+        return run, count
+    return factory
+
+
+# JSON Lines против снимка: полный проход по записям, как при проверке
+for _fmt in ("json", "none", "zlib", "lzma", "none.signed"):
+    bench(f"manifest.load.{_fmt}", "records")(_bench_manifest_load(_fmt))
+
+
+@bench("manifest.lookup", "lookups")
+def bench_manifest_lookup(workdir, scale):
+    # открыть снимок и найти один путь - без разбора остальных записей
+    from integrity.snapshot import Snapshot
+    path, count = _synthetic_manifest(workdir, scale, "none")
+    rnd = random.Random(9)
+    wanted = [os.path.join(f"d{i // 1000:04d}", f"file{i:07d}.bin")
+              for i in (rnd.randrange(count) for _ in range(1000))]
+
+    def run():
+        for rel_path in wanted:
+            with Snapshot(path) as snap:
+                if snap.find(rel_path) is None:
+                    raise AssertionError(rel_path)
+    return run, len(wanted)
+
+
+# --- пароли ---------------------------------------------------------------
+
+@bench("password.complexity", "passwords")
+def bench_password_complexity(workdir, scale):
+    from infolaba22 import check_password_complexity
+    passwords = _passwords(50000 * scale, random.Random(5))
+
+    def run():
+        for p in passwords:
+            check_password_complexity(p)
+    return run, len(passwords)
+
+
+@bench("password.hash", "passwords")
+def bench_password_hash(workdir, scale):
+    from infolaba22 import hash_from_password_str
+    passwords = _passwords(50000 * scale, random.Random(6))
+
+    def run():
+        for p in passwords:
+            hash_from_password_str(p)
+    return run, len(passwords)
+
+
+@bench("password.kdf", "logins")
+def bench_password_kdf(workdir, scale):
+    # проверка по записи с текущими параметрами (PASSWORD_KDF): logins/s на одно ядро
+    from passwords.hashing import hash_password, parse_record, verify_password
+    passwords = _passwords(4 * scale, random.Random(7))
+    records = [parse_record(hash_password(p)) for p in passwords]
+
+    def run():
+        for p, rec in zip(passwords, records):
+            verify_password(rec, p)
+    return run, len(passwords)
+
+
+# дешёвый kdf, чтобы в замере файла пароля было видно блокировки, а не хэш
+STATE_KDF = "pbkdf2-sha256$i=1000"
+STATE_PASSWORD = "Пароль1aA!"
+
+
+def _state_worker(path, password, logins):
+    os.environ["PASSWORD_KDF"] = STATE_KDF
+    from collections import Counter
+    from passwords.state import PasswordFile
+    store = PasswordFile(path)
+    return Counter(store.login(password)[0] for _ in range(logins))
+
+
+def _bench_password_state(procs):
+    def factory(workdir, scale):
+        from collections import Counter
+        from concurrent.futures import ProcessPoolExecutor
+        from passwords import kdf
+        from passwords.hashing import DENIED, MAX_ATTEMPTS, OK
+        path = os.path.join(workdir, f"state_{procs}.txt")
+        record = kdf.make_record(STATE_PASSWORD, kdf.parse_params(STATE_KDF))
+        logins = 200 * scale
+
+        def login_all(password, count):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(record)
+            with ProcessPoolExecutor(procs) as pool:
+                return sum(pool.map(_state_worker, [path] * procs, [password] * procs,
+                                    [count] * procs), Counter())
+
+        # подбор из всех процессов сразу: неверных проверок не больше лимита
+        denied = login_all("неверный", 20)[DENIED]
+        if denied > MAX_ATTEMPTS:
+            raise AssertionError(f"{procs} процессов сделали {denied} неверных попыток "
+                                 f"при лимите {MAX_ATTEMPTS}")
+
+        def run():
+            results = login_all(STATE_PASSWORD, logins)
+            if results[OK] != procs * logins:
+                raise AssertionError(f"не все входы удались: {dict(results)}")
+        return run, procs * logins
+    return factory
+
+
+for _procs in (1, 4, 16):
+    bench(f"password.state.{_procs}", "logins")(_bench_password_state(_procs))
+
+
+# --- стеганография --------------------------------------------------------
+
+@bench("stego.encode", "lines")
+def bench_stego_encode(workdir, scale):
+    from laba3_hide import encode_message
+    lines = 200000 * scale
+    rnd = random.Random(7)
+    container = _container(workdir, lines, rnd)
+    message = os.path.join(workdir, "message.bin")
+    with open(message, "wb") as f:
+        f.write(bytes(rnd.randrange(1, 256) for _ in range(lines // 8 - 1)))
+    output = os.path.join(workdir, "stego.txt")
+    return (lambda: encode_message(container, message, output)), lines
+
+
+@bench("stego.decode", "lines")
+def bench_stego_decode(workdir, scale):
+    from laba3_extract import decode_message
+    from laba3_hide import encode_message
+    lines = 200000 * scale
+    rnd = random.Random(7)
+    container = _container(workdir, lines, rnd)
+    message = os.path.join(workdir, "message_dec.bin")
+    with open(message, "wb") as f:
+        f.write(bytes(rnd.randrange(1, 256) for _ in range(lines // 8 - 1)))
+    stego = os.path.join(workdir, "stego_dec.txt")
+    encode_message(container, message, stego)
+    output = os.path.join(workdir, "extracted.bin")
+    return (lambda: decode_message(stego, output)), lines
+
+
+def _stego_payload(workdir, scale):
+    # контейнер в 2 млн строк и сообщение на всю его ёмкость (250 КБ)
+    from laba3_hide import encode_message
+    lines = 2000000 * scale
+    rnd = random.Random(8)
+    container = _container(workdir, lines, rnd)
+    message = os.path.join(workdir, "payload.bin")
+    stego = os.path.join(workdir, "payload_stego.txt")
+    if not os.path.exists(stego):
+        with open(message, "wb") as f:
+            f.write(rnd.randbytes(lines // 8).replace(b"\0", b"\1"))
+        encode_message(container, message, stego)
+    return container, message, stego, lines // 8
+
+
+@bench("stego.embed", "MB")
+def bench_stego_embed(workdir, scale):
+    from laba3_hide import encode_message
+    container, message, _, size = _stego_payload(workdir, scale)
+    output = os.path.join(workdir, "payload_embed.txt")
+    return (lambda: encode_message(container, message, output)), size / 1e6
+
+
+@bench("stego.extract", "MB")
+def bench_stego_extract(workdir, scale):
+    # пропускная способность извлечения в МБ полезной нагрузки
+    from laba3_extract import decode_message
+    _, _, stego, size = _stego_payload(workdir, scale)
+    output = os.path.join(workdir, "payload_extracted.bin")
+    return (lambda: decode_message(stego, output)), size / 1e6
+
+
+def _bench_stego_codec(codec):
+    # одно и то же сообщение разными кодеками: чем больше бит в строке, тем меньше строк читать
+    def factory(workdir, scale):
+        from laba3_extract import decode_message
+        from laba3_hide import encode_message
+        size = 200000 * scale // 8 - 1
+        rnd = random.Random(7)
+        container = _container(workdir, 200000 * scale, rnd)
+        message = os.path.join(workdir, f"message_{codec}.bin")
+        with open(message, "wb") as f:
+            f.write(bytes(rnd.randrange(1, 256) for _ in range(size)))
+        stego = os.path.join(workdir, f"stego_{codec}.txt")
+        output = os.path.join(workdir, f"extracted_{codec}.bin")
+
+        def run():
+            encode_message(container, message, stego, codec)
+            decode_message(stego, output, codec)
+        return run, size / 1e3
+    return factory
+
+
+for _codec in ("space", "trail8", "words"):
+    bench(f"stego.codec.{_codec}", "KB")(_bench_stego_codec(_codec))
+
+
+# --- запуск ---------------------------------------------------------------
+
+def run_one(name, workdir, scale, repeat):
+    func, unit = BENCHMARKS[name]
+    call, work = func(workdir, scale)
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        call()
+        times.append(time.perf_counter() - t0)
+    tracemalloc.start()
+    call()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    best = min(times)
+    return {
+        "seconds": best,
+        "work": work,
+        "unit": unit,
+        "throughput": work / best if best else None,
+        "peak_bytes": peak,
+    }
+
+
+def _format(name, r, old=None):
+    line = (f"{name:<24} {r['seconds'] * 1000:10.1f} ms  "
+            f"{r['throughput']:14,.1f} {r['unit']}/s  peak {r['peak_bytes'] / 1e6:8.2f} MB")
+    if old and old.get("throughput"):
+        line += f"  x{r['throughput'] / old['throughput']:.2f}"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры горячих путей")
+    parser.add_argument("names", nargs="*", help="префиксы имён замеров (по умолчанию все)")
+    parser.add_argument("--scale", type=int, default=1, help="множитель размера данных")
+    parser.add_argument("--repeat", type=int, default=3, help="сколько раз повторять замер")
+    parser.add_argument("--workdir", help="каталог для данных (по умолчанию временный)")
+    parser.add_argument("--output", help="сохранить результаты в JSON")
+    parser.add_argument("--compare", help="сравнить с результатами из JSON")
+    parser.add_argument("--list", action="store_true", help="показать список замеров")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, unit) in BENCHMARKS.items():
+            print(f"{name:<24} {unit}/s")
+        return 0
+
+    names = [n for n in BENCHMARKS if not args.names or any(n.startswith(p) for p in args.names)]
+    old = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)["results"]
+
+    tmp = None
+    workdir = args.workdir
+    if workdir is None:
+        tmp = tempfile.TemporaryDirectory(prefix="bench_")
+        workdir = tmp.name
+    os.makedirs(workdir, exist_ok=True)
+
+    results = {}
+    try:
+        for name in names:
+            results[name] = run_one(name, workdir, args.scale, args.repeat)
+            print(_format(name, results[name], old.get(name)), flush=True)
+    finally:
+        if tmp is not None:
+            tmp.cleanup()
+
+    if args.output:
+        data = {
+            "time": time.time(),
+            "python": sys.version,
+            "platform": platform.platform(),
+            "scale": args.scale,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
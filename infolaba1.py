@@ -1,5 +1,16 @@
+import argparse
 import os
-import json
+import sys
+
+from integrity import api
+from integrity.chunks import ChunkPolicy, parse_chunk_size, parse_size
+from integrity.cli import EXIT_ERROR, format_event
+from integrity.digests import DEFAULT, parse_algorithms
+from integrity.manifest import MANIFEST_NAME
+from integrity.rules import add_arguments as add_rule_arguments
+from integrity.rules import from_args as rules_from_args
+from integrity.snapshot import COMPRESSION, SnapshotFormat, load_key
+from xor16 import xor16_file
 
 def ask_path():
     """Просим пользователя ввести путь к каталогу"""
@@ -14,77 +25,100 @@ def ask_path():
 
 def my_hash(filepath):
     """Считаем хэш по алгоритму из задания (XOR 16-битных кусков)"""
-    h = 0
-    with open(filepath, "rb") as f:
-        while True:
-            b1 = f.read(1)
-            if not b1:
-                break
-            b2 = f.read(1)
-            if not b2:
-                b2 = b"\x00"  # дополняем нулями
-            num = (b1[0] << 8) | b2[0]  # соединяем в 16 бит
-            h ^= num
-    return h
-
-def scan_dir(root, ignore_file):
-    """Обходим каталог и собираем хэши всех файлов"""
-    hashes = {}
-    for current_dir, _, files in os.walk(root):
-        for name in files:
-            filepath = os.path.join(current_dir, name)
-            if os.path.abspath(filepath) == ignore_file:
-                continue  # пропускаем файл с хэшами
-            rel_path = os.path.relpath(filepath, root)
-            try:
-                hashes[rel_path] = my_hash(filepath)
-            except Exception as e:
-                print(f"Ошибка при чтении {rel_path}: {e}")
-    return hashes
+    return xor16_file(filepath)
+
+def scan_dir(root, ignore_file, cache=None, cache_scanned_ns=0, paranoid=False, stats=None, jobs=1):
+    """Обходим каталог и выдаём поток (путь, запись с хэшем) в порядке путей"""
+    return api.iter_scan(root, ignore_file, cache, cache_scanned_ns, paranoid, stats, jobs)
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка целостности каталога по hash.json")
+    parser.add_argument("--paranoid", action="store_true",
+                        help="не доверять stat-кэшу и перехэшировать все файлы")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="число процессов для подсчёта хэшей (по умолчанию 1)")
+    parser.add_argument("--aio", type=int, default=0, metavar="N",
+                        help="асинхронный обход для сетевых ФС: до N операций ввода-вывода одновременно")
+    parser.add_argument("--watch", action="store_true",
+                        help="не выходить, а следить за каталогом (inotify, только Linux)")
+    parser.add_argument("--chunk-threshold", type=parse_size, metavar="SIZE",
+                        help="для файлов от SIZE байт хранить хэши кусков и показывать изменённые байты")
+    parser.add_argument("--chunk-size", type=parse_chunk_size, default="4M", metavar="SIZE",
+                        help="размер куска (по умолчанию 4M)")
+    parser.add_argument("--append-only", action="store_true",
+                        help="большие файлы только дописываются: при росте читать только хвост")
+    parser.add_argument("--algorithm", type=parse_algorithms, default=DEFAULT, metavar="NAMES",
+                        help="алгоритмы для нового hash.json через запятую (xor16, crc32, adler32, "
+                             "sha256, blake2b); при проверке берутся из hash.json")
+    # --exclude, --include, --one-file-system и т. п.: действуют при создании hash.json
+    add_rule_arguments(parser)
+    parser.add_argument("--no-moves", action="store_true",
+                        help="не искать перемещённые и скопированные файлы (выводить их как удалённые и добавленные)")
+    parser.add_argument("--snapshot", nargs="?", const="none", choices=COMPRESSION, metavar="COMPRESSION",
+                        help="создать hash.json двоичным снимком (открывается через mmap без разбора JSON); "
+                             "сжатие: none, zlib, lzma")
+    parser.add_argument("--key-file", metavar="KEY",
+                        help="ключ HMAC: подписать новый снимок и проверять подпись (иначе из INTEGRITY_KEY)")
+    return parser.parse_args(argv)
 
 def main():
+    # без вопросов пользователю то же самое делает python -m integrity check DIR...
+    args = parse_args()
+    try:
+        key = load_key(args.key_file)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}")
+        return EXIT_ERROR
     root = ask_path()
     if not root:
         return
 
-    hash_file = os.path.join(root, "hash.json")
+    hash_file = os.path.join(root, MANIFEST_NAME)
+
+    if args.watch:
+        from integrity.watch import watch
+        print("Слежу за каталогом, изменения выводятся по мере появления (Ctrl+C - выход)...")
+        watch(root, hash_file, key)
+        return
+
+    stats = {}
+    chunking = None
+    if args.chunk_threshold is not None:
+        chunking = ChunkPolicy(args.chunk_threshold, args.chunk_size, args.append_only)
 
     if not os.path.exists(hash_file):
-        # первый запуск
+        # первый запуск: хэши пишутся в файл прямо во время обхода
         print("Файл hash.json не найден, создаём...")
-        hashes = scan_dir(root, hash_file)
-        with open(hash_file, "w", encoding="utf-8") as f:
-            json.dump(hashes, f, ensure_ascii=False, indent=4)
-        print(f"Хэши сохранены ({len(hashes)} файлов).")
+        snapshot = None
+        if args.snapshot is not None or key is not None:
+            snapshot = SnapshotFormat(args.snapshot or "none", key)
+        count = api.scan(root, jobs=args.jobs, stats=stats, chunking=chunking,
+                         algorithms=args.algorithm, aio=args.aio, rules=rules_from_args(args),
+                         snapshot=snapshot)
+        print(f"Хэши сохранены ({count} файлов).")
     else:
-        # повторный запуск
+        # повторный запуск: перехэшируем только файлы с изменившимися size/mtime/inode
         print("Файл hash.json найден, проверяем...")
-        with open(hash_file, "r", encoding="utf-8") as f:
-            old_hashes = json.load(f)
-
-        new_hashes = scan_dir(root, hash_file)
 
-        changed = False
+        # перемещения и копии - по индексу (размер, хэш), а не парой "удалён" + "добавлен"
+        def report(kind, path, ranges=None, source=None):
+            print(format_event(kind, path, ranges, source))
 
-        # проверка на удалённые или изменённые
-        for path, old_h in old_hashes.items():
-            if path not in new_hashes:
-                print("Файл удалён:", path)
-                changed = True
-            elif new_hashes[path] != old_h:
-                print("Файл изменён:", path)
-                changed = True
+        # формат hash.json (JSON Lines или снимок) определяется по самому файлу
+        try:
+            changes = api.verify(root, jobs=args.jobs, paranoid=args.paranoid,
+                                 on_change=report, stats=stats, chunking=chunking,
+                                 moves=not args.no_moves, aio=args.aio, key=key)
+        except ValueError as e:
+            print(f"Ошибка: {e}")
+            return EXIT_ERROR
 
-        # проверка на новые файлы
-        for path in new_hashes:
-            if path not in old_hashes:
-                print("Файл добавлен:", path)
-                changed = True
-
-        if not changed:
+        if not changes:
             print("Всё в порядке, изменений нет.")
 
         print("Проверка завершена.")
 
+    print(f"Прочитано файлов: {stats.get('hashed', 0)}, взято из кэша: {stats.get('cached', 0)}")
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
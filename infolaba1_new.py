@@ -1,5 +1,11 @@
+import argparse
 import os
-import json
+
+from integrity import api
+from integrity.chunks import format_ranges
+from integrity.cli import MESSAGES
+from integrity.manifest import MANIFEST_NAME
+from xor16 import xor16_file
 
 def ask_path():
     #запрос и поиск каталога
@@ -13,78 +19,56 @@ def ask_path():
     return os.path.abspath(path)
 
 def create_hashfile(filepath):
-    # считаем хэш
-    h = 0
-    with open(filepath, "rb") as f:
-        while True:
-            b1 = f.read(1)
-            if not b1:
-                break
-            b2 = f.read(1)
-            if not b2:
-                b2 = b"\x00"  # дополняем нулями
-            num = (b1[0] << 8) | b2[0]  # соединяем в 16 бит
-            h ^= num
-    return h
+    # считаем хэш (читаем файл крупными блоками)
+    return xor16_file(filepath)
+
+def scan_dir(root, ignore_file, cache=None, cache_scanned_ns=0, paranoid=False, stats=None, jobs=1):
+    # проходим по каталогу и выдаём хэши потоком (неизменённые по stat файлы не читаем)
+    return api.iter_scan(root, ignore_file, cache, cache_scanned_ns, paranoid, stats, jobs)
 
-def scan_dir(root, ignore_file):
-    # проходим по каталогу и собираем хэши
-    hashes = {}
-    for current_dir, _, files in os.walk(root):
-        for name in files:
-            filepath = os.path.join(current_dir, name)
-            if os.path.abspath(filepath) == ignore_file:
-                continue  # пропускаем файл с хэшами
-            rel_path = os.path.relpath(filepath, root)
-            try:
-                hashes[rel_path] = create_hashfile(filepath)
-            except Exception as e:
-                print(f"Ошибка при чтении {rel_path}: {e}")
-    return hashes
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка целостности каталога по hash.json")
+    parser.add_argument("--paranoid", action="store_true",
+                        help="не доверять stat-кэшу и перехэшировать все файлы")
+    parser.add_argument("--jobs", type=int, default=1, metavar="N",
+                        help="число процессов для подсчёта хэшей (по умолчанию 1)")
+    return parser.parse_args(argv)
 
 def main():
+    # без вопросов пользователю то же самое делает python -m integrity check DIR...
+    args = parse_args()
     root = ask_path()
     if not root:
         return
 
-    hash_file = os.path.join(root, "hash.json")
+    hash_file = os.path.join(root, MANIFEST_NAME)
+
+    stats = {}
 
     if not os.path.exists(hash_file):
-        # первый запуск
+        # первый запуск: хэши пишутся в файл прямо во время обхода
         print("Файл hash.json не найден. создание...")
-        hashes = scan_dir(root, hash_file)
-        with open(hash_file, "w", encoding="utf-8") as f:
-            json.dump(hashes, f, ensure_ascii=False, indent=4)
-        print(f"Хэши сохранены для {len(hashes)} файлов.")
+        count = api.scan(root, jobs=args.jobs, stats=stats)
+        print(f"Хэши сохранены для {count} файлов.")
     else:
-        # повторный запуск
+        # повторный запуск: перехэшируем только файлы с изменившимися size/mtime/inode
         print("Файл hash.json найден, проверяем...")
-        with open(hash_file, "r", encoding="utf-8") as f:
-            old_hashes = json.load(f)
 
-        new_hashes = scan_dir(root, hash_file)
+        def report(kind, path, ranges=None):
+            if ranges is None:
+                print(MESSAGES[kind], path)
+            else:
+                print(MESSAGES[kind], path, f"(байты {format_ranges(ranges)})")
 
-        changed = False
+        changes = api.verify(root, jobs=args.jobs, paranoid=args.paranoid,
+                             on_change=report, stats=stats)
 
-        # проверка на удалённые или изменённые
-        for path, old_h in old_hashes.items():
-            if path not in new_hashes:
-                print("Файл удалён:", path)
-                changed = True
-            elif new_hashes[path] != old_h:
-                print("Файл изменён:", path)
-                changed = True
-
-        # проверка на новые файлы
-        for path in new_hashes:
-            if path not in old_hashes:
-                print("Файл добавлен:", path)
-                changed = True
-
-        if not changed:
+        if not changes:
             print("Каталог соответствует файлу с хэшами, изменений нет.")
 
         print("Завершено ^.^")
 
+    print(f"Прочитано файлов: {stats.get('hashed', 0)}, взято из кэша: {stats.get('cached', 0)}")
+
 if __name__ == "__main__":
     main()
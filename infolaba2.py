@@ -1,50 +1,19 @@
 import sys
 from pathlib import Path
 
+from passwords.hashing import hash_password, needs_upgrade, parse_record, verify_password
+from passwords.policy import DEFAULT_POLICY
+from xor16 import xor16_bytes
+
 magic = "hello"
 block = "STOP"
 
 def hash_from_password(password: str) -> int:
-    data = password.encode("utf-8")
-    h = 0
-    i = 0
-    n = len(data)
-    while i < n:
-        b1 = data[i]
-        b2 = data[i + 1] if (i + 1) < n else 0
-        num = (b1 << 8) | b2
-        h ^= num
-        i += 2
-    return h
+    return xor16_bytes(password.encode("utf-8"))
 
 def check_password_complexity(password: str) -> bool:
-    if len(password) < 6:
-        return False
-
-    has_latin_lower = False
-    has_latin_upper = False
-    has_cyrillic_lower = False
-    has_cyrillic_upper = False
-    has_digit_or_sign = False
-
-    for ch in password:
-        #латиница
-        if 'a' <= ch <= 'z':
-            has_latin_lower = True
-        elif 'A' <= ch <= 'Z':
-            has_latin_upper = True
-        #кириллица
-        elif '\u0430' <= ch <= '\u044f':  #а–я
-            has_cyrillic_lower = True
-        elif '\u0410' <= ch <= '\u042f':  #А–Я
-            has_cyrillic_upper = True
-        #цифры или прочие знаки
-        elif ch.isdigit() or (not ch.isalnum()):
-            has_digit_or_sign = True
-
-    count = sum([has_latin_lower, has_latin_upper,
-                 has_cyrillic_lower, has_cyrillic_upper, has_digit_or_sign])
-    return count == 5
+    #минимум 6 символов и все 5 категорий (см. passwords/policy.py)
+    return DEFAULT_POLICY.is_ok(password)
 
 def ask(prompt: str) -> str:
     try:
@@ -91,8 +60,7 @@ def main():
                 continue
 
             if check_password_complexity(new_pass):
-                new_hash = hash_from_password(new_pass)
-                pwd_path.write_text(str(new_hash), encoding="utf-8")
+                pwd_path.write_text(hash_password(new_pass), encoding="utf-8")
                 print("Пароль установлен и хэш сохранён в файл.")
                 break
             else:
@@ -105,10 +73,9 @@ def main():
         print("Доступ заблокирован.")
         return
 
-    #ожидается что в файле хранится хэш (число)
-    try:
-        stored_hash = int(content)
-    except ValueError:
+    #ожидается что в файле хранится хэш (запись scrypt или старое число xor16)
+    stored = parse_record(content)
+    if stored is None:
         print("Содержимое файла  не распознано")
         print("Завершение работы...")
         return
@@ -117,9 +84,11 @@ def main():
     attempts = 3
     while attempts > 0:
         attempt_pass = ask("Введите пароль: ")
-        computed = hash_from_password(attempt_pass)
-        if computed == stored_hash:
+        if verify_password(stored, attempt_pass):
             print("Доступ разрешён")
+            if needs_upgrade(stored):
+                #старый хэш заменяем новым, пока пароль известен
+                pwd_path.write_text(hash_password(attempt_pass), encoding="utf-8")
             return
         else:
             attempts -= 1
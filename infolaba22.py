@@ -5,56 +5,46 @@
     python password_app.py              # спросит путь к файлу пароля
 или
     python password_app.py /path/to/hash.txt
+или (много пользователей сразу, запросы "пользователь<TAB>пароль" построчно из stdin)
+    python password_app.py serve --db users.tsv [--socket /path/to/sock]
 
 Файл пароля:
  - Если его нет — программа завершает работу (по условию).
  - Если в файле содержится строка MAGIC  -> первый запуск: просит новый пароль, проверяет сложность, сохраняет хэш.
  - Если в файле содержится BLOCKED -> программа заблокирована.
- - Иначе в файле хранится число — хэш пароля. Программа требует ввод пароля, до 3 попыток.
-   Если попытки исчерпаны — записывает BLOCKED.
-Хэш: читаем поток байт, разбиваем на 16-битные слова (big-endian: первый байт = старший),
+ - Иначе в файле хранится хэш пароля. Программа требует ввод пароля, до 3 неудачных попыток подряд.
+   Счётчик попыток хранится второй строкой в том же файле и общий для всех запущенных копий
+   программы; если попытки исчерпаны — записывает BLOCKED.
+Хэш пароля: scrypt с солью, запись вида $scrypt$ln=14,r=8,p=1$соль$хэш (см. passwords/kdf.py).
+Старая запись — число (xor16, см. ниже) — ещё принимается и при первом успешном входе
+заменяется новой.
+Хэш xor16 (файлы и старые пароли): читаем поток байт, разбиваем на 16-битные слова (big-endian: первый байт = старший),
       если не хватает байта — дополняем нулём, затем XOR всех 16-битных слов.
 """
 
 import sys
 from pathlib import Path
 
+from passwords.hashing import BLOCKED, DENIED, OK, needs_upgrade, parse_record
+from passwords.policy import Policy
+from passwords.state import PasswordFile
+from xor16 import xor16_bytes, xor16_file
+
 MAGIC = "MAGIC"
-BLOCKED = "BLOCKED"
 MAX_ATTEMPTS = 3
 MIN_LENGTH = 6
+COMPLEXITY = Policy(MIN_LENGTH)
 
 
 def xor16_hash_bytes(data: bytes) -> int:
     """Вычисляет хэш по алгоритму: читаем как поток байт, парой формируем 16-битное слово (big-endian),
     если последний байт один — дополняем нулём, XOR всех слов -> возвращаем целое (0..65535)."""
-    h = 0
-    n = len(data)
-    i = 0
-    while i < n:
-        high = data[i]
-        low = data[i + 1] if (i + 1) < n else 0
-        word = (high << 8) | low
-        h ^= word
-        i += 2
-    # Обрежем в 16 бит для явности (не обязательно, но показывает семантику)
-    return h & 0xFFFF
+    return xor16_bytes(data)
 
 
 def hash_from_file(path: Path) -> int:
     """Считает тот же XOR-хэш из содержимого бинарного файла."""
-    h = 0
-    with path.open("rb") as f:
-        while True:
-            b1 = f.read(1)
-            if not b1:
-                break
-            b2 = f.read(1)
-            high = b1[0]
-            low = b2[0] if b2 else 0
-            word = (high << 8) | low
-            h ^= word
-    return h & 0xFFFF
+    return xor16_file(path)
 
 
 def hash_from_password_str(password: str) -> int:
@@ -67,48 +57,10 @@ def check_password_complexity(password: str) -> bool:
     """Проверяет сложность:
     - не менее MIN_LENGTH символов
     - оценивает категории: латиница нижний/верх, кириллица нижний/верх, цифра/спецсимвол
-    Требуем минимум 5 категорий (как в примере на Java) — строгая проверка.
+    Требуем все 5 категорий (как в примере на Java) — строгая проверка.
+    Сама проверка — passwords/policy.py (общая с infolaba2.py).
     """
-    if len(password) < MIN_LENGTH:
-        return False
-
-    has_latin_lower = False
-    has_latin_upper = False
-    has_cyrillic_lower = False
-    has_cyrillic_upper = False
-    has_digit_or_sign = False
-
-    for ch in password:
-        code = ord(ch)
-        # латиница
-        if 'a' <= ch <= 'z':
-            has_latin_lower = True
-        elif 'A' <= ch <= 'Z':
-            has_latin_upper = True
-        # кириллица (основной диапазон)
-        elif '\u0430' <= ch <= '\u044f':  # а–я
-            has_cyrillic_lower = True
-        elif '\u0410' <= ch <= '\u042f':  # А–Я
-            has_cyrillic_upper = True
-        # цифры или прочие знаки (не буквы и не пробелы)
-        elif ch.isdigit() or (not ch.isalnum()):
-            has_digit_or_sign = True
-        else:
-            # другие символы (например, диакритика) можно отнести к "знакам"
-            if not ch.isalnum():
-                has_digit_or_sign = True
-
-    count = sum([has_latin_lower, has_latin_upper,
-                 has_cyrillic_lower, has_cyrillic_upper, has_digit_or_sign])
-    return count >= 5
-
-
-def read_password_file_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8", errors="ignore").strip()
-
-
-def write_password_file_text(path: Path, text: str):
-    path.write_text(text, encoding="utf-8")
+    return COMPLEXITY.is_ok(password)
 
 
 def ask(prompt: str) -> str:
@@ -119,6 +71,11 @@ def ask(prompt: str) -> str:
 
 
 def main():
+    # Пакетный режим: индекс всех учётных записей в памяти (см. passwords/service.py)
+    if len(sys.argv) >= 2 and sys.argv[1] == "serve":
+        from passwords.service import main as serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+
     # Получаем путь к файлу пароля: аргумент командной строки или спрашиваем у пользователя
     if len(sys.argv) >= 2:
         pwd_path = Path(sys.argv[1])
@@ -135,51 +92,58 @@ def main():
         print("Создайте файл и запишите в него MAGIC (заглавными) для первого запуска, затем перезапустите программу.")
         return
 
-    # Читаем содержимое файла как текст (файл с хэшем хранится как текст с числом или MAGIC/BLOCKED)
-    content = read_password_file_text(pwd_path)
+    # Файл пароля общий для всех запущенных копий программы: счётчик неудачных
+    # попыток хранится в нём же, изменения — под блокировкой (см. passwords/state.py)
+    store = PasswordFile(pwd_path, MAX_ATTEMPTS)
+    content, failed = store.read()
 
     if content == MAGIC:
         # Первый запуск: требуется создание пароля
         print("Первый запуск: создаём пароль.")
         new_pass = ask("Введите новый пароль: ")
-        if not check_password_complexity(new_pass):
-            print(f"Пароль не прошёл проверку сложности. Требуется минимум {MIN_LENGTH} символов "
+        result = COMPLEXITY.check(new_pass)
+        if not result.ok:
+            print(f"Пароль не прошёл проверку сложности ({COMPLEXITY.describe(result)}). "
+                  f"Требуется минимум {MIN_LENGTH} символов "
                   "и разнообразие символов (латиница, кириллица, регистр, цифры/знаки).")
             return
-        new_hash = hash_from_password_str(new_pass)
-        write_password_file_text(pwd_path, str(new_hash))
-        print("Пароль установлен и хэш сохранён в файл.")
+        if store.setup(new_pass):
+            print("Пароль установлен и хэш сохранён в файл.")
+        else:
+            print("Пароль уже установлен другой копией программы.")
         return
 
     if content == BLOCKED:
         print("Программа заблокирована (в файле стоит метка BLOCKED).")
         return
 
-    # Ожидаем, что в файле хранится хэш (число). Если нет — сообщаем об ошибке.
-    try:
-        stored_hash = int(content)
-    except ValueError:
-        print("Содержимое файла пароля не распознано (не MAGIC, не BLOCKED, не число).")
+    # Ожидаем, что в файле хранится хэш (запись kdf или число). Если нет — сообщаем об ошибке.
+    stored = parse_record(content)
+    if stored is None:
+        print("Содержимое файла пароля не распознано (не MAGIC, не BLOCKED, не хэш).")
         print("Завершаю работу во избежание небезопасных действий.")
         return
+    if failed:
+        print(f"Неудачных попыток подряд: {failed}. Осталось попыток: {max(MAX_ATTEMPTS - failed, 0)}")
 
-    # Запрашиваем пароль до MAX_ATTEMPTS раз
-    attempts = MAX_ATTEMPTS
-    while attempts > 0:
+    # Запрашиваем пароль, пока не кончатся попытки (общие для всех копий программы)
+    while True:
         attempt_pass = ask("Введите пароль: ")
-        computed = hash_from_password_str(attempt_pass)
-        if computed == stored_hash:
+        result, left = store.login(attempt_pass)
+        if result == OK:
             print("Доступ разрешён — хэши совпали.")
+            if needs_upgrade(stored):
+                print("Хэш пароля обновлён до нового формата.")
             # Здесь можно добавить основную работу программы
             return
-        else:
-            attempts -= 1
-            print(f"Неверный пароль. Осталось попыток: {attempts}")
+        if result != DENIED:
+            print("Программа заблокирована или файл пароля изменён другой копией программы.")
+            return
+        print(f"Неверный пароль. Осталось попыток: {left}")
+        if not left:
+            break
 
-    # Если вышли из цикла — блокируем
-    write_password_file_text(pwd_path, BLOCKED)
     print("Превышено число попыток. Программа заблокирована (в файл записано BLOCKED).")
 
-
 if __name__ == "__main__":
     main()
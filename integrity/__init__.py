@@ -0,0 +1,30 @@
+"""
+Контроль целостности каталога (общая часть infolaba1.py и infolaba1_new.py).
+
+api      - scan(root), verify(root, manifest), diff(old, new), lookup, export
+cli      - командная строка: python -m integrity check DIR...
+manifest - чтение/запись файла hash.json
+snapshot - двоичный снимок hash.json: mmap, сжатие, подпись HMAC
+scanner  - обход каталога и подсчёт хэшей с кэшем по stat
+rules    - что не обходить: шаблоны .gitignore, одна ФС, размер и тип файла
+parallel - то же самое пулом процессов (--jobs N)
+aio      - асинхронный обход для сетевых ФС (--aio N)
+compare  - сравнение старого и нового потоков записей
+moves    - перемещения, переименования и копии (обратный индекс по содержимому)
+watch    - режим наблюдения через inotify (--watch)
+
+Импорт пакета ничего не тянет: подмодули загружаются при первом обращении.
+"""
+
+__all__ = ["scan", "verify", "diff", "lookup", "export", "SnapshotFormat",
+           "ADDED", "CHANGED", "DELETED", "MOVED", "RENAMED", "DUPLICATE"]
+
+
+def __getattr__(name):
+    if name == "SnapshotFormat":
+        from .snapshot import SnapshotFormat
+        return SnapshotFormat
+    if name in __all__:
+        from . import api
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,221 @@
+"""
+Асинхронный обход каталога (--aio N) для сетевых и медленных ФС.
+
+На NFS/FUSE время уходит не на хэширование, а на ожидание: каждый
+readdir, stat и open/read - это сетевой запрос. Здесь эти операции
+выполняются в пуле из N потоков, а цикл asyncio раздаёт их так, чтобы
+одновременно ждали ответа до N запросов:
+
+  * каталог, в который обход вот-вот зайдёт, читается заранее - списки
+    следующих по порядку подкаталогов запрашиваются не больше чем на
+    N * QUEUE_PER_OP наперёд;
+  * stat и хэш файла - одно задание пула, задания ставятся в порядке обхода;
+  * обход забегает вперёд не больше чем на N * QUEUE_PER_OP файлов, дальше
+    ждёт, пока результаты заберут (память не растёт с размером дерева).
+
+Результат тот же, что у scanner.scan_dir: поток (путь, запись) в порядке
+path_key, те же правила кэша и те же ошибки в stderr. Хэширование занимает
+GIL, так что для локального диска это не замена --jobs.
+
+OP_DELAY - искусственная задержка каждой операции ввода-вывода в секундах,
+для замеров в bench.py (scan.latency.*): так локальный диск ведёт себя как
+сетевая ФС.
+"""
+
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+
+from .chunks import chunk_size_for, reusable_chunks
+from .digests import DEFAULT, only_xor16
+from .manifest import stat_entry
+from .scanner import (SortedLookup, cache_hit, hash_file, ignore_set, record_hash,
+                      report_error, take_cached)
+
+CONCURRENCY = 16
+QUEUE_PER_OP = 4
+
+OP_DELAY = 0
+
+
+def _delay():
+    if OP_DELAY:
+        time.sleep(OP_DELAY)
+
+
+def _list_dir(path, prefix, rules, root_dev):
+    """Задание пула: отсортированный список (DirEntry, каталог ли) или ошибка.
+
+    Пропущенные по rules каталоги и файлы в список не попадают.
+    """
+    _delay()
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        return None, e
+    result = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if is_dir and entry.is_symlink():
+            continue  # как и os.walk, в ссылки на каталоги не заходим
+        if rules is not None:
+            rel_path = entry.path[prefix:]
+            if is_dir and rules.prune(rel_path, entry, root_dev):
+                continue
+            if not is_dir and not rules.wants(rel_path, entry.is_symlink()):
+                continue
+        result.append((entry, is_dir))
+    return result, None
+
+
+def _hash_entry(entry, old, cache_scanned_ns, paranoid, chunking, algorithms, rules):
+    """Задание пула: stat и (если кэш не подошёл) хэш файла.
+
+    Возвращает (состояние, ошибка, запись), состояние - "cached", "hashed",
+    "skipped" (не подошёл по rules) или "error".
+    """
+    _delay()
+    try:
+        st = entry.stat()
+    except OSError as e:
+        return "error", e, None
+    if rules is not None and not rules.accepts(st, entry.is_symlink()):
+        return "skipped", None, None
+    meta = stat_entry(st)
+    chunk_size = chunk_size_for(chunking, meta, old)
+    if not paranoid and cache_hit(old, meta, cache_scanned_ns, chunk_size):
+        take_cached(meta, old)
+        return "cached", None, meta
+    reused = []
+    if not paranoid and only_xor16(algorithms):
+        reused = reusable_chunks(chunking, meta, old, chunk_size)
+    if metrics.ENABLED:
+        started = time.perf_counter()
+    _delay()
+    try:
+        hash_file(entry.path, meta, chunk_size, reused, algorithms)
+    except Exception as e:
+        return "error", e, None
+    if metrics.ENABLED:
+        record_hash(meta, started)
+    return "hashed", None, meta
+
+
+async def _produce(root, ignore_file, lookup, queue, slots, stats, options, rules, ahead):
+    """Обходит дерево в порядке path_key и ставит в очередь (путь, задание).
+
+    ahead - сколько списков подкаталогов может быть запрошено заранее.
+    """
+    loop = asyncio.get_running_loop()
+    ignore = ignore_set(ignore_file)
+    prefix = len(os.path.join(root, ""))
+    root_dev = rules.root_device(root) if rules is not None else None
+    pending = {}  # путь каталога -> запрошенный заранее список
+
+    def submit(func, *args):
+        return loop.run_in_executor(None, func, *args)
+
+    def list_dir(path):
+        return submit(_list_dir, path, prefix, rules, root_dev)
+
+    def prefetch(frame):
+        # списки следующих подкаталогов этого каталога - пока есть свободные места
+        entries = frame[0]
+        while frame[2] < len(entries) and len(pending) < ahead:
+            entry, is_dir = entries[frame[2]]
+            frame[2] += 1
+            if is_dir:
+                pending[entry.path] = list_dir(entry.path)
+
+    async def enter(path):
+        # кадр обхода: [записи, следующая запись, следующая запись для prefetch]
+        future = pending.pop(path, None) or list_dir(path)
+        entries, err = await future
+        if err is not None:
+            report_error(os.path.relpath(path, root), err, stats)
+            entries = []
+        frame = [entries, 0, 0]
+        prefetch(frame)
+        return frame
+
+    try:
+        stack = [await enter(root)]
+        while stack:
+            frame = stack[-1]
+            if frame[1] == len(frame[0]):
+                stack.pop()
+                if stack:
+                    prefetch(stack[-1])
+                continue
+            entry, is_dir = frame[0][frame[1]]
+            frame[1] += 1
+            if is_dir:
+                stack.append(await enter(entry.path))
+                continue
+            if entry.path in ignore:
+                continue  # пропускаем файл с хэшами
+            rel_path = entry.path[prefix:]
+            await slots.acquire()
+            queue.put_nowait((rel_path, submit(_hash_entry, entry, lookup.get(rel_path),
+                                                *options)))
+    finally:
+        queue.put_nowait(None)
+
+
+async def _next(queue, slots):
+    item = await queue.get()
+    if item is None:
+        return None
+    rel_path, future = item
+    result = await future
+    slots.release()
+    return (rel_path,) + result
+
+
+def scan_async(root, ignore_file, concurrency=CONCURRENCY, cache=None, cache_scanned_ns=0,
+               paranoid=False, stats=None, chunking=None, algorithms=DEFAULT, rules=None):
+    """Асинхронный аналог scanner.scan_dir (тоже генератор).
+
+    concurrency - сколько операций ввода-вывода ждут ответа одновременно.
+    """
+    root = os.path.abspath(root)
+    lookup = SortedLookup(cache)
+    if stats is None:
+        stats = {}
+    stats.setdefault("hashed", 0)
+    stats.setdefault("cached", 0)
+    stats.setdefault("errors", 0)
+    options = (cache_scanned_ns, paranoid, chunking, algorithms, rules)
+    loop = asyncio.new_event_loop()
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="integrity-aio")
+    loop.set_default_executor(pool)
+    queue = asyncio.Queue()
+    slots = asyncio.Semaphore(concurrency * QUEUE_PER_OP)
+    producer = loop.create_task(_produce(root, ignore_file, lookup, queue, slots, stats, options,
+                                         rules, concurrency * QUEUE_PER_OP))
+    try:
+        while True:
+            item = loop.run_until_complete(_next(queue, slots))
+            if item is None:
+                break
+            rel_path, status, err, meta = item
+            if status == "error":
+                report_error(rel_path, err, stats)
+                continue
+            if status == "skipped":
+                continue
+            stats[status] += 1
+            yield rel_path, meta
+        loop.run_until_complete(producer)  # ошибка обхода - наружу
+    finally:
+        producer.cancel()
+        loop.run_until_complete(asyncio.gather(producer, return_exceptions=True))
+        pool.shutdown(wait=True, cancel_futures=True)
+        loop.close()
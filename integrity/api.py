@@ -0,0 +1,213 @@
+"""
+Библиотечный интерфейс: то же, что делают infolaba1.py и CLI, но без input().
+
+    from integrity import scan, verify, diff
+
+    scan("/data")                          # создать /data/hash.json
+    changes = verify("/data", on_change=print)
+    for kind, path in diff("old.json", "new.json"): ...
+    for kind, path, source in diff("old.json", "new.json", moves=True): ...
+
+    scan("/data", snapshot=SnapshotFormat("zlib", key))   # двоичный снимок
+    lookup("/data/hash.json", "a/b.txt", key)
+    export("/data/hash.json", "hash-export.json", key)
+"""
+
+import os
+import time
+from contextlib import ExitStack
+
+import metrics
+
+from .compare import ADDED, CHANGED, DELETED, merge_join, verify_records
+from .digests import DEFAULT
+from .manifest import MANIFEST_NAME, open_manifest, read_header, write_manifest
+from .moves import DUPLICATE, MOVED, RENAMED, MoveDetector
+from .rules import Rules
+
+
+def manifest_path(root, manifest=None):
+    """Путь к файлу с хэшами: по умолчанию root/hash.json, относительный - от root."""
+    return os.path.join(os.path.abspath(root), manifest or MANIFEST_NAME)
+
+
+def iter_scan(root, ignore_file, cache=None, cache_scanned_ns=0,
+              paranoid=False, stats=None, jobs=1, chunking=None, algorithms=DEFAULT, aio=0,
+              rules=None):
+    """Поток (путь, запись) в порядке путей - последовательно, пулом из jobs
+    процессов или асинхронно с aio одновременными операциями ввода-вывода."""
+    if aio:
+        if jobs > 1:
+            raise ValueError("jobs и aio вместе не поддерживаются")
+        from .aio import scan_async
+        return scan_async(root, ignore_file, aio, cache, cache_scanned_ns, paranoid, stats,
+                          chunking, algorithms, rules)
+    if jobs > 1:
+        from .parallel import scan_parallel
+        return scan_parallel(root, ignore_file, jobs, cache, cache_scanned_ns, paranoid,
+                             stats, chunking, algorithms, rules=rules)
+    from .scanner import scan_dir
+    return scan_dir(root, ignore_file, cache, cache_scanned_ns, paranoid, stats,
+                    chunking, algorithms, rules)
+
+
+def scan(root, manifest=None, jobs=1, stats=None, chunking=None, algorithms=DEFAULT,
+         aio=0, rules=None, snapshot=None) -> int:
+    """Считает хэши всех файлов под root и пишет манифест, возвращает число файлов.
+
+    chunking (chunks.ChunkPolicy) - хранить хэши кусков для больших файлов.
+    algorithms - имена алгоритмов из digests.ALGORITHMS, считаются за одно чтение.
+    aio - асинхронный обход (aio.py) с таким числом одновременных операций.
+    rules (rules.Rules) - что не обходить; сохраняются в манифесте для verify.
+    snapshot (snapshot.SnapshotFormat) - писать двоичный снимок вместо JSON Lines.
+    """
+    root = os.path.abspath(root)
+    path = manifest_path(root, manifest)
+    if stats is None:
+        stats = {}
+    started = time.time_ns()
+    records = iter_scan(root, path, stats=stats, jobs=jobs, chunking=chunking,
+                        algorithms=algorithms, aio=aio, rules=rules)
+    count = write_manifest(path, records, started, algorithms,
+                           rules.to_dict() if rules is not None else None, snapshot)
+    if metrics.ENABLED:
+        _record_run("scan", started, stats)
+    return count
+
+
+def verify(root, manifest=None, jobs=1, paranoid=False, on_change=None, stats=None,
+           chunking=None, moves=False, aio=0, key=None) -> int:
+    """Сверяет root с манифестом, возвращает число отличий.
+
+    Каждое отличие передаётся в on_change(вид, путь), вид - DELETED/CHANGED/ADDED.
+    Для поблочных файлов - on_change(CHANGED, путь, диапазоны изменившихся байт).
+    С moves=True удаления и добавления сопоставляются по содержимому (moves.py):
+    on_change(MOVED/RENAMED/DUPLICATE, путь, source=исходный путь).
+    Неизменённым файлам в манифесте обновляется stat (эталонные хэши не трогаем).
+    Хэши считаются теми алгоритмами и с теми правилами обхода, что записаны в манифесте.
+    Снимок (snapshot.py) перезаписывается снимком с тем же сжатием; key - ключ
+    HMAC, обязателен для подписанного снимка.
+    stats (если передан словарь) получает "hashed", "cached", "errors" и "changes".
+    """
+    root = os.path.abspath(root)
+    path = manifest_path(root, manifest)
+    if on_change is None:
+        on_change = _ignore
+    if stats is None:
+        stats = {}
+    started = time.time_ns()
+    header = read_header(path)
+    algorithms = header["algorithms"]
+    filters = header.get("filters")
+    snapshot = None
+    if header.get("format") == "snapshot":
+        from .snapshot import SnapshotFormat
+        snapshot = SnapshotFormat(header["compression"], key)
+    summary = {}
+    new_file = path + ".new"
+    with ExitStack() as streams:
+        # два независимых потока по старому файлу: один для stat-кэша, другой для сравнения
+        old_scanned_ns, cache = open_manifest(path, key)
+        streams.callback(cache.close)
+        _, old = open_manifest(path, key)
+        streams.callback(old.close)
+        new = iter_scan(root, path, cache, old_scanned_ns, paranoid, stats, jobs, chunking,
+                        algorithms, aio, Rules.from_dict(filters))
+        detector = MoveDetector(algorithms, root) if moves else None
+        records = verify_records(old, new, on_change, summary, old_scanned_ns, detector)
+        write_manifest(new_file, records, started, algorithms, filters, snapshot)
+    if summary["refresh"]:
+        os.replace(new_file, path)
+    else:
+        os.remove(new_file)
+    stats["changes"] = summary["changes"]
+    if metrics.ENABLED:
+        _record_run("verify", started, stats)
+    return summary["changes"]
+
+
+def diff(old, new, moves=False, key=None):
+    """Сравнивает два манифеста (пути к файлам или потоки записей).
+
+    Выдаёт (вид, путь) в порядке путей. С moves=True - (вид, путь, исходный
+    путь или None): удаления и добавления сопоставляются по содержимому и
+    идут в конце. Файлов на диске нет, так что копия без sha256/blake2b в
+    манифесте не подтверждается и остаётся ADDED.
+    key - ключ HMAC для подписанных снимков.
+    """
+    algorithms = DEFAULT
+    if isinstance(new, (str, os.PathLike)):
+        algorithms = read_header(new)["algorithms"]
+        _, new = open_manifest(new, key)
+    if isinstance(old, (str, os.PathLike)):
+        _, old = open_manifest(old, key)
+    detector = MoveDetector(algorithms) if moves else None
+    for rel_path, o, n in merge_join(old, new):
+        if detector is not None:
+            if n is None:
+                detector.old(rel_path, o)
+            else:
+                detector.new(rel_path, n, o is None)
+            if n is None or o is None:
+                continue  # сообщит detector.events()
+        if n is None:
+            yield DELETED, rel_path
+        elif o is None:
+            yield ADDED, rel_path
+        elif o["hash"] != n["hash"]:
+            yield (CHANGED, rel_path, None) if moves else (CHANGED, rel_path)
+    if detector is not None:
+        yield from detector.events()
+
+
+def lookup(manifest, rel_path, key=None):
+    """Запись одного пути в манифесте или None.
+
+    В снимке - двоичный поиск без разбора остального файла, в JSON Lines -
+    чтение до нужной строки.
+    """
+    header = read_header(manifest)
+    if header.get("format") == "snapshot":
+        from .snapshot import Snapshot
+        if header["signed"] and key is None:
+            raise ValueError(f"{manifest}: снимок подписан, нужен ключ (--key-file)")
+        with Snapshot(manifest, key) as snap:
+            return snap.find(rel_path)
+    _, records = open_manifest(manifest, key)
+    try:
+        for path, entry in records:
+            if path == rel_path:
+                return entry
+    finally:
+        records.close()
+    return None
+
+
+def export(manifest, output, key=None, snapshot=None) -> int:
+    """Переписывает манифест в другом формате, возвращает число записей.
+
+    По умолчанию - в JSON Lines (версия 3), который можно читать глазами;
+    snapshot (snapshot.SnapshotFormat) - в двоичный снимок. key - ключ для
+    чтения подписанного снимка (у JSON Lines подписи нет, он не нужен).
+    """
+    header = read_header(manifest)
+    if header.get("format") != "snapshot":
+        key = None
+    scanned_ns, records = open_manifest(manifest, key)
+    try:
+        return write_manifest(output, records, scanned_ns, header["algorithms"],
+                              header.get("filters"), snapshot)
+    finally:
+        records.close()
+
+
+def _record_run(op, started_ns, stats):
+    """Метрики целого обхода (metrics.py): время и счётчики файлов."""
+    metrics.observe("integrity_run_seconds", (time.time_ns() - started_ns) / 1e9, op=op)
+    metrics.inc("integrity_files_total", stats.get("hashed", 0), source="hashed")
+    metrics.inc("integrity_files_total", stats.get("cached", 0), source="cached")
+    metrics.inc("integrity_errors_total", stats.get("errors", 0))
+
+
+def _ignore(kind, rel_path, ranges=None, source=None):
+    pass
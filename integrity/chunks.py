@@ -0,0 +1,106 @@
+"""
+Поблочный манифест для больших файлов.
+
+Для файлов не меньше threshold байт в манифесте рядом с общим хэшем хранятся
+XOR16-хэши кусков по chunk_size байт. Общий хэш - XOR хэшей кусков (куски
+чётной длины), поэтому он совпадает с обычным. При проверке по кускам видно,
+какие диапазоны байт изменились.
+
+append_only=True - для журналов, в которые только дописывают: если файл
+(тот же inode) вырос, целые куски старой длины берутся из манифеста и
+читается только хвост. Это доверие к файлу, а не проверка - включать только
+для каталогов, где так и есть.
+"""
+
+from collections import namedtuple
+
+CHUNK_SIZE = 4 << 20
+MIN_CHUNK_SIZE = 2  # кусок - целые 16-битные слова; меньше - все хэши кусков нулевые
+
+
+class ChunkPolicy(namedtuple("ChunkPolicy", "threshold size append_only")):
+    __slots__ = ()
+
+    def __new__(cls, threshold, size=CHUNK_SIZE, append_only=False):
+        if size < MIN_CHUNK_SIZE:
+            raise ValueError(f"размер куска должен быть не меньше {MIN_CHUNK_SIZE} байт: {size}")
+        return super().__new__(cls, threshold, size, append_only)
+
+
+def chunk_size_for(policy, meta, old):
+    """Размер куска для файла или None, если файл хэшируется целиком.
+
+    Файлы, которые уже были поблочными в манифесте, остаются поблочными.
+    """
+    if old is not None and old.get("chunk_size"):
+        return old["chunk_size"]
+    if policy is not None and meta["size"] >= policy.threshold:
+        return policy.size & ~1
+    return None
+
+
+def reusable_chunks(policy, meta, old, chunk_size):
+    """Хэши кусков из старой записи, которые можно не перечитывать (append_only)."""
+    if policy is None or not policy.append_only or old is None:
+        return []
+    if old.get("chunk_size") != chunk_size or "mtime_ns" not in old:
+        return []
+    if (old["ino"], old["dev"]) != (meta["ino"], meta["dev"]) or meta["size"] < old["size"]:
+        return []
+    if chunk_size is None or "chunks" not in old:
+        return []  # файл хранился без кусков
+    return old["chunks"][:old["size"] // chunk_size]
+
+
+def fold(chunks) -> int:
+    h = 0
+    for c in chunks:
+        h ^= c
+    return h
+
+
+def changed_ranges(old, new):
+    """Диапазоны байт [начало, конец), в которых поблочные записи различаются.
+
+    Если у записей нет кусков (или размер куска разный) - None.
+    """
+    size = old.get("chunk_size")
+    if not size or size != new.get("chunk_size"):
+        return None
+    old_chunks = old["chunks"]
+    new_chunks = new["chunks"]
+    end_of_file = max(old.get("size", 0), new["size"])
+    ranges = []
+    for i in range(max(len(old_chunks), len(new_chunks))):
+        if i < len(old_chunks) and i < len(new_chunks) and old_chunks[i] == new_chunks[i]:
+            continue
+        start = i * size
+        end = min(start + size, end_of_file)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+def format_ranges(ranges) -> str:
+    return ", ".join(f"{start}-{end - 1}" for start, end in ranges)
+
+
+def parse_size(text) -> int:
+    """Размер вида 4096, 64K, 256M, 2G."""
+    text = text.strip().upper()
+    units = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    if text and text[-1] in units:
+        return int(text[:-1]) * units[text[-1]]
+    return int(text)
+
+
+def parse_chunk_size(text) -> int:
+    """parse_size для --chunk-size: ошибка argparse, если кусок меньше MIN_CHUNK_SIZE."""
+    size = parse_size(text)
+    if size < MIN_CHUNK_SIZE:
+        import argparse
+        raise argparse.ArgumentTypeError(
+            f"размер куска должен быть не меньше {MIN_CHUNK_SIZE} байт: {text!r}")
+    return size
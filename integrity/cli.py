@@ -0,0 +1,286 @@
+"""
+Командная строка без вопросов пользователю.
+
+    python -m integrity check DIR...      # создать hash.json или сверить с ним
+    python -m integrity scan DIR...       # пересоздать hash.json
+    python -m integrity verify DIR...     # только сверить (нет hash.json - ошибка)
+    python -m integrity diff OLD NEW      # сравнить два файла с хэшами
+    python -m integrity watch DIR         # следить за каталогом (inotify)
+    python -m integrity lookup FILE PATH  # запись одного пути из файла с хэшами
+    python -m integrity export FILE OUT   # переписать снимок в JSON Lines (и обратно)
+
+Перемещённые, переименованные и скопированные файлы выводятся отдельными
+событиями, а не парой "удалён" + "добавлен" (moves.py; --no-moves - отключить).
+
+Каталоги можно передать списком в файле (--roots-from FILE, "-" - stdin).
+С --json каждое событие - строка JSON, по каждому каталогу - строка-итог.
+С --metrics FILE и --profile FILE - метрики и профиль запуска (metrics.py).
+С --snapshot [zlib|lzma] hash.json пишется двоичным снимком (snapshot.py),
+с --key-file KEY (или INTEGRITY_KEY) - подписанным; при проверке формат и
+сжатие берутся из файла, а подпись обязательна, если ключ задан.
+
+Коды выхода: 0 - изменений нет, 1 - найдены изменения, 2 - были ошибки.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import metrics
+
+from . import api
+from .chunks import ChunkPolicy, format_ranges, parse_chunk_size, parse_size
+from .compare import ADDED, CHANGED, DELETED
+from .digests import DEFAULT, parse_algorithms
+from .moves import DUPLICATE, MOVED, RENAMED
+from .rules import add_arguments as add_rule_arguments
+from .rules import from_args as rules_from_args
+from .snapshot import COMPRESSION, SnapshotFormat, load_key
+
+EXIT_OK = 0
+EXIT_CHANGED = 1
+EXIT_ERROR = 2
+
+MESSAGES = {
+    DELETED: "Файл удалён:",
+    CHANGED: "Файл изменён:",
+    ADDED: "Файл добавлен:",
+    MOVED: "Файл перемещён:",
+    RENAMED: "Файл переименован:",
+    DUPLICATE: "Файл-копия:",
+}
+
+
+def format_event(kind, rel_path, ranges=None, source=None):
+    """Строка события для вывода в текстовом виде."""
+    if source is not None:
+        if kind == DUPLICATE:
+            return f"{MESSAGES[kind]} {rel_path} (копия {source})"
+        return f"{MESSAGES[kind]} {source} -> {rel_path}"
+    line = f"{MESSAGES[kind]} {rel_path}"
+    if ranges is not None:
+        line += f" (байты {format_ranges(ranges)})"
+    return line
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m integrity",
+                                     description="Проверка целостности каталогов по hash.json")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="вывод строками JSON")
+    common.add_argument("--metrics", metavar="FILE",
+                        help="записать метрики при выходе (FILE.prom - Prometheus, иначе JSON)")
+    common.add_argument("--profile", metavar="FILE",
+                        help="записать профиль cProfile запуска (python -m pstats FILE)")
+    common.add_argument("--key-file", metavar="KEY",
+                        help="ключ HMAC для подписанных снимков (иначе из INTEGRITY_KEY)")
+
+    snapshot = argparse.ArgumentParser(add_help=False)
+    snapshot.add_argument("--snapshot", nargs="?", const="none", choices=COMPRESSION,
+                          metavar="COMPRESSION",
+                          help="писать двоичный снимок вместо JSON Lines; сжатие: none "
+                               "(по умолчанию, быстрее всего открывается), zlib, lzma")
+
+    roots = argparse.ArgumentParser(add_help=False, parents=[common, snapshot])
+    roots.add_argument("roots", nargs="*", metavar="DIR", help="каталоги для обработки")
+    roots.add_argument("--roots-from", metavar="FILE",
+                       help="файл со списком каталогов, по одному в строке (- для stdin)")
+    roots.add_argument("--manifest", metavar="NAME",
+                       help="имя файла с хэшами внутри каталога (по умолчанию hash.json)")
+    roots.add_argument("--jobs", type=int, default=1, metavar="N",
+                       help="число процессов для подсчёта хэшей (по умолчанию 1)")
+    roots.add_argument("--aio", type=int, default=0, metavar="N",
+                       help="асинхронный обход: до N операций ввода-вывода одновременно "
+                            "(для NFS/FUSE; вместо --jobs)")
+    roots.add_argument("--chunk-threshold", type=parse_size, metavar="SIZE",
+                       help="хранить хэши кусков для файлов от SIZE байт (например 256M)")
+    roots.add_argument("--chunk-size", type=parse_chunk_size, default="4M", metavar="SIZE",
+                       help="размер куска (по умолчанию 4M)")
+    roots.add_argument("--append-only", action="store_true",
+                       help="считать поблочные файлы журналами: при росте читать только хвост")
+    roots.add_argument("--algorithm", type=parse_algorithms, default=DEFAULT, metavar="NAMES",
+                       help="алгоритмы для нового hash.json через запятую: xor16 (по умолчанию), "
+                            "crc32, adler32, sha256, blake2b; при проверке берутся из hash.json")
+    # правила обхода (rules.py) - как и алгоритмы, при проверке берутся из hash.json
+    add_rule_arguments(roots)
+
+    check = argparse.ArgumentParser(add_help=False, parents=[roots])
+    check.add_argument("--paranoid", action="store_true",
+                       help="не доверять stat-кэшу и перехэшировать все файлы")
+    check.add_argument("--no-moves", action="store_true",
+                       help="не искать перемещения и копии (постоянная память на больших деревьях)")
+
+    sub.add_parser("check", parents=[check], help="создать hash.json или сверить с ним")
+    sub.add_parser("scan", parents=[roots], help="пересоздать hash.json")
+    sub.add_parser("verify", parents=[check], help="сверить каталог с hash.json")
+    p = sub.add_parser("diff", parents=[common], help="сравнить два файла с хэшами")
+    p.add_argument("old")
+    p.add_argument("new")
+    p = sub.add_parser("lookup", parents=[common], help="найти пути в файле с хэшами")
+    p.add_argument("manifest", metavar="FILE")
+    p.add_argument("paths", nargs="+", metavar="PATH", help="путь относительно каталога")
+    p = sub.add_parser("export", parents=[common, snapshot],
+                       help="переписать файл с хэшами в JSON Lines (или в снимок с --snapshot)")
+    p.add_argument("manifest", metavar="FILE")
+    p.add_argument("output", metavar="OUT")
+    p = sub.add_parser("watch", help="следить за каталогом (inotify, только Linux)")
+    p.add_argument("root", metavar="DIR")
+    p.add_argument("--manifest", metavar="NAME")
+    p.add_argument("--key-file", metavar="KEY", help="ключ HMAC для подписанного снимка")
+    return parser.parse_args(argv)
+
+
+def iter_roots(args):
+    yield from args.roots
+    if args.roots_from:
+        f = sys.stdin if args.roots_from == "-" else open(args.roots_from, encoding="utf-8")
+        with f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield line
+
+
+class Output:
+    """Печать событий и итогов в текстовом виде или строками JSON."""
+
+    def __init__(self, as_json, many):
+        self.as_json = as_json
+        self.many = many
+
+    def event(self, root, kind, rel_path, ranges=None, source=None):
+        if self.as_json:
+            rec = {"root": root, "event": kind, "path": rel_path}
+            if ranges is not None:
+                rec["ranges"] = ranges
+            if source is not None:
+                rec["source"] = source
+            self._json(rec)
+            return
+        line = format_event(kind, rel_path, ranges, source)
+        print(f"{root}: {line}" if self.many else line)
+
+    def summary(self, root, status, message, **fields):
+        if self.as_json:
+            self._json(dict({"root": root, "status": status}, **fields))
+        elif self.many:
+            print(f"{root}: {message}")
+        else:
+            print(message)
+
+    def _json(self, rec):
+        print(json.dumps(rec, ensure_ascii=False), flush=True)
+
+
+def chunk_policy(args):
+    if args.chunk_threshold is None:
+        return None
+    return ChunkPolicy(args.chunk_threshold, args.chunk_size, args.append_only)
+
+
+def snapshot_format(args, key):
+    """Формат нового hash.json: снимок, если задан --snapshot или ключ."""
+    if args.snapshot is None and key is None:
+        return None
+    return SnapshotFormat(args.snapshot or "none", key)
+
+
+def run_root(root, args, out, rules=None, key=None) -> int:
+    """Обрабатывает один каталог, возвращает код выхода для него."""
+    if not os.path.isdir(root):
+        msg = "Путь не найден или это не каталог."
+        out.summary(root, "error", msg, error=msg)
+        return EXIT_ERROR
+    path = api.manifest_path(root, args.manifest)
+    stats = {}
+    create = args.command == "scan" or (args.command == "check" and not os.path.exists(path))
+    if create:
+        count = api.scan(root, args.manifest, args.jobs, stats, chunk_policy(args), args.algorithm,
+                         args.aio, rules, snapshot_format(args, key))
+        out.summary(root, "created", f"Хэши сохранены ({count} файлов).", files=count, **stats)
+    elif not os.path.exists(path):
+        msg = "Файл с хэшами не найден."
+        out.summary(root, "error", msg, error=msg)
+        return EXIT_ERROR
+    else:
+        def on_change(kind, rel_path, ranges=None, source=None):
+            out.event(root, kind, rel_path, ranges, source)
+
+        changes = api.verify(root, args.manifest, args.jobs, args.paranoid, on_change, stats,
+                             chunk_policy(args), not args.no_moves, args.aio, key)
+        out.summary(root, "changed" if changes else "ok",
+                    f"Изменений: {changes}." if changes else "Всё в порядке, изменений нет.",
+                    **stats)
+        if changes:
+            return EXIT_ERROR if stats.get("errors") else EXIT_CHANGED
+    return EXIT_ERROR if stats.get("errors") else EXIT_OK
+
+
+def run_lookup(args, key) -> int:
+    code = EXIT_OK
+    for rel_path in args.paths:
+        entry = api.lookup(args.manifest, os.path.normpath(rel_path), key)
+        if args.json:
+            print(json.dumps({"path": rel_path, "entry": entry}, ensure_ascii=False))
+        elif entry is None:
+            print(f"{rel_path}: нет в файле с хэшами")
+        else:
+            print(f"{rel_path}: {json.dumps(entry, ensure_ascii=False)}")
+        if entry is None:
+            code = EXIT_CHANGED
+    return code
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if getattr(args, "metrics", None) or getattr(args, "profile", None):
+        metrics.configure(args.metrics, args.profile)
+
+    try:
+        key = load_key(args.key_file)
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_ERROR
+
+    if args.command == "watch":
+        from .watch import watch
+        root = os.path.abspath(args.root)
+        watch(root, api.manifest_path(root, args.manifest), key)
+        return EXIT_OK
+
+    if args.command in ("diff", "lookup", "export"):
+        try:
+            if args.command == "lookup":
+                return run_lookup(args, key)
+            if args.command == "export":
+                fmt = SnapshotFormat(args.snapshot, key) if args.snapshot is not None else None
+                api.export(args.manifest, args.output, key, fmt)
+                return EXIT_OK
+            out = Output(args.json, False)
+            code = EXIT_OK
+            for kind, rel_path, source in api.diff(args.old, args.new, moves=True, key=key):
+                out.event(None, kind, rel_path, source=source)
+                code = EXIT_CHANGED
+            return code
+        except (OSError, ValueError) as e:
+            print(f"Ошибка: {e}", file=sys.stderr)
+            return EXIT_ERROR
+
+    try:
+        rules = rules_from_args(args)  # шаблоны компилируются один раз на все каталоги
+    except (OSError, ValueError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return EXIT_ERROR
+    roots = iter_roots(args)
+    out = Output(args.json, len(args.roots) != 1 or bool(args.roots_from))
+    code = EXIT_OK
+    for root in roots:
+        try:
+            code = max(code, run_root(os.path.abspath(root), args, out, rules, key))
+        except (OSError, ValueError) as e:
+            out.summary(root, "error", f"Ошибка: {e}", error=str(e))
+            code = EXIT_ERROR
+    return code
@@ -0,0 +1,95 @@
+"""
+Проверка: слияние отсортированных потоков старого манифеста и нового обхода.
+
+В памяти держится по одной записи с каждой стороны, поэтому проверка
+работает за постоянную память при любом размере дерева.
+"""
+
+from .chunks import changed_ranges
+from .manifest import CHUNK_FIELDS, STAT_FIELDS, path_key
+from .scanner import RACY_NS
+
+DELETED = "deleted"
+CHANGED = "changed"
+ADDED = "added"
+
+
+def merge_join(old, new):
+    """Сливает два потока (путь, запись) в порядке path_key.
+
+    Выдаёт (путь, старая запись или None, новая запись или None).
+    """
+    old = iter(old)
+    new = iter(new)
+    o = next(old, None)
+    n = next(new, None)
+    while o is not None or n is not None:
+        if n is None or (o is not None and path_key(o[0]) < path_key(n[0])):
+            yield o[0], o[1], None
+            o = next(old, None)
+        elif o is None or path_key(n[0]) < path_key(o[0]):
+            yield n[0], None, n[1]
+            n = next(new, None)
+        else:
+            yield o[0], o[1], n[1]
+            o = next(old, None)
+            n = next(new, None)
+
+
+def verify_records(old, new, on_change, summary, old_scanned_ns=0, moves=None):
+    """Сравнивает старый и новый потоки, об отличиях сообщает on_change(вид, путь).
+
+    Для поблочных файлов изменение приходит как on_change(CHANGED, путь, диапазоны),
+    диапазоны - список [начало, конец) изменившихся байт.
+
+    moves (moves.MoveDetector) - удалённые и добавленные файлы сообщаются в
+    конце, после сопоставления по содержимому; перемещения и копии приходят
+    как on_change(вид, путь, source=исходный путь).
+
+    Выдаёт поток записей эталона для перезаписи манифеста: эталонные хэши не
+    трогаем, но у неизменённых файлов запоминаем свежий stat, чтобы в
+    следующий раз (например, после touch) они не перечитывались.
+    В summary: "changes" - число отличий, "refresh" - стоит ли перезаписать
+    манифест (обновился stat или были "racy" записи).
+    """
+    summary.setdefault("changes", 0)
+    summary.setdefault("refresh", False)
+    for rel_path, o, n in merge_join(old, new):
+        if moves is not None and n is not None:
+            moves.new(rel_path, n, o is None)
+        if n is None:
+            if moves is None:
+                on_change(DELETED, rel_path)
+                summary["changes"] += 1
+            else:
+                moves.old(rel_path, o)
+        elif o is None:
+            if moves is None:
+                on_change(ADDED, rel_path)
+                summary["changes"] += 1
+            continue  # новые файлы в эталон не добавляем
+        elif n["hash"] != o["hash"]:
+            ranges = changed_ranges(o, n)
+            if ranges is None:
+                on_change(CHANGED, rel_path)
+            else:
+                on_change(CHANGED, rel_path, ranges)
+            summary["changes"] += 1
+        elif (any(o.get(k) != n[k] for k in STAT_FIELDS)
+              or o.get("chunk_size") != n.get("chunk_size")):
+            # свежий stat, а если файл стал поблочным - и хэши кусков
+            o = dict(o)
+            o.update({k: n[k] for k in STAT_FIELDS})
+            if "chunks" in n:
+                o.update({k: n[k] for k in CHUNK_FIELDS})
+            summary["refresh"] = True
+        elif o["mtime_ns"] + RACY_NS > old_scanned_ns:
+            summary["refresh"] = True
+        yield rel_path, o
+    if moves is not None:
+        for kind, rel_path, source in moves.events():
+            if source is None:
+                on_change(kind, rel_path)
+            else:
+                on_change(kind, rel_path, source=source)
+            summary["changes"] += 1
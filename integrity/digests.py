@@ -0,0 +1,98 @@
+"""
+Алгоритмы хэширования для контроля целостности.
+
+    xor16   - алгоритм из задания (по умолчанию), 0..65535
+    crc32   - zlib.crc32
+    adler32 - zlib.adler32
+    sha256  - hashlib, hex-строка
+    blake2b - hashlib, hex-строка
+
+Можно указать несколько алгоритмов сразу - файл читается один раз, каждый
+блок отдаётся всем хэшерам. Значение в манифесте: для одного алгоритма -
+само значение, для нескольких - список в том же порядке. Какие алгоритмы
+использованы, записано в заголовке манифеста.
+
+Хэши кусков в поблочном режиме (chunks.py) всегда XOR16.
+"""
+
+import hashlib
+import zlib
+
+from xor16 import BLOCK_SIZE, Xor16, xor16_file
+
+DEFAULT = ("xor16",)
+
+
+class _Zlib:
+    def __init__(self, func, start):
+        self._func = func
+        self._value = start
+
+    def update(self, data):
+        self._value = self._func(data, self._value)
+
+    def value(self):
+        return self._value
+
+
+class _Hashlib:
+    def __init__(self, name):
+        self._h = hashlib.new(name)
+
+    def update(self, data):
+        self._h.update(data)
+
+    def value(self):
+        return self._h.hexdigest()
+
+
+ALGORITHMS = {
+    "xor16": Xor16,
+    "crc32": lambda: _Zlib(zlib.crc32, 0),
+    "adler32": lambda: _Zlib(zlib.adler32, 1),
+    "sha256": lambda: _Hashlib("sha256"),
+    "blake2b": lambda: _Hashlib("blake2b"),
+}
+
+
+def parse_algorithms(text):
+    """"xor16,sha256" -> ("xor16", "sha256") с проверкой имён."""
+    names = tuple(name.strip().lower() for name in text.split(",") if name.strip())
+    unknown = [name for name in names if name not in ALGORITHMS]
+    if unknown or not names:
+        raise ValueError(f"неизвестный алгоритм: {', '.join(unknown) or text!r} "
+                         f"(есть: {', '.join(ALGORITHMS)})")
+    return names
+
+
+def only_xor16(algorithms) -> bool:
+    """XOR16 ассоциативен: файл можно резать на части и брать куски из манифеста."""
+    return tuple(algorithms) == DEFAULT
+
+
+def file_digest(path, algorithms=DEFAULT, chunk_size=None):
+    """Все хэши файла за одно чтение.
+
+    Возвращает (значение, хэши кусков или None). Если задан chunk_size,
+    файл читается кусками этого размера и для каждого считается XOR16.
+    """
+    if only_xor16(algorithms) and chunk_size is None:
+        return xor16_file(path), None
+    hashers = [ALGORITHMS[name]() for name in algorithms]
+    chunks = [] if chunk_size is not None else None
+    buf = bytearray(chunk_size or BLOCK_SIZE)
+    view = memoryview(buf)
+    with open(path, "rb") as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            block = view[:n]
+            for h in hashers:
+                h.update(block)
+            if chunks is not None:
+                x = Xor16()
+                x.update(block)
+                chunks.append(x.value())
+    values = [h.value() for h in hashers]
+    return (values[0] if len(values) == 1 else values), chunks
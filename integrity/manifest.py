@@ -0,0 +1,170 @@
+"""
+Файл с хэшами (hash.json).
+
+Версия 1 (старая) - просто {путь: хэш}.
+Версия 2 - один JSON-объект {"version": 2, "scanned_ns": ..., "files": {путь: {...}}}.
+Версия 3 (текущая) - JSON Lines, пишется потоком прямо во время обхода:
+
+    {"version": 3, "scanned_ns": ..., "algorithms": ["xor16"], "fields": ["path", "hash", ...]}
+    ["a/b.txt", 12345, 10, 1700000000000000000, 42, 2049]
+    ["big.img", 4242, 9000000, 1700000000000000000, 43, 2049, 4194304, [1, 2, 3]]
+    ...
+
+У больших файлов в поблочном режиме (chunks.py) в конце записи - размер
+куска и список хэшей кусков. Если алгоритмов несколько (digests.py), на
+месте хэша - список значений в порядке "algorithms". Без "algorithms" в
+заголовке (и в старых версиях) алгоритм - xor16. Если обход был с
+правилами (rules.py), они лежат в заголовке под ключом "filters".
+
+Записи отсортированы по path_key, поэтому проверка - это слияние двух
+отсортированных потоков и память не зависит от размера дерева.
+Старые версии читаются целиком (один раз, до перезаписи в новом формате).
+
+Вместо JSON Lines манифест может быть двоичным снимком (snapshot.py) -
+формат определяется по первым байтам файла, записи те же.
+"""
+
+import json
+import os
+
+from .digests import DEFAULT as DEFAULT_ALGORITHMS
+
+MANIFEST_NAME = "hash.json"
+VERSION = 3
+
+STAT_FIELDS = ("size", "mtime_ns", "ino", "dev")
+CHUNK_FIELDS = ("chunk_size", "chunks")
+FIELDS = ("path", "hash") + STAT_FIELDS + CHUNK_FIELDS
+
+
+def stat_entry(st) -> dict:
+    """Метаданные файла из os.stat_result в виде словаря для манифеста."""
+    return {
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "ino": st.st_ino,
+        "dev": st.st_dev,
+    }
+
+
+def path_key(rel_path):
+    """Ключ сортировки: по компонентам пути, как их выдаёт обход каталога."""
+    return rel_path.split(os.sep)
+
+
+def _iter_jsonl(path):
+    with open(path, "r", encoding="utf-8") as f:
+        f.readline()  # заголовок
+        for line in f:
+            rec = json.loads(line)
+            entry = {"hash": rec[1]}
+            if len(rec) > 2:
+                entry.update(zip(STAT_FIELDS, rec[2:6]))
+            if len(rec) > 6:
+                entry.update(zip(CHUNK_FIELDS, rec[6:]))
+            yield rec[0], entry
+
+
+def _load_legacy(path):
+    """Версии 1 и 2: читаем целиком, возвращаем ({путь: запись}, scanned_ns)."""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if isinstance(data, dict) and data.get("version") == 2:
+        return data["files"], data.get("scanned_ns", 0)
+    return {p: {"hash": h} for p, h in data.items()}, 0
+
+
+def _iter_sorted(files):
+    for rel_path in sorted(files, key=path_key):
+        yield rel_path, files[rel_path]
+
+
+def read_header(path) -> dict:
+    """Заголовок манифеста; для старых версий - собранный по умолчанию.
+
+    У снимка - ещё "format": "snapshot", "compression" и "signed".
+    """
+    from . import snapshot
+    if snapshot.is_snapshot(path):
+        return snapshot.read_meta(path)
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    try:
+        header = json.loads(first)
+    except ValueError:
+        header = None
+    if not (isinstance(header, dict) and header.get("version") == VERSION):
+        header = {"version": 1}
+    header.setdefault("algorithms", list(DEFAULT_ALGORITHMS))
+    return header
+
+
+def _iter_snapshot(snap):
+    with snap:
+        yield from snap
+
+
+def open_manifest(path, key=None):
+    """Открывает манифест любой версии.
+
+    Возвращает (scanned_ns, records): records - генератор пар (путь, запись)
+    в порядке path_key. У записей версии 1 нет stat, они всегда перехэшируются.
+    Каждый вызов даёт независимый поток, генератор закрывает файл сам.
+    key - ключ HMAC: подписанный снимок без ключа не открывается, а с
+    ключом не открывается ничего, кроме снимка с верной подписью (ValueError).
+    """
+    from .snapshot import Snapshot, is_snapshot
+    if is_snapshot(path):
+        snap = Snapshot(path, key)
+        if snap.signed and key is None:
+            snap.close()
+            raise ValueError(f"{path}: снимок подписан, нужен ключ (--key-file)")
+        return snap.scanned_ns, _iter_snapshot(snap)
+    if key is not None:
+        raise ValueError(f"{path}: манифест не подписан")
+    with open(path, "r", encoding="utf-8") as f:
+        first = f.readline()
+    try:
+        header = json.loads(first)
+    except ValueError:
+        header = None
+    if isinstance(header, dict) and header.get("version") == VERSION:
+        return header.get("scanned_ns", 0), _iter_jsonl(path)
+    files, scanned_ns = _load_legacy(path)
+    return scanned_ns, _iter_sorted(files)
+
+
+def write_manifest(path, records, scanned_ns, algorithms=DEFAULT_ALGORITHMS,
+                   filters=None, snapshot=None) -> int:
+    """Пишет поток (путь, запись) в манифест версии 3, возвращает число записей.
+
+    Записи должны идти в порядке path_key. Файл заменяется атомарно.
+    filters - правила обхода (Rules.to_dict()) для заголовка.
+    snapshot (snapshot.SnapshotFormat) - писать двоичный снимок.
+    """
+    header = {"version": VERSION, "scanned_ns": scanned_ns,
+              "algorithms": list(algorithms), "fields": FIELDS}
+    if filters:
+        header["filters"] = filters
+    if snapshot is not None:
+        from .snapshot import write_snapshot
+        return write_snapshot(path, records, header, snapshot.compression, snapshot.key)
+    tmp = path + ".tmp"
+    count = 0
+    f = open(tmp, "w", encoding="utf-8")
+    try:
+        with f:
+            f.write(json.dumps(header) + "\n")
+            for rel_path, entry in records:
+                rec = [rel_path, entry["hash"]]
+                if "mtime_ns" in entry:
+                    rec.extend(entry[k] for k in STAT_FIELDS)
+                    if "chunks" in entry:
+                        rec.extend(entry[k] for k in CHUNK_FIELDS)
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                count += 1
+    except BaseException:
+        os.unlink(tmp)  # ошибка обхода или Ctrl+C - недописанный файл не оставляем
+        raise
+    os.replace(tmp, path)
+    return count
@@ -0,0 +1,129 @@
+"""
+Перемещения, переименования и копии при сверке.
+
+Без этого перенос файла виден как удаление старого пути плюс добавление
+нового, а перестановка каталога - как тысячи пар таких событий. Здесь
+удалённые и добавленные записи не сообщаются сразу, а копятся, и в конце
+сопоставляются по содержимому:
+
+    MOVED     - файл переехал в другой каталог
+    RENAMED   - тот же каталог, другое имя
+    DUPLICATE - новый файл с тем же содержимым, что у другого файла дерева
+
+Группировка - за один проход по записям: обратный индекс
+(размер, хэш) -> пути, без сравнения файлов попарно. Хэш XOR16 всего
+16-битный (правкой на месте его легко сохранить), поэтому совпадение
+ключа ещё надо подтвердить криптографическим хэшем:
+
+  * перемещение и переименование - только если в манифесте есть sha256
+    или blake2b: он входит в ключ, и совпадения ключа достаточно. Старого
+    файла на диске уже нет, так что без сохранённого хэша подтвердить
+    нечем - такие пары остаются DELETED/ADDED;
+  * копия - сохранённым хэшем или sha256 обоих файлов с диска (если
+    известен корень дерева).
+
+Неподтверждённое совпадение остаётся обычными DELETED/ADDED. Пустые файлы
+не сопоставляются. Индекс держит ключ каждого файла дерева, так что память
+растёт с числом файлов (сама сверка без этого режима - постоянная память).
+"""
+
+import os
+
+from .compare import ADDED, DELETED
+from .digests import file_digest
+from .manifest import path_key
+
+MOVED = "moved"
+RENAMED = "renamed"
+DUPLICATE = "duplicate"
+
+STRONG = ("sha256", "blake2b")
+CONFIRM = ("sha256",)
+
+
+def content_key(entry):
+    """(размер, хэш) записи или None, если её не с чем сопоставлять."""
+    size = entry.get("size")
+    if not size:
+        return None  # старый манифест без stat или пустой файл
+    value = entry["hash"]
+    return size, tuple(value) if isinstance(value, list) else value
+
+
+class MoveDetector:
+    """Копит удалённые и добавленные записи, в конце выдаёт события.
+
+    old(путь, запись) - для каждого удалённого файла, new(путь, запись, added) -
+    для каждого файла нового дерева. events() - (вид, путь, исходный путь или
+    None) в порядке path_key.
+    """
+
+    def __init__(self, algorithms, root=None):
+        self.strong = any(name in STRONG for name in algorithms)
+        self.root = root
+        self.deleted = {}  # ключ -> [(путь, запись)]
+        self.unmatched = []  # удалённые без ключа
+        self.added = []
+        self.content = {}  # ключ -> (путь, добавлен ли), прежние файлы важнее новых
+        self._digests = {}
+
+    def old(self, rel_path, entry):
+        key = content_key(entry)
+        if key is None:
+            self.unmatched.append(rel_path)
+        else:
+            self.deleted.setdefault(key, []).append((rel_path, entry))
+
+    def new(self, rel_path, entry, added=False):
+        key = content_key(entry)
+        if added:
+            self.added.append((rel_path, entry, key))
+        if key is None:
+            return
+        seen = self.content.get(key)
+        if seen is None or (seen[1] and not added):
+            self.content[key] = rel_path, added
+
+    def _digest(self, rel_path):
+        digest = self._digests.get(rel_path)
+        if digest is None:
+            try:
+                digest = file_digest(os.path.join(self.root, rel_path), CONFIRM)[0]
+            except OSError:
+                digest = False
+            self._digests[rel_path] = digest
+        return digest
+
+    def _same_content(self, a, b):
+        if self.strong:
+            return True
+        if self.root is None:
+            return False
+        digest = self._digest(a)
+        return bool(digest) and digest == self._digest(b)
+
+    def _match(self, rel_path, entry, key):
+        candidates = self.deleted.get(key)
+        if candidates and self.strong:
+            # ключ с криптографическим хэшем - содержимое то же
+            source, _ = candidates.pop(0)
+            same_dir = os.path.dirname(source) == os.path.dirname(rel_path)
+            return RENAMED if same_dir else MOVED, source
+        seen = self.content.get(key)
+        if seen is not None and seen[0] != rel_path and self._same_content(seen[0], rel_path):
+            return DUPLICATE, seen[0]
+        return None
+
+    def events(self):
+        events = []
+        for rel_path, entry, key in self.added:
+            found = self._match(rel_path, entry, key) if key is not None else None
+            if found is None:
+                events.append((ADDED, rel_path, None))
+            else:
+                events.append((found[0], rel_path, found[1]))
+        events.extend((DELETED, rel_path, None) for rel_path in self.unmatched)
+        for candidates in self.deleted.values():
+            events.extend((DELETED, rel_path, None) for rel_path, _ in candidates)
+        events.sort(key=lambda event: path_key(event[1]))
+        return events
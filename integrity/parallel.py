@@ -0,0 +1,174 @@
+"""
+Параллельный обход каталога (--jobs N).
+
+Главный процесс обходит дерево (scanner.iter_files) и раздаёт работу пулу
+процессов, держа в очереди не больше jobs * QUEUE_PER_JOB заданий, поэтому
+память не растёт с размером дерева. Мелкие файлы отправляются пачками, чтобы
+не платить за передачу между процессами на каждый файл. Большие файлы
+режутся на куски по чётной границе, куски хэшируются разными процессами и
+результаты складываются через XOR. Поблочные файлы (chunks.py) режутся
+ровно по своим кускам - хэши кусков и есть результаты заданий.
+
+Резать файл можно только для XOR16: с другими алгоритмами (digests.py)
+большой файл целиком читает один процесс.
+
+Результат тот же, что у scanner.scan_dir: поток (путь, запись) в порядке
+обхода - готовые результаты отдаются по очереди, а не по мере готовности.
+"""
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from xor16 import xor16_file_range
+
+from .chunks import chunk_size_for, reusable_chunks
+from .digests import DEFAULT, file_digest, only_xor16
+from .scanner import SortedLookup, cache_hit, iter_files, report_error, take_cached
+
+QUEUE_PER_JOB = 4
+SPLIT_SIZE = 64 << 20   # файлы больше этого режутся на куски (чётное число)
+BATCH_FILES = 64        # максимум файлов в одной пачке
+BATCH_BYTES = 16 << 20  # максимум байт в одной пачке
+
+
+def _hash_batch(paths, algorithms=DEFAULT):
+    """Задание для пула: хэши пачки файлов, для ошибок - текст ошибки."""
+    result = []
+    for path in paths:
+        try:
+            result.append((file_digest(path, algorithms)[0], None))
+        except Exception as e:  # как в scanner.scan_dir: ошибка одного файла не роняет пачку
+            result.append((None, str(e)))
+    return result
+
+
+def _split(size, split_size, start=0):
+    """Разбивает [start, size) на куски с чётными границами."""
+    split_size &= ~1
+    return [(offset, min(split_size, size - offset)) for offset in range(start, size, split_size)]
+
+
+def scan_parallel(root, ignore_file, jobs, cache=None, cache_scanned_ns=0,
+                  paranoid=False, stats=None, chunking=None, algorithms=DEFAULT,
+                  split_size=SPLIT_SIZE, rules=None):
+    """Параллельный аналог scanner.scan_dir (тоже генератор)."""
+    lookup = SortedLookup(cache)
+    if stats is None:
+        stats = {}
+    stats.setdefault("hashed", 0)
+    stats.setdefault("cached", 0)
+    stats.setdefault("errors", 0)
+    splittable = only_xor16(algorithms)
+    pending = deque()  # задания в порядке обхода
+    batch = []
+    batch_bytes = 0
+
+    def hashed(meta):
+        # считаем файл, только когда хэш уже получен
+        stats["hashed"] += 1
+        if metrics.ENABLED:
+            # хэши считают процессы пула - задержку по файлу здесь не видно
+            metrics.inc("integrity_hashed_bytes_total", meta["size"])
+
+    def collect(limit):
+        # отдаём готовые результаты, пока в очереди больше limit заданий
+        while len(pending) > limit:
+            kind, items, futures = pending.popleft()
+            if kind == "batch":
+                results = iter(futures.result() if futures is not None else ())
+                for rel_path, meta, path in items:
+                    if path is not None:  # None - хэш уже взят из кэша
+                        h, err = next(results)
+                        if err is not None:
+                            report_error(rel_path, err, stats)
+                            continue
+                        meta["hash"] = h
+                        hashed(meta)
+                    yield rel_path, meta
+            elif kind == "whole":
+                rel_path, meta = items
+                try:
+                    meta["hash"], chunks = futures.result()
+                except Exception as e:
+                    report_error(rel_path, e, stats)
+                    continue
+                if chunks is not None:
+                    meta["chunks"] = chunks
+                hashed(meta)
+                yield rel_path, meta
+            else:
+                rel_path, meta, reused = items
+                try:
+                    hashes = [f.result() for f in futures]
+                except Exception as e:
+                    report_error(rel_path, e, stats)
+                    continue
+                h = 0
+                for part in hashes:
+                    h ^= part
+                if reused is not None:
+                    meta["chunks"] = reused + hashes
+                    for part in reused:
+                        h ^= part
+                meta["hash"] = h
+                hashed(meta)
+                yield rel_path, meta
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        limit = jobs * QUEUE_PER_JOB
+
+        def flush():
+            nonlocal batch, batch_bytes
+            if batch:
+                paths = [path for _, _, path in batch if path is not None]
+                future = pool.submit(_hash_batch, paths, algorithms) if paths else None
+                pending.append(("batch", batch, future))
+                batch = []
+                batch_bytes = 0
+                yield from collect(limit)
+
+        for rel_path, path, meta in iter_files(root, ignore_file, stats, rules):
+            old = lookup.get(rel_path)
+            chunk_size = chunk_size_for(chunking, meta, old)
+            if not paranoid and cache_hit(old, meta, cache_scanned_ns, chunk_size):
+                take_cached(meta, old)
+                stats["cached"] += 1
+                # кэшированные записи идут в пачку без пути, чтобы не терять порядок
+                batch.append((rel_path, meta, None))
+                if len(batch) >= BATCH_FILES:
+                    yield from flush()
+                continue
+            if not splittable and (chunk_size is not None or meta["size"] > split_size):
+                # не XOR16 - файл целиком в одном процессе, за одно чтение
+                yield from flush()
+                if chunk_size is not None:
+                    meta["chunk_size"] = chunk_size
+                future = pool.submit(file_digest, path, algorithms, chunk_size)
+                pending.append(("whole", (rel_path, meta), future))
+                yield from collect(limit)
+                continue
+            if chunk_size is not None:
+                # поблочный файл: задание на каждый кусок, кроме взятых из манифеста
+                yield from flush()
+                reused = [] if paranoid else reusable_chunks(chunking, meta, old, chunk_size)
+                meta["chunk_size"] = chunk_size
+                futures = [pool.submit(xor16_file_range, path, start, length)
+                           for start, length in _split(meta["size"], chunk_size,
+                                                       len(reused) * chunk_size)]
+                pending.append(("split", (rel_path, meta, list(reused)), futures))
+                yield from collect(limit)
+                continue
+            if meta["size"] > split_size:
+                yield from flush()
+                futures = [pool.submit(xor16_file_range, path, start, length)
+                           for start, length in _split(meta["size"], split_size)]
+                pending.append(("split", (rel_path, meta, None), futures))
+                yield from collect(limit)
+                continue
+            batch.append((rel_path, meta, path))
+            batch_bytes += meta["size"]
+            if len(batch) >= BATCH_FILES or batch_bytes >= BATCH_BYTES:
+                yield from flush()
+        yield from flush()
+        yield from collect(0)
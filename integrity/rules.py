@@ -0,0 +1,248 @@
+"""
+Что обходить: шаблоны в стиле .gitignore, одна файловая система, фильтры
+по размеру и типу файла.
+
+Шаблоны исключения - как в .gitignore:
+
+    *.tmp          файл или каталог с таким именем на любой глубине
+    /build         только build в корне (шаблон с "/" привязан к корню)
+    logs/          только каталоги
+    docs/**/*.pdf  "**" - любое число каталогов
+    !keep.tmp      вернуть то, что исключили правила выше
+
+Побеждает последнее подошедшее правило. Исключённый каталог не обходится
+вовсе (как и в git, файлы внутри него "!" уже не вернёт) - поэтому .git или
+node_modules с миллионами файлов не стоят ни одного readdir/stat.
+Шаблоны включения (include) отбирают файлы: если они заданы, в манифест
+попадают только подошедшие под один из них.
+
+Все шаблоны компилируются один раз: подряд идущие правила одного вида
+склеиваются в одно регулярное выражение. Сначала проверяется путь, потом
+тип по DirEntry, и только затем делается stat - для размера.
+
+one_filesystem - не переходить в каталоги другой файловой системы
+(смонтированные NFS, /proc и т. п.), как find -xdev.
+types - какие файлы брать: file (обычные), symlink (ссылки на файлы),
+other (FIFO, сокеты, устройства - чтение FIFO может повиснуть).
+
+Правила записываются в заголовок манифеста и при проверке берутся оттуда,
+иначе исключённые файлы выглядели бы удалёнными.
+"""
+
+import os
+import re
+import stat
+
+from .chunks import parse_size
+
+DEFAULT_EXCLUDES = (".git/", ".hg/", ".svn/", "node_modules/", "__pycache__/",
+                    ".cache/", ".tox/", ".venv/", ".mypy_cache/", ".pytest_cache/")
+TYPES = ("file", "symlink", "other")
+
+
+def _glob(part):
+    """Один компонент пути (без "/") -> регулярное выражение."""
+    out = []
+    i = 0
+    while i < len(part):
+        c = part[i]
+        i += 1
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "\\" and i < len(part):
+            out.append(re.escape(part[i]))
+            i += 1
+        elif c == "[":
+            start = i + 1 if part[i:i + 1] in ("!", "^") else i
+            end = part.find("]", start + 1)  # "]" сразу после "[" - буква класса
+            if end < 0:
+                out.append(re.escape(c))
+                continue
+            body = part[i:end].replace("\\", "\\\\")
+            if body[:1] in ("!", "^"):
+                # как и "*", класс не переходит через "/"
+                out.append(f"(?!/)[^{body[1:]}]")
+            else:
+                out.append(f"[{body}]")
+            i = end + 1
+        else:
+            out.append(re.escape(c))
+    return "".join(out)
+
+
+def translate(pattern):
+    """Строка .gitignore -> (регулярное выражение, исключение ли, только каталоги).
+
+    None для пустых строк и комментариев.
+    """
+    pattern = pattern.rstrip("\n")
+    if not pattern.strip() or pattern.startswith("#"):
+        return None
+    negate = pattern.startswith("!")
+    if negate:
+        pattern = pattern[1:]
+    if pattern.startswith("\\"):
+        pattern = pattern[1:]  # \! и \# - буквально
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    if "/" in pattern:
+        pattern = pattern.lstrip("/")
+    else:
+        pattern = "**/" + pattern  # без "/" - имя на любой глубине
+    parts = pattern.split("/")
+    regex = []
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            regex.append(".*" if last else "(?:.*/)?")
+        else:
+            regex.append(_glob(part) + ("" if last else "/"))
+    return "".join(regex), negate, dir_only
+
+
+def _compile(patterns):
+    """[(regex, исключение ли, только каталоги)] в обратном порядке, подряд идущие одного вида - вместе."""
+    runs = []
+    for pattern in patterns:
+        rule = translate(pattern)
+        if rule is None:
+            continue
+        regex, negate, dir_only = rule
+        if runs and runs[-1][1:] == (negate, dir_only):
+            runs[-1][0].append(regex)
+        else:
+            runs.append(([regex], negate, dir_only))
+    return [(re.compile("|".join(f"(?:{r})" for r in regexes), re.DOTALL), negate, dir_only)
+            for regexes, negate, dir_only in reversed(runs)]
+
+
+def read_patterns(path):
+    """Строки файла в формате .gitignore."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\r\n") for line in f]
+
+
+class Rules:
+    """Скомпилированные правила обхода; один объект на весь обход."""
+
+    def __init__(self, exclude=(), include=(), one_filesystem=False,
+                 min_size=None, max_size=None, types=None):
+        self.exclude = list(exclude)
+        self.include = list(include)
+        self.one_filesystem = one_filesystem
+        self.min_size = min_size
+        self.max_size = max_size
+        self.types = tuple(types) if types else None
+        unknown = set(self.types or ()) - set(TYPES)
+        if unknown:
+            raise ValueError(f"неизвестный тип файла: {', '.join(sorted(unknown))} "
+                             f"(есть: {', '.join(TYPES)})")
+        self._exclude = _compile(self.exclude)
+        included = [rule[0] for rule in map(translate, self.include) if rule is not None]
+        self._include = (re.compile("|".join(f"(?:{r})" for r in included), re.DOTALL)
+                         if included else None)
+
+    def to_dict(self) -> dict:
+        """Для заголовка манифеста."""
+        return {"exclude": self.exclude, "include": self.include,
+                "one_filesystem": self.one_filesystem, "min_size": self.min_size,
+                "max_size": self.max_size, "types": list(self.types) if self.types else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return None
+        return cls(data.get("exclude", ()), data.get("include", ()),
+                   data.get("one_filesystem", False), data.get("min_size"),
+                   data.get("max_size"), data.get("types"))
+
+    def excluded(self, rel_path, is_dir=False) -> bool:
+        """Исключают ли шаблоны путь (относительно корня)."""
+        if os.sep != "/":
+            rel_path = rel_path.replace(os.sep, "/")
+        for regex, negate, dir_only in self._exclude:
+            if dir_only and not is_dir:
+                continue
+            if regex.fullmatch(rel_path):
+                return not negate
+        return False
+
+    def root_device(self, root):
+        """st_dev корня для one_filesystem (None, если не нужен)."""
+        return os.stat(root).st_dev if self.one_filesystem else None
+
+    def prune(self, rel_path, entry, root_dev=None) -> bool:
+        """Не заходить в каталог: исключён шаблоном или на другой файловой системе."""
+        if self.excluded(rel_path, True):
+            return True
+        if root_dev is not None:
+            try:
+                return entry.stat(follow_symlinks=False).st_dev != root_dev
+            except OSError:
+                return False  # ошибку сообщит обход каталога
+        return False
+
+    def wants(self, rel_path, is_symlink=False) -> bool:
+        """Брать ли файл - то, что видно без stat: шаблоны и ссылка ли это."""
+        if self._exclude and self.excluded(rel_path):
+            return False
+        if self._include is not None:
+            path = rel_path if os.sep == "/" else rel_path.replace(os.sep, "/")
+            if not self._include.fullmatch(path):
+                return False
+        if self.types is not None and is_symlink:
+            return "symlink" in self.types
+        return True
+
+    def accepts(self, st, is_symlink=False) -> bool:
+        """Брать ли файл по результату stat: размер и тип."""
+        if self.min_size is not None and st.st_size < self.min_size:
+            return False
+        if self.max_size is not None and st.st_size > self.max_size:
+            return False
+        if self.types is not None and not is_symlink:
+            return ("file" if stat.S_ISREG(st.st_mode) else "other") in self.types
+        return True
+
+
+def parse_types(text):
+    """"file,symlink" -> ("file", "symlink")."""
+    return tuple(name.strip().lower() for name in text.split(",") if name.strip())
+
+
+def add_arguments(parser):
+    """Флаги правил обхода для argparse (общие у CLI и infolaba1.py)."""
+    parser.add_argument("--exclude", action="append", default=[], metavar="PATTERN",
+                        help="не обходить пути по шаблону .gitignore (можно несколько раз)")
+    parser.add_argument("--exclude-from", action="append", default=[], metavar="FILE",
+                        help="шаблоны исключения из файла в формате .gitignore")
+    parser.add_argument("--default-excludes", action="store_true",
+                        help="исключить " + ", ".join(DEFAULT_EXCLUDES))
+    parser.add_argument("--include", action="append", default=[], metavar="PATTERN",
+                        help="брать только файлы по шаблону (можно несколько раз)")
+    parser.add_argument("--one-file-system", action="store_true",
+                        help="не переходить в каталоги других файловых систем")
+    parser.add_argument("--min-size", type=parse_size, metavar="SIZE",
+                        help="пропускать файлы меньше SIZE")
+    parser.add_argument("--max-size", type=parse_size, metavar="SIZE",
+                        help="пропускать файлы больше SIZE")
+    parser.add_argument("--type", type=parse_types, metavar="TYPES",
+                        help="какие файлы брать через запятую: file, symlink, other")
+
+
+def from_args(args):
+    """Rules из флагов add_arguments или None, если ни один не задан.
+
+    Правила действуют при создании манифеста; при проверке берутся из него.
+    """
+    exclude = list(DEFAULT_EXCLUDES) if args.default_excludes else []
+    for path in args.exclude_from:
+        exclude.extend(read_patterns(path))
+    exclude.extend(args.exclude)
+    if not (exclude or args.include or args.one_file_system or args.type
+            or args.min_size is not None or args.max_size is not None):
+        return None
+    return Rules(exclude, args.include, args.one_file_system, args.min_size, args.max_size,
+                 args.type)
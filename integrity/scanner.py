@@ -0,0 +1,201 @@
+"""
+Обход каталога и подсчёт хэшей.
+
+Файлы выдаются потоком в порядке manifest.path_key, поэтому результат можно
+сразу писать в манифест и сливать со старым без словарей в памяти.
+
+Если передан кэш (поток записей старого манифеста), файл сначала stat-ится и
+перехэшируется, только если поменялись size/mtime_ns/ino/dev.
+paranoid=True отключает кэш и считает всё заново.
+
+chunking (chunks.ChunkPolicy) включает поблочные хэши для больших файлов,
+algorithms (digests.py) - какими алгоритмами хэшировать, по умолчанию XOR16,
+rules (rules.py) - какие каталоги не обходить и какие файлы пропускать.
+"""
+
+import os
+import sys
+import time
+
+import metrics
+from xor16 import xor16_file, xor16_file_chunks
+
+from .chunks import chunk_size_for, fold, reusable_chunks
+from .digests import DEFAULT, file_digest, only_xor16
+from .manifest import CHUNK_FIELDS, STAT_FIELDS, path_key, stat_entry
+
+# файлы, изменённые не раньше чем за это время до прошлого сканирования,
+# могли поменяться в том же тике mtime - им не доверяем (как "racy" в git)
+RACY_NS = 2_000_000_000
+
+_hash_seconds = metrics.histogram("integrity_hash_seconds")
+_hashed_bytes = metrics.counter("integrity_hashed_bytes_total")
+
+
+def manifest_files(manifest_path):
+    """Файл с хэшами и его временные копии - их при обходе пропускаем."""
+    return {manifest_path, manifest_path + ".tmp",
+            manifest_path + ".new", manifest_path + ".new.tmp"}
+
+
+def report_error(rel_path, err, stats=None):
+    """Сообщает об ошибке чтения в stderr (stdout остаётся под результаты)."""
+    print(f"Ошибка при чтении {rel_path}: {err}", file=sys.stderr)
+    if stats is not None:
+        stats["errors"] = stats.get("errors", 0) + 1
+
+
+def _list_dir(path, root, stats):
+    try:
+        with os.scandir(path) as it:
+            return sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        report_error(os.path.relpath(path, root), e, stats)
+        return []
+
+
+def ignore_set(ignore_file):
+    """Нормализованные пути файла с хэшами и его копий - сравниваются с путями обхода."""
+    return {os.path.abspath(path) for path in manifest_files(ignore_file)}
+
+
+def iter_files(root, ignore_file, stats=None, rules=None):
+    """Обходит дерево через os.scandir, выдаёт (rel_path, путь, stat-запись).
+
+    Порядок - по path_key (каталог обходится сразу на месте своего имени).
+    Как и os.walk, в ссылки на каталоги не заходит. Каталоги, которые
+    rules велят пропустить, не читаются вовсе.
+    """
+    root = os.path.abspath(root)
+    prefix = len(os.path.join(root, ""))  # путь записи = корень + rel_path
+    ignore = ignore_set(ignore_file)
+    root_dev = rules.root_device(root) if rules is not None else None
+    stack = [iter(_list_dir(root, root, stats))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        rel_path = entry.path[prefix:]
+        if is_dir:
+            if entry.is_symlink():
+                continue
+            if rules is None or not rules.prune(rel_path, entry, root_dev):
+                stack.append(iter(_list_dir(entry.path, root, stats)))
+            continue
+        if entry.path in ignore:
+            continue  # пропускаем файл с хэшами
+        if rules is not None and not rules.wants(rel_path, entry.is_symlink()):
+            continue
+        try:
+            st = entry.stat()
+        except OSError as e:
+            report_error(rel_path, e, stats)
+            continue
+        if rules is not None and not rules.accepts(st, entry.is_symlink()):
+            continue
+        yield rel_path, entry.path, stat_entry(st)
+
+
+class SortedLookup:
+    """Поиск в отсортированном потоке записей по возрастающим путям.
+
+    Поток читается один раз, в памяти держится только текущая запись.
+    """
+
+    def __init__(self, records):
+        self._records = iter(records) if records is not None else iter(())
+        self._current = next(self._records, None)
+
+    def get(self, rel_path):
+        key = path_key(rel_path)
+        while self._current is not None and path_key(self._current[0]) < key:
+            self._current = next(self._records, None)
+        if self._current is not None and self._current[0] == rel_path:
+            return self._current[1]
+        return None
+
+
+def cache_hit(old, meta, scanned_ns, chunk_size=None) -> bool:
+    """Можно ли взять хэш из старой записи без чтения файла."""
+    if old is None or "mtime_ns" not in old:
+        return False
+    if any(old[k] != meta[k] for k in STAT_FIELDS):
+        return False
+    if old.get("chunk_size") != chunk_size:
+        return False  # файл стал поблочным - нужны хэши кусков
+    return old["mtime_ns"] + RACY_NS <= scanned_ns
+
+
+def take_cached(meta, old):
+    """Переносит хэш (и хэши кусков) из старой записи в новую."""
+    meta["hash"] = old["hash"]
+    if "chunks" in old:
+        meta.update((k, old[k]) for k in CHUNK_FIELDS)
+
+
+def hash_file(filepath, meta, chunk_size=None, reused=(), algorithms=DEFAULT):
+    """Считает хэш файла в meta; для поблочных файлов - и хэши кусков.
+
+    reused - хэши начальных кусков, которые не нужно перечитывать (только для XOR16).
+    """
+    if not only_xor16(algorithms):
+        meta["hash"], chunks = file_digest(filepath, algorithms, chunk_size)
+        if chunks is not None:
+            meta["chunk_size"] = chunk_size
+            meta["chunks"] = chunks
+        return
+    if chunk_size is None:
+        meta["hash"] = xor16_file(filepath)
+        return
+    chunks = list(reused) + xor16_file_chunks(filepath, chunk_size, len(reused) * chunk_size)
+    meta["chunk_size"] = chunk_size
+    meta["chunks"] = chunks
+    meta["hash"] = fold(chunks)
+
+
+def record_hash(meta, started):
+    """Метрики одного хэшированного файла (metrics.py)."""
+    _hash_seconds(time.perf_counter() - started)
+    _hashed_bytes(meta["size"])
+
+
+def scan_dir(root, ignore_file, cache=None, cache_scanned_ns=0,
+             paranoid=False, stats=None, chunking=None, algorithms=DEFAULT, rules=None):
+    """Обходим каталог и выдаём поток (путь, запись с хэшем и stat).
+
+    cache - поток записей старого манифеста (в порядке path_key), посчитанного
+    теми же algorithms.
+    stats (если передан словарь) получает счётчики "hashed", "cached" и "errors".
+    """
+    lookup = SortedLookup(cache)
+    if stats is None:
+        stats = {}
+    stats.setdefault("hashed", 0)
+    stats.setdefault("cached", 0)
+    stats.setdefault("errors", 0)
+    for rel_path, filepath, meta in iter_files(root, ignore_file, stats, rules):
+        old = lookup.get(rel_path)
+        chunk_size = chunk_size_for(chunking, meta, old)
+        if not paranoid and cache_hit(old, meta, cache_scanned_ns, chunk_size):
+            take_cached(meta, old)
+            stats["cached"] += 1
+        else:
+            reused = []
+            if not paranoid and only_xor16(algorithms):
+                reused = reusable_chunks(chunking, meta, old, chunk_size)
+            if metrics.ENABLED:
+                started = time.perf_counter()
+            try:
+                hash_file(filepath, meta, chunk_size, reused, algorithms)
+            except Exception as e:
+                report_error(rel_path, e, stats)
+                continue
+            stats["hashed"] += 1
+            if metrics.ENABLED:
+                record_hash(meta, started)
+        yield rel_path, meta
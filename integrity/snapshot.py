@@ -0,0 +1,355 @@
+"""
+Двоичный снимок манифеста: таблица записей фиксированной ширины, пул
+строк, необязательное сжатие (zlib, lzma) и подпись HMAC-SHA256.
+
+JSON Lines (manifest.py) при проверке надо разобрать целиком, строка за
+строкой, и его можно незаметно поправить руками. Снимок открывается через
+mmap: загрузка - это чтение заголовка, запись с номером i лежит по
+смещению i * RECORD.size, а записи отсортированы по path_key, так что
+поиск одного пути (find) - двоичный поиск без разбора остального файла.
+
+Формат (числа little-endian):
+
+    HEADER   магия, версия, сжатие, флаги, длина meta, число записей,
+             длина тела в файле, длина тела без сжатия
+    meta     JSON: scanned_ns, algorithms, fields, filters - как заголовок v3
+    тело     таблица записей RECORD подряд, за ней пул строк (сжимаются вместе)
+    подпись  32 байта HMAC, если флаг SIGNED
+
+Запись таблицы: смещение и длина пути в пуле, смещение и длина "extra" в
+пуле, хэш, size, mtime_ns, ino, dev и флаги. Хэш XOR16/CRC - число в самой
+записи; всё, что в 64 бита не помещается (hex-строки sha256, несколько
+алгоритмов, хэши кусков), лежит в extra - JSON {"hash": ..., "chunk_size":
+..., "chunks": [...]}.
+
+Без сжатия таблица читается прямо из mmap. Сжатый снимок меньше на диске,
+но при открытии тело распаковывается в память целиком.
+
+Подпись - HMAC(ключ, заголовок + meta + sha256(тела)). Если ключ передан,
+снимок без подписи или с чужой подписью не открывается (ValueError) - иначе
+подпись можно было бы просто стереть. Проверка подписи читает всё тело, так
+что быстрее всего открывается неподписанный снимок без сжатия.
+Ключ - байты из файла (--key-file) или переменной окружения INTEGRITY_KEY.
+
+lzma, mmap и tempfile импортируются при первом снимке: CLI и api загружают
+этот модуль, даже когда манифест - JSON Lines.
+"""
+
+import hashlib
+import hmac
+import json
+import os
+import struct
+import zlib
+from collections import namedtuple
+
+from .digests import DEFAULT as DEFAULT_ALGORITHMS
+from .manifest import path_key
+
+MAGIC = b"INTSNAP\x00"
+VERSION = 1
+
+HEADER = struct.Struct("<8sBBHIQQQ")
+# смещение пути, длина пути, длина extra, смещение extra, хэш, size, mtime_ns, ino, dev, флаги
+RECORD = struct.Struct("<QIIQQQqQQI4x")
+
+COMPRESSION = ("none", "zlib", "lzma")
+SIGNED = 1
+HAS_STAT = 1
+HASH_EXTRA = 2
+
+ENV_KEY = "INTEGRITY_KEY"
+BLOCK = 1 << 20
+
+SnapshotFormat = namedtuple("SnapshotFormat", "compression key", defaults=("none", None))
+SnapshotFormat.__doc__ = "Как писать манифест снимком: сжатие из COMPRESSION и ключ HMAC (или None)."
+
+
+def is_snapshot(path) -> bool:
+    """Снимок ли это (по магии в начале файла)."""
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def load_key(path=None):
+    """Ключ HMAC из файла или из INTEGRITY_KEY; None, если не задан."""
+    if path:
+        with open(path, "rb") as f:
+            key = f.read().rstrip(b"\r\n")
+        if not key:
+            raise ValueError(f"пустой ключ в {path}")
+        return key
+    value = os.environ.get(ENV_KEY)
+    return value.encode("utf-8") if value else None
+
+
+def _compressor(compression):
+    if compression == "zlib":
+        return zlib.compressobj(6)
+    if compression == "lzma":
+        import lzma
+        return lzma.LZMACompressor()
+    if compression != "none":
+        raise ValueError(f"неизвестное сжатие: {compression} (есть: {', '.join(COMPRESSION)})")
+    return None
+
+
+def _decompress(compression, data):
+    import lzma
+    try:
+        if compression == "zlib":
+            return zlib.decompress(data)
+        return lzma.decompress(data)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"снимок повреждён: {e}") from None
+
+
+def _sign(key, header, meta, body_digest):
+    return hmac.new(key, header + meta + body_digest, hashlib.sha256).digest()
+
+
+def _pack(entry, name_off, name_len, extra_off, extra_len):
+    value = entry["hash"]
+    flags = 0
+    if isinstance(value, int) and 0 <= value < 1 << 64:
+        number = value
+    else:
+        number = 0
+        flags |= HASH_EXTRA
+    if "mtime_ns" in entry:
+        flags |= HAS_STAT
+        stat = (entry["size"], entry["mtime_ns"], entry["ino"], entry["dev"])
+    else:
+        stat = (0, 0, 0, 0)
+    return RECORD.pack(name_off, name_len, extra_len, extra_off, number, *stat, flags)
+
+
+def _extra(entry):
+    extra = {}
+    value = entry["hash"]
+    if not (isinstance(value, int) and 0 <= value < 1 << 64):
+        extra["hash"] = value
+    if "chunks" in entry and "mtime_ns" in entry:
+        extra["chunk_size"] = entry["chunk_size"]
+        extra["chunks"] = entry["chunks"]
+    return json.dumps(extra, separators=(",", ":")).encode("utf-8") if extra else b""
+
+
+def write_snapshot(path, records, meta, compression="none", key=None) -> int:
+    """Пишет поток (путь, запись) в снимок, возвращает число записей.
+
+    meta - заголовок манифеста (scanned_ns, algorithms, ...). Записи должны
+    идти в порядке path_key. Таблица пишется сразу, пул строк копится во
+    временном файле и дописывается в конце. Файл заменяется атомарно.
+    """
+    import tempfile
+    compressor = _compressor(compression)
+    code = COMPRESSION.index(compression)
+    meta_bytes = json.dumps(meta).encode("utf-8")
+    body = hashlib.sha256()
+    sizes = {"raw": 0, "stored": 0}
+    tmp = path + ".tmp"
+    count = 0
+    f = open(tmp, "wb")
+    try:
+        with f, tempfile.TemporaryFile() as pool:
+
+            def emit(data):
+                sizes["raw"] += len(data)
+                if compressor is not None:
+                    data = compressor.compress(data)
+                body.update(data)
+                f.write(data)
+                sizes["stored"] += len(data)
+
+            f.write(bytes(HEADER.size))
+            f.write(meta_bytes)
+            table = bytearray()
+            offset = 0
+            for rel_path, entry in records:
+                name = rel_path.encode("utf-8", "surrogateescape")
+                extra = _extra(entry)
+                table += _pack(entry, offset, len(name), offset + len(name), len(extra))
+                pool.write(name)
+                pool.write(extra)
+                offset += len(name) + len(extra)
+                count += 1
+                if len(table) >= BLOCK:
+                    emit(bytes(table))
+                    table.clear()
+            emit(bytes(table))
+            pool.seek(0)
+            for block in iter(lambda: pool.read(BLOCK), b""):
+                emit(block)
+            if compressor is not None:
+                tail = compressor.flush()
+                body.update(tail)
+                f.write(tail)
+                sizes["stored"] += len(tail)
+            header = HEADER.pack(MAGIC, VERSION, code, SIGNED if key else 0, len(meta_bytes),
+                                 count, sizes["stored"], sizes["raw"])
+            if key:
+                f.write(_sign(key, header, meta_bytes, body.digest()))
+            f.seek(0)
+            f.write(header)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    os.replace(tmp, path)
+    return count
+
+
+def _meta(path, data):
+    try:
+        return json.loads(data)
+    except ValueError:
+        raise ValueError(f"{path}: снимок повреждён (заголовок)") from None
+
+
+def read_meta(path) -> dict:
+    """Заголовок снимка (без проверки подписи): meta плюс format, compression, signed."""
+    with open(path, "rb") as f:
+        magic, version, code, flags, meta_len, count = HEADER.unpack(f.read(HEADER.size))[:6]
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: не снимок манифеста версии {VERSION}")
+        meta = _meta(path, f.read(meta_len))
+    meta.setdefault("algorithms", list(DEFAULT_ALGORITHMS))
+    meta.update(format="snapshot", compression=COMPRESSION[code], signed=bool(flags & SIGNED),
+                count=count)
+    return meta
+
+
+class Snapshot:
+    """Открытый снимок: len(), итерация (путь, запись) в порядке path_key,
+    record(i) и find(путь) - двоичным поиском.
+
+    key - ключ HMAC: с ним подпись обязательна и проверяется при открытии.
+    """
+
+    def __init__(self, path, key=None):
+        import mmap
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # пустой файл
+            self._file.close()
+            raise ValueError(f"{path}: не снимок манифеста")
+        try:
+            self._open(key)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, key):
+        mm = self._map
+        if len(mm) < HEADER.size:
+            raise ValueError(f"{self.path}: не снимок манифеста")
+        header = mm[:HEADER.size]
+        magic, version, code, flags, meta_len, count, stored, raw = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION or code >= len(COMPRESSION):
+            raise ValueError(f"{self.path}: не снимок манифеста версии {VERSION}")
+        start = HEADER.size + meta_len
+        end = start + stored
+        signed = bool(flags & SIGNED)
+        if len(mm) != end + (hashlib.sha256().digest_size if signed else 0):
+            raise ValueError(f"{self.path}: снимок обрезан или повреждён")
+        meta_bytes = mm[HEADER.size:start]
+        self.meta = _meta(self.path, meta_bytes)
+        self.compression = COMPRESSION[code]
+        self.signed = signed
+        self.count = count
+        if key is not None:
+            if not signed:
+                raise ValueError(f"{self.path}: снимок не подписан")
+            with memoryview(mm) as view:
+                digest = hashlib.sha256(view[start:end]).digest()
+            if not hmac.compare_digest(mm[end:], _sign(key, header, meta_bytes, digest)):
+                raise ValueError(f"{self.path}: подпись не сходится - снимок изменён "
+                                 "или ключ не тот")
+        if code == 0:
+            self._data, self._base = mm, start
+        else:
+            with memoryview(mm) as view:
+                stored_body = view[start:end]
+                try:
+                    self._data = _decompress(self.compression, stored_body)
+                finally:
+                    stored_body.release()
+            self._base = 0
+            if len(self._data) != raw:
+                raise ValueError(f"{self.path}: снимок повреждён")
+        self._pool = self._base + count * RECORD.size
+
+    @property
+    def scanned_ns(self):
+        return self.meta.get("scanned_ns", 0)
+
+    def __len__(self):
+        return self.count
+
+    def _path(self, i):
+        name_off, name_len = RECORD.unpack_from(self._data, self._base + i * RECORD.size)[:2]
+        start = self._pool + name_off
+        return self._data[start:start + name_len].decode("utf-8", "surrogateescape")
+
+    def record(self, i):
+        """Запись с номером i: (путь, запись манифеста)."""
+        (name_off, name_len, extra_len, extra_off, number, size, mtime_ns, ino, dev,
+         flags) = RECORD.unpack_from(self._data, self._base + i * RECORD.size)
+        start = self._pool + name_off
+        rel_path = self._data[start:start + name_len].decode("utf-8", "surrogateescape")
+        entry = {"hash": number}
+        if flags & HAS_STAT:
+            entry.update(size=size, mtime_ns=mtime_ns, ino=ino, dev=dev)
+        if extra_len:
+            start = self._pool + extra_off
+            entry.update(json.loads(self._data[start:start + extra_len]))
+        return rel_path, entry
+
+    def __iter__(self):
+        # таблица читается блоками и разбирается iter_unpack - быстрее, чем record(i) по одной
+        data, pool, step = self._data, self._pool, BLOCK // RECORD.size
+        for first in range(0, self.count, step):
+            start = self._base + first * RECORD.size
+            block = data[start:start + min(step, self.count - first) * RECORD.size]
+            for (name_off, name_len, extra_len, extra_off, number, size, mtime_ns, ino, dev,
+                 flags) in RECORD.iter_unpack(block):
+                start = pool + name_off
+                entry = {"hash": number}
+                if flags & HAS_STAT:
+                    entry["size"] = size
+                    entry["mtime_ns"] = mtime_ns
+                    entry["ino"] = ino
+                    entry["dev"] = dev
+                if extra_len:
+                    extra = pool + extra_off
+                    entry.update(json.loads(data[extra:extra + extra_len]))
+                yield data[start:start + name_len].decode("utf-8", "surrogateescape"), entry
+
+    def find(self, rel_path):
+        """Запись пути или None - O(log n) чтений, остальное не разбирается."""
+        target = path_key(rel_path)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if path_key(self._path(mid)) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self._path(lo) == rel_path:
+            return self.record(lo)[1]
+        return None
+
+    def close(self):
+        self._data = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,303 @@
+"""
+Режим наблюдения (--watch, только Linux).
+
+Вместо периодического полного обхода подписываемся на inotify (через ctypes)
+и перехэшируем только затронутые файлы. События копятся, пока не наступит
+пауза DEBOUNCE или не пройдёт MAX_DELAY с первого события, затем пачка
+обрабатывается разом - так серия записей в один файл даёт одно перехэширование.
+
+Каждое изменение сразу печатается строкой JSON:
+    {"time": ..., "event": "changed", "path": "a/b.txt", "hash": ..., "old_hash": ...}
+
+Манифест держится в памяти ({путь: запись}) и сбрасывается на диск не чаще
+раза в FLUSH_INTERVAL секунд и при выходе. В режиме наблюдения манифест
+отражает текущее состояние каталога, а изменения фиксируются в выводе.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from contextlib import ExitStack
+
+from .chunks import changed_ranges, chunk_size_for
+from .compare import ADDED, CHANGED, DELETED
+from .digests import DEFAULT
+from .manifest import open_manifest, path_key, read_header, stat_entry, write_manifest
+from .rules import Rules
+from .scanner import hash_file, manifest_files, report_error, scan_dir
+from .snapshot import SnapshotFormat
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+              | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+
+DEBOUNCE = 0.1       # секунд тишины перед обработкой пачки
+MAX_DELAY = 0.5      # но не дольше этого с первого события
+FLUSH_INTERVAL = 10  # как часто сбрасывать манифест на диск
+
+_EVENT = struct.Struct("iIII")
+
+
+class Inotify:
+    """Минимальная обёртка над inotify из libc."""
+
+    def __init__(self):
+        if not sys.platform.startswith("linux"):
+            raise OSError("режим наблюдения доступен только в Linux (inotify)")
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def read(self, timeout):
+        """Ждёт события не дольше timeout секунд, выдаёт (wd, mask, имя)."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        pos = 0
+        while pos < len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos:pos + length].rstrip(b"\0"))
+            pos += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _emit(event, rel_path, new=None, old=None):
+    rec = {"time": time.time(), "event": event, "path": rel_path}
+    if new is not None:
+        rec["hash"] = new["hash"]
+    if old is not None:
+        rec["old_hash"] = old["hash"]
+    if new is not None and old is not None:
+        ranges = changed_ranges(old, new)
+        if ranges is not None:
+            rec["ranges"] = ranges
+    print(json.dumps(rec, ensure_ascii=False), flush=True)
+
+
+class Watcher:
+    """Следит за каталогом и поддерживает манифест в актуальном состоянии."""
+
+    def __init__(self, root, manifest_path, key=None):
+        self.root = root
+        self.manifest_path = manifest_path
+        self.key = key
+        self.ignore = manifest_files(manifest_path)
+        self.inotify = Inotify()
+        self.dirs = {}       # wd -> путь каталога
+        self.entries = {}    # путь -> запись манифеста
+        self.touched = set()
+        self.dirty = False
+        self.algorithms = DEFAULT
+        self.filters = None
+        self.snapshot = SnapshotFormat("none", key) if key is not None else None
+        if os.path.exists(manifest_path):
+            header = read_header(manifest_path)
+            self.algorithms = tuple(header["algorithms"])
+            self.filters = header.get("filters")
+            if header.get("format") == "snapshot":
+                self.snapshot = SnapshotFormat(header["compression"], key)
+        self.rules = Rules.from_dict(self.filters)
+        self.root_dev = self.rules.root_device(root) if self.rules is not None else None
+
+    def watch_tree(self, top):
+        """Ставит наблюдение на каталог и все подкаталоги, возвращает найденные файлы
+        (кроме файла с хэшами)."""
+        files = []
+        if self.rules is not None and top != self.root and self._pruned(top):
+            return files
+        for current_dir, dirnames, filenames in os.walk(top):
+            try:
+                self.dirs[self.inotify.add_watch(current_dir)] = current_dir
+            except OSError as e:
+                report_error(os.path.relpath(current_dir, self.root), e)
+                dirnames[:] = []
+                continue
+            if self.rules is not None:
+                # исключённые каталоги os.walk не обходит, наблюдение на них не ставится
+                dirnames[:] = [name for name in dirnames
+                               if not self._pruned(os.path.join(current_dir, name))]
+            files.extend(path for path in (os.path.join(current_dir, name) for name in filenames)
+                         if path not in self.ignore)
+        return files
+
+    def _pruned(self, path):
+        rel_path = os.path.relpath(path, self.root)
+        if self.rules.excluded(rel_path, True):
+            return True
+        try:
+            return self.root_dev is not None and os.lstat(path).st_dev != self.root_dev
+        except OSError:
+            return False
+
+    def _wanted(self, rel_path, path, st):
+        """Берётся ли файл по правилам обхода (то же, что в iter_files)."""
+        if self.rules is None:
+            return True
+        is_symlink = os.path.islink(path)
+        return self.rules.wants(rel_path, is_symlink) and self.rules.accepts(st, is_symlink)
+
+    def load(self):
+        """Синхронизирует манифест с диском перед началом наблюдения.
+
+        Наблюдение ставится до обхода, поэтому изменения во время обхода не теряются.
+        """
+        self.watch_tree(self.root)
+        started = time.time_ns()
+        if os.path.exists(self.manifest_path):
+            with ExitStack() as streams:
+                scanned_ns, cache = open_manifest(self.manifest_path, self.key)
+                streams.callback(cache.close)
+                _, old = open_manifest(self.manifest_path, self.key)
+                streams.callback(old.close)
+                self.entries = dict(old)
+                current = dict(scan_dir(self.root, self.manifest_path, cache, scanned_ns,
+                                        algorithms=self.algorithms, rules=self.rules))
+            for rel_path in self.entries.keys() - current.keys():
+                _emit(DELETED, rel_path, old=self.entries[rel_path])
+            for rel_path, entry in current.items():
+                old_entry = self.entries.get(rel_path)
+                if old_entry is None:
+                    _emit(ADDED, rel_path, new=entry)
+                elif old_entry["hash"] != entry["hash"]:
+                    _emit(CHANGED, rel_path, new=entry, old=old_entry)
+            self.entries = current
+        else:
+            self.entries = dict(scan_dir(self.root, self.manifest_path,
+                                         algorithms=self.algorithms, rules=self.rules))
+        self.flush(started)
+
+    def flush(self, scanned_ns=None):
+        """Пишет манифест на диск (отсортированным потоком)."""
+        if scanned_ns is None:
+            scanned_ns = time.time_ns()
+        records = ((p, self.entries[p]) for p in sorted(self.entries, key=path_key))
+        write_manifest(self.manifest_path, records, scanned_ns, self.algorithms, self.filters,
+                       self.snapshot)
+        self.dirty = False
+
+    def handle(self, wd, mask, name):
+        if mask & IN_Q_OVERFLOW:
+            # очередь переполнена - события потеряны, проверяем всё по stat
+            self.touched.update(self.entries)
+            for path in self.watch_tree(self.root):
+                self.touched.add(os.path.relpath(path, self.root))
+            return
+        directory = self.dirs.get(wd)
+        if directory is None:
+            return
+        if mask & (IN_IGNORED | IN_DELETE_SELF):
+            if mask & IN_IGNORED:
+                del self.dirs[wd]
+            return
+        path = os.path.join(directory, name)
+        if path in self.ignore:
+            return
+        rel_path = os.path.relpath(path, self.root)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                for file_path in self.watch_tree(path):
+                    self.touched.add(os.path.relpath(file_path, self.root))
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                prefix = rel_path + os.sep
+                self.touched.update(p for p in self.entries if p.startswith(prefix))
+            return
+        self.touched.add(rel_path)
+
+    def process(self):
+        """Перехэширует затронутые файлы и сообщает об изменениях."""
+        for rel_path in sorted(self.touched, key=path_key):
+            path = os.path.join(self.root, rel_path)
+            old = self.entries.get(rel_path)
+            try:
+                st = os.stat(path)
+                if not os.path.isfile(path) or not self._wanted(rel_path, path, st):
+                    raise FileNotFoundError(path)  # для манифеста файла нет
+                meta = stat_entry(st)
+                hash_file(path, meta, chunk_size_for(None, meta, old), (), self.algorithms)
+            except FileNotFoundError:
+                if old is not None:
+                    del self.entries[rel_path]
+                    self.dirty = True
+                    _emit(DELETED, rel_path, old=old)
+                continue
+            except OSError as e:
+                report_error(rel_path, e)
+                continue
+            self.entries[rel_path] = meta
+            self.dirty = True
+            if old is None:
+                _emit(ADDED, rel_path, new=meta)
+            elif old["hash"] != meta["hash"]:
+                _emit(CHANGED, rel_path, new=meta, old=old)
+        self.touched.clear()
+
+    def run(self):
+        self.load()
+        last_flush = time.monotonic()
+        first_event = None
+        try:
+            while True:
+                timeout = None
+                if first_event is not None:
+                    timeout = min(DEBOUNCE, max(0.0, first_event + MAX_DELAY - time.monotonic()))
+                elif self.dirty:
+                    timeout = max(0.0, last_flush + FLUSH_INTERVAL - time.monotonic())
+                events = self.inotify.read(timeout)
+                for wd, mask, name in events:
+                    self.handle(wd, mask, name)
+                now = time.monotonic()
+                if self.touched and first_event is None:
+                    first_event = now
+                if first_event is not None and (not events or now - first_event >= MAX_DELAY):
+                    self.process()
+                    first_event = None
+                if self.dirty and now - last_flush >= FLUSH_INTERVAL:
+                    self.flush()
+                    last_flush = now
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if self.touched:
+                self.process()
+            if self.dirty:
+                self.flush()
+            self.inotify.close()
+
+
+def watch(root, manifest_path, key=None):
+    """Запускает наблюдение за каталогом до Ctrl+C."""
+    Watcher(root, manifest_path, key).run()
@@ -1,31 +1,122 @@
-def decode_message(container_path, output_path):
-    with open(container_path, 'r', encoding='windows-1251') as f:
-        lines = [line.rstrip('\n') for line in f.readlines()]
-
-    bits = []
-    for line in lines:
-        if line.endswith(' '):
-            bits.append('1')
-        else:
-            bits.append('0')
-
-    message_bytes = []
-    for i in range(0, len(bits), 8):
-        byte_bits = bits[i:i + 8]
-        if len(byte_bits) < 8:
+from stego.codecs import DEFAULT, get_codec
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+BLOCK_SIZE = 64 * 1024
+
+# 0/1 -> '0'/'1'
+_BITS_ASCII = bytes.maketrans(b'\x00\x01', b'01')
+
+
+def take_bytes(blocks, count, head=b''):
+    # ровно count байт (или меньше, если блоки кончились), без остановки на нуле;
+    # head - остаток от прошлого вызова. Возвращает (байты, новый остаток)
+    parts = [head]
+    size = len(head)
+    while size < count:
+        block = next(blocks, None)
+        if block is None:
             break
-        byte = int(''.join(byte_bits), 2)
-        if byte == 0:
+        parts.append(block)
+        size += len(block)
+    data = b''.join(parts)
+    return data[:count], data[count:]
+
+
+def _pack_int(bits):
+    # все биты блока сразу: разбираем как двоичную запись одного большого числа
+    return int(bits.translate(_BITS_ASCII), 2).to_bytes(len(bits) // 8, 'big')
+
+
+def _pack_numpy(bits):
+    return np.packbits(np.frombuffer(bits, dtype=np.uint8)).tobytes()
+
+
+_pack = _pack_numpy if np is not None else _pack_int
+
+
+def pack_bits(bits):
+    # bits - по байту 0/1 на бит, длина кратна 8; старший бит первым
+    if not bits:
+        return b''
+    return _pack(bits)
+
+
+def _space_mask_int(data):
+    # data - байт перед блоком + сам блок; бит строки - пробел ли перед её '\n'
+    lines = data.split(b'\n')[:-1]
+    if data[:1] == b'\n':
+        del lines[:1]  # '\n' предыдущего блока - строка уже посчитана
+    return bytes(line[-1:] == b' ' for line in lines)
+
+
+def _space_mask_numpy(data):
+    arr = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero(arr[1:] == 10)  # arr[ends] - последний байт перед '\n'
+    return (arr[ends] == 32).view(np.uint8).tobytes()
+
+
+_space_mask = _space_mask_numpy if np is not None else _space_mask_int
+
+
+def iter_space_bit_blocks(f, block_size=BLOCK_SIZE):
+    # биты схемы по умолчанию прямо из байт контейнера (f открыт в 'rb'), блоками.
+    # Переводы строк - как в текстовом режиме: \r\n и одиночный \r считаются за \n.
+    # Пробел и перевод строки в windows-1251 - однобайтные, так что декодировать не нужно.
+    prev = b'\n'  # последний байт предыдущего блока; '\n' - начало строки
+    held = b''   # '\r' в конце блока: может оказаться половиной \r\n
+    while True:
+        block = f.read(block_size)
+        if not block:
             break
-        message_bytes.append(byte)
+        block = held + block
+        held = b''
+        if block.endswith(b'\r'):
+            held = b'\r'
+            block = block[:-1]
+        if b'\r' in block:
+            block = block.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        if block:
+            yield _space_mask(prev[-1:] + block)
+            prev = block
+    if held:
+        yield _space_mask(prev[-1:] + b'\n')
+    elif prev[-1:] != b'\n':
+        yield bytes([prev[-1:] == b' '])  # последняя строка без перевода строки
 
-    with open(output_path, 'wb') as f:
-        f.write(bytes(message_bytes))
 
+def iter_space_blocks(f, block_size=BLOCK_SIZE):
+    # байты схемы по умолчанию блоками; неполный последний байт отбрасывается
+    rest = b''  # биты неполного байта с прошлого блока
+    for bits in iter_space_bit_blocks(f, block_size):
+        bits = rest + bits
+        whole = len(bits) // 8 * 8
+        rest = bits[whole:]
+        if whole:
+            yield pack_bits(bits[:whole])
+
+
+def decode_message(container_path, output_path, codec=DEFAULT):
+    if codec == DEFAULT:
+        container = open(container_path, 'rb')
+        blocks = iter_space_blocks(container)
+    else:
+        container = open(container_path, 'r', encoding='windows-1251', buffering=BLOCK_SIZE)
+        blocks = get_codec(codec).iter_bytes(container, BLOCK_SIZE)
+    with container, open(output_path, 'wb') as out:
+        for data in blocks:
+            # на нулевом байте останавливаемся и дальше контейнер не читаем
+            end = data.find(0)
+            if end >= 0:
+                out.write(data[:end])
+                return
+            out.write(data)
 
 if __name__ == '__main__':
     container = input("Путь к контейнеру: ")
     output = input("Путь для извлеченного сообщения: ")
     decode_message(container, output)
     print("Сообщение извлечено!")
-
@@ -1,27 +1,113 @@
-def encode_message(container_path, message_path, output_path):
-    with open(message_path, 'rb') as f:
-        message = f.read()
+import os
+from itertools import chain, islice
 
-    bits = []
-    for byte in message:
-        bits.extend(f'{byte:08b}')
+from stego.codecs import DEFAULT, get_codec
 
-    with open(container_path, 'r', encoding='windows-1251') as f:
-        lines = f.readlines()
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
 
-    if len(bits) > len(lines):
-        raise ValueError("Контейнер слишком мал для сообщения")
+BLOCK_SIZE = 64 * 1024
+BATCH_LINES = 4096
+BITS_BLOCK = 1024  # байт сообщения за раз: 8192 бита - столько же строк контейнера в памяти
 
-    result = []
-    for i, line in enumerate(lines):
-        line = line.rstrip('\n')
-        if i < len(bits) and bits[i] == '1':
-            line += ' '
-        result.append(line)
+# '0'/'1' -> 0/1
+_ASCII_BITS = bytes.maketrans(b'01', b'\x00\x01')
 
-    with open(output_path, 'w', encoding='windows-1251') as f:
-        f.write('\n'.join(result))
 
+def _unpack_int(data):
+    # все биты блока сразу: двоичная запись одного большого числа
+    return format(int.from_bytes(data, 'big'), f'0{len(data) * 8}b').encode('ascii').translate(_ASCII_BITS)
+
+
+def _unpack_numpy(data):
+    return np.unpackbits(np.frombuffer(data, dtype=np.uint8)).tobytes()
+
+
+_unpack = _unpack_numpy if np is not None else _unpack_int
+
+
+def unpack_bits(data):
+    # биты данных старшим вперёд, по байту 0/1 на бит
+    if not data:
+        return b''
+    return _unpack(data)
+
+
+def iter_blocks(f, block_size=BITS_BLOCK):
+    # читаем сообщение блоками, а не целиком
+    while True:
+        block = f.read(block_size)
+        if not block:
+            return
+        yield block
+
+
+def iter_data_blocks(data, block_size=BITS_BLOCK):
+    for i in range(0, len(data), block_size):
+        yield data[i:i + block_size]
+
+
+def encode_lines(lines, blocks):
+    # на каждый блок бит - столько же строк контейнера (без '\n'), пробел в конце, если бит 1
+    lines = iter(lines)
+    for bits in blocks:
+        batch = list(islice(lines, len(bits)))
+        if len(batch) < len(bits):
+            raise ValueError("Контейнер слишком мал для сообщения")
+        yield [line.rstrip('\n') + ' ' if bit else line.rstrip('\n') for line, bit in zip(batch, bits)]
+
+
+def _batched(lines, size=BATCH_LINES):
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, size))
+        if not batch:
+            return
+        yield batch
+
+
+def embed_data(container_path, blocks, output_path, codec=DEFAULT):
+    # blocks - блоки байт сообщения; пишем во временный файл: если контейнер мал, результата не будет вовсе
+    tmp_path = output_path + '.tmp'
+    try:
+        with open(container_path, 'r', encoding='windows-1251', buffering=BLOCK_SIZE) as container, \
+                open(tmp_path, 'w', encoding='windows-1251', buffering=BLOCK_SIZE) as out:
+            # схема по умолчанию - своим быстрым путём, остальные - через stego/codecs.py
+            if codec == DEFAULT:
+                batches = encode_lines(container, map(unpack_bits, blocks))
+            else:
+                batches = _batched(get_codec(codec).encode_lines(container, blocks))
+            sep = ''
+            for batch in batches:
+                out.write(sep + '\n'.join(batch))
+                sep = '\n'
+            # остаток контейнера без изменений, блоками; как и раньше, без '\n' в самом конце
+            tail = ''
+            while True:
+                block = container.read(BLOCK_SIZE)
+                if not block:
+                    break
+                out.write(sep + tail)  # перед остатком - разделитель строк
+                sep = ''
+                tail = block
+            if tail.endswith('\n'):
+                tail = tail[:-1]
+            out.write(tail)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def encode_message(container_path, message_path, output_path, codec=DEFAULT):
+    with open(message_path, 'rb') as message:
+        blocks = iter_blocks(message)
+        if codec != DEFAULT:
+            # нетронутые строки у других кодеков не обязательно читаются нулями - конец сообщения явно
+            blocks = chain(blocks, [b'\0'])
+        embed_data(container_path, blocks, output_path, codec)
 
 if __name__ == '__main__':
     container = input("Путь к контейнеру: ")
@@ -29,5 +115,3 @@ if __name__ == '__main__':
     output = input("Путь для результата: ")
     encode_message(container, message, output)
     print("Сообщение скрыто!")
-
-
@@ -0,0 +1,272 @@
+"""
+Счётчики, гистограммы и профилирование горячих путей.
+
+По умолчанию выключено: в горячих местах стоит проверка metrics.ENABLED,
+так что без метрик вся цена - чтение одного атрибута модуля.
+
+Включается без правки кода, переменными окружения:
+
+    INFOSEC_METRICS=metrics.json python -m integrity check /data
+    INFOSEC_METRICS=metrics.prom python -m passwords serve --db users.tsv
+    INFOSEC_PROFILE=run.prof python infolaba1.py
+
+INFOSEC_METRICS - куда при выходе (и по SIGUSR1, если программа долгая)
+записать метрики: файл .prom - текстовый формат Prometheus, другой файл -
+JSON, "-" - JSON в stderr. INFOSEC_PROFILE - записать профиль cProfile
+всего запуска (смотреть: python -m pstats run.prof). У python -m integrity
+то же самое - флаги --metrics FILE и --profile FILE.
+
+Что собирается:
+
+    integrity_files_total{source="hashed|cached"}  файлы обхода
+    integrity_errors_total                         ошибки чтения
+    integrity_hashed_bytes_total                   прочитано байт
+    integrity_hash_seconds                         хэш одного файла (кроме --jobs)
+    integrity_run_seconds{op="scan|verify"}        весь обход
+    password_verify_seconds{scheme="..."}          проверка пароля
+    password_logins_total{result="..."}            результаты входа
+
+*_seconds - гистограммы (корзины BUCKETS), остальное - счётчики. В JSON
+рядом с ними - производные: файлов и байт в секунду, доля попаданий
+stat-кэша, средние задержки.
+"""
+
+import atexit
+import bisect
+import json
+import os
+import sys
+import threading
+
+ENV_METRICS = "INFOSEC_METRICS"
+ENV_PROFILE = "INFOSEC_PROFILE"
+
+# верхние границы корзин гистограмм, секунды
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ENABLED = False
+
+_lock = threading.Lock()
+_counters = {}    # (имя, метки) -> [значение]
+_histograms = {}  # (имя, метки) -> [числа по корзинам (последняя - +Inf), сумма, число]
+_output = None
+_profiler = None
+_pid = None
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def _counter_cell(key):
+    with _lock:
+        cell = _counters.get(key)
+        if cell is None:
+            cell = _counters[key] = [0]
+    return cell
+
+
+def _histogram_cell(key):
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+    return h
+
+
+def inc(name, value=1, **labels):
+    counter(name, **labels)(value)
+
+
+def observe(name, value, **labels):
+    histogram(name, **labels)(value)
+
+
+def counter(name, **labels):
+    """Счётчик с заранее разобранными метками: add = counter(...); add(value).
+
+    Для горячих путей - ключ и ячейка ищутся один раз, а не при каждом вызове.
+    """
+    key = _key(name, labels)
+    cell = None
+
+    def add(value=1):
+        nonlocal cell
+        if cell is None:
+            cell = _counter_cell(key)  # в таблице появляется при первом вызове
+        with _lock:
+            cell[0] += value
+    return add
+
+
+def histogram(name, **labels):
+    """Гистограмма с заранее разобранными метками: record = histogram(...); record(value)."""
+    key = _key(name, labels)
+    h = None
+
+    def record(value):
+        nonlocal h
+        if h is None:
+            h = _histogram_cell(key)
+        i = bisect.bisect_left(BUCKETS, value)
+        with _lock:
+            h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+    return record
+
+
+def enable():
+    global ENABLED
+    ENABLED = True
+
+
+def disable():
+    global ENABLED
+    ENABLED = False
+
+
+def reset():
+    """Обнуляет значения (ячейки остаются - на них ссылаются counter() и histogram())."""
+    with _lock:
+        for cell in _counters.values():
+            cell[0] = 0
+        for h in _histograms.values():
+            h[0][:] = [0] * len(h[0])
+            h[1] = 0.0
+            h[2] = 0
+
+
+def _sum(table, name, index=None):
+    total = 0
+    for (key, _), value in table.items():
+        if key == name:
+            total += value if index is None else value[index]
+    return total
+
+
+def _ratio(a, b):
+    return a / b if b else None
+
+
+def snapshot() -> dict:
+    """Все метрики в виде словаря (то, что пишется в JSON)."""
+    with _lock:
+        counters = {key: cell[0] for key, cell in _counters.items()}
+        histograms = {key: [list(h[0]), h[1], h[2]] for key, h in _histograms.items()}
+    run_seconds = _sum(histograms, "integrity_run_seconds", 1)
+    hashed = counters.get(_key("integrity_files_total", {"source": "hashed"}), 0)
+    cached = counters.get(_key("integrity_files_total", {"source": "cached"}), 0)
+    derived = {
+        "files_per_second": _ratio(hashed + cached, run_seconds),
+        "bytes_per_second": _ratio(_sum(counters, "integrity_hashed_bytes_total"), run_seconds),
+        "cache_hit_rate": _ratio(cached, hashed + cached),
+        "hash_seconds_mean": _ratio(_sum(histograms, "integrity_hash_seconds", 1),
+                                    _sum(histograms, "integrity_hash_seconds", 2)),
+        "verify_seconds_mean": _ratio(_sum(histograms, "password_verify_seconds", 1),
+                                      _sum(histograms, "password_verify_seconds", 2)),
+    }
+    result = {"counters": [], "histograms": [], "derived": derived}
+    for (name, labels), value in sorted(counters.items()):
+        result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        cumulative = []
+        running = 0
+        for bound, n in zip(BUCKETS + ("+Inf",), buckets):
+            running += n
+            cumulative.append([bound, running])
+        result["histograms"].append({"name": name, "labels": dict(labels), "count": count,
+                                     "sum": total, "buckets": cumulative})
+    return result
+
+
+def _labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}"
+
+
+def to_prometheus() -> str:
+    """Метрики в текстовом формате Prometheus."""
+    data = snapshot()
+    lines = []
+    typed = set()
+    for c in data["counters"]:
+        if c["name"] not in typed:
+            typed.add(c["name"])
+            lines.append(f"# TYPE {c['name']} counter")
+        lines.append(f"{c['name']}{_labels(c['labels'].items())} {c['value']}")
+    for h in data["histograms"]:
+        name = h["name"]
+        if name not in typed:
+            typed.add(name)
+            lines.append(f"# TYPE {name} histogram")
+        labels = h["labels"].items()
+        for bound, n in h["buckets"]:
+            lines.append(f"{name}_bucket{_labels(labels, [('le', bound)])} {n}")
+        lines.append(f"{name}_sum{_labels(labels)} {h['sum']}")
+        lines.append(f"{name}_count{_labels(labels)} {h['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def dump(path=None):
+    """Пишет метрики в path (по умолчанию - заданный в configure): .prom или JSON."""
+    path = path or _output
+    if not path or (_pid is not None and os.getpid() != _pid):
+        return  # дочерние процессы (fork) своих метрик не пишут
+    if path == "-":
+        print(json.dumps(snapshot(), ensure_ascii=False), file=sys.stderr)
+        return
+    if path.endswith(".prom"):
+        text = to_prometheus()
+    else:
+        text = json.dumps(snapshot(), ensure_ascii=False, indent=4) + "\n"
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def _dump_profile(path):
+    if _profiler is not None and os.getpid() == _pid:
+        _profiler.disable()
+        _profiler.dump_stats(path)
+
+
+def configure(metrics_path=None, profile_path=None):
+    """Включает метрики (запись в metrics_path при выходе) и/или cProfile."""
+    global _output, _profiler, _pid
+    _pid = os.getpid()
+    if metrics_path:
+        enable()
+        if _output is None:
+            atexit.register(dump)
+            _install_signal()
+        _output = metrics_path
+    if profile_path and _profiler is None:
+        import cProfile
+        _profiler = cProfile.Profile()
+        _profiler.enable()
+        atexit.register(_dump_profile, profile_path)
+
+
+def _install_signal():
+    # kill -USR1 <pid> - записать метрики, не останавливая долгую программу
+    import signal
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    try:
+        signal.signal(signal.SIGUSR1, lambda signum, frame: dump())
+    except ValueError:
+        pass  # не главный поток
+
+
+if os.environ.get(ENV_METRICS) or os.environ.get(ENV_PROFILE):
+    # multiprocessing - только здесь: без переменных окружения импорт остаётся лёгким
+    from multiprocessing import parent_process
+
+    # процессы пула (--jobs) получают переменные окружения, но пишут только родители
+    if parent_process() is None:
+        configure(os.environ.get(ENV_METRICS), os.environ.get(ENV_PROFILE))
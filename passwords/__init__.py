@@ -0,0 +1,10 @@
+"""
+Парольная система (общая часть infolaba2.py и infolaba22.py).
+
+hashing     - хэш пароля и проверка пароля по сохранённой записи
+kdf         - медленный хэш с солью и подбор его стоимости (python -m passwords calibrate)
+policy      - проверка сложности пароля, аудит файла паролей (python -m passwords audit)
+state       - файл пароля со счётчиком попыток, общий для нескольких процессов
+credentials - файл учётных записей: пользователь, запись, счётчик неудачных попыток
+service     - пакетная проверка паролей по индексу в памяти (python -m passwords serve)
+"""
@@ -0,0 +1,13 @@
+import sys
+
+from . import kdf, policy, service
+
+COMMANDS = {"serve": service.main, "calibrate": kdf.main, "audit": policy.main}
+
+if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+    print("Использование: python -m passwords serve --db FILE [--socket PATH]\n"
+          "               python -m passwords calibrate [--target-ms MS]\n"
+          "               python -m passwords audit FILE [--min-length N] [--classes A,B]")
+    sys.exit(2)
+
+sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
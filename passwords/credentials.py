@@ -0,0 +1,55 @@
+"""
+Файл учётных записей для пакетной проверки.
+
+Одна строка на пользователя, поля через табуляцию:
+
+    пользователь<TAB>запись<TAB>неудачных попыток
+
+Запись - как в файле пароля infolaba22.py (MAGIC, BLOCKED или хэш).
+Третье поле можно не указывать, тогда 0. Пустые строки и строки с # пропускаются.
+"""
+
+import os
+
+from .hashing import parse_record
+
+
+class Credential:
+    """Учётная запись в памяти: запись, разобранный хэш и счётчик попыток."""
+
+    __slots__ = ("record", "parsed", "attempts")
+
+    def __init__(self, record, attempts=0):
+        self.set_record(record)
+        self.attempts = attempts
+
+    def set_record(self, record):
+        self.record = record
+        self.parsed = parse_record(record)
+
+
+def load_credentials(path) -> dict:
+    """Читает файл учётных записей в словарь {пользователь: Credential}."""
+    index = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.rstrip("\r\n")
+            if not line or line.startswith("#"):
+                continue
+            fields = line.split("\t")
+            if len(fields) < 2:
+                raise ValueError(f"{path}: строка не распознана: {line!r}")
+            attempts = int(fields[2]) if len(fields) > 2 and fields[2] else 0
+            index[fields[0]] = Credential(fields[1], attempts)
+    return index
+
+
+def save_credentials(path, index):
+    """Записывает словарь обратно: во временный файл, затем переименование."""
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for user, cred in index.items():
+            f.write(f"{user}\t{cred.record}\t{cred.attempts}\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -0,0 +1,83 @@
+"""
+Хэш пароля и проверка пароля по записи из файла.
+
+Запись - то, что лежит в файле пароля: MAGIC (пароль ещё не задан),
+BLOCKED (заблокировано) или хэш. Метки из infolaba2.py (hello/STOP)
+понимаются так же.
+
+Новые хэши - медленные, с солью (см. kdf.py). Старые записи-числа (xor16)
+по-прежнему проверяются, но needs_upgrade для них истинно: после
+успешного входа запись нужно заменить на hash_password(пароль).
+"""
+
+import time
+
+import metrics
+from xor16 import xor16_bytes
+
+from . import kdf
+
+MAGIC = "MAGIC"
+BLOCKED = "BLOCKED"
+MAX_ATTEMPTS = 3
+
+SETUP_MARKS = frozenset({MAGIC, "hello"})
+BLOCKED_MARKS = frozenset({BLOCKED, "STOP"})
+
+# результаты проверки входа (state.py, service.py); здесь, а не в service.py,
+# чтобы infolaba22.py не тянул за собой сервер
+OK = "OK"
+DENIED = "DENIED"
+LOCKED = "BLOCKED"
+SETUP = "SETUP"
+UNKNOWN = "UNKNOWN"
+ERROR = "ERROR"
+
+
+def hash_password(password: str) -> str:
+    """Запись для нового пароля с текущими параметрами kdf."""
+    return kdf.make_record(password)
+
+
+def legacy_hash(password: str) -> int:
+    """Старый хэш: xor16 от utf-8 байт пароля."""
+    return xor16_bytes(password.encode("utf-8"))
+
+
+def parse_record(record: str):
+    """Разбирает запись заранее, чтобы при проверке не разбирать её заново.
+
+    Возвращает kdf.KdfRecord, старый хэш (int) или None, если запись - не хэш.
+    """
+    if record.startswith("$"):
+        return kdf.parse_record(record)
+    try:
+        return int(record)
+    except ValueError:
+        return None
+
+
+def verify_password(parsed, password: str) -> bool:
+    """Проверяет пароль по разобранной записи (результат parse_record)."""
+    if not metrics.ENABLED:
+        return _verify(parsed, password)
+    started = time.perf_counter()
+    ok = _verify(parsed, password)
+    scheme = parsed.scheme if isinstance(parsed, kdf.KdfRecord) else "xor16"
+    metrics.observe("password_verify_seconds", time.perf_counter() - started, scheme=scheme)
+    return ok
+
+
+def _verify(parsed, password):
+    if parsed is None:
+        return False
+    if isinstance(parsed, kdf.KdfRecord):
+        return kdf.verify(parsed, password)
+    return legacy_hash(password) == parsed
+
+
+def needs_upgrade(parsed) -> bool:
+    """Запись устарела (xor16 или другие параметры kdf) - пересчитать при входе."""
+    if isinstance(parsed, kdf.KdfRecord):
+        return kdf.needs_upgrade(parsed)
+    return parsed is not None
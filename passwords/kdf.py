@@ -0,0 +1,182 @@
+"""
+Медленный хэш пароля с солью: scrypt, а если его нет в hashlib - PBKDF2-HMAC-SHA256.
+
+Запись в файле пароля (соль и хэш - base64 без '='):
+
+    $scrypt$ln=14,r=8,p=1$<соль>$<хэш>
+    $pbkdf2-sha256$i=600000$<соль>$<хэш>
+
+Параметры хранятся в самой записи, поэтому стоимость можно поднимать, не
+ломая старые записи: при следующем успешном входе запись пересчитывается
+с текущими параметрами (см. needs_upgrade).
+
+Текущие параметры - DEFAULT_PARAMS или переменная окружения PASSWORD_KDF
+вида "scrypt$ln=15,r=8,p=1". Подобрать их под нужное время проверки:
+
+    python -m passwords calibrate --target-ms 50
+"""
+
+import argparse
+import base64
+import functools
+import hashlib
+import hmac
+import os
+import time
+from collections import namedtuple
+
+SCRYPT = "scrypt"
+PBKDF2 = "pbkdf2-sha256"
+
+SALT_SIZE = 16
+DIGEST_SIZE = 32
+ENV_PARAMS = "PASSWORD_KDF"
+
+HAVE_SCRYPT = hasattr(hashlib, "scrypt")
+
+# (схема, параметры); параметры - кортеж пар, чтобы их можно было сравнивать
+DEFAULT_PARAMS = ((SCRYPT, (("ln", 14), ("r", 8), ("p", 1))) if HAVE_SCRYPT
+                  else (PBKDF2, (("i", 600000),)))
+
+# имена параметров каждой схемы в порядке записи
+_PARAM_NAMES = {SCRYPT: ("ln", "r", "p"), PBKDF2: ("i",)}
+
+
+class KdfRecord(namedtuple("KdfRecord", "scheme params salt digest")):
+    """Разобранная запись: схема, параметры, соль и хэш (bytes)."""
+
+
+def format_params(scheme, params) -> str:
+    return scheme + "$" + ",".join(f"{k}={v}" for k, v in params)
+
+
+@functools.lru_cache(maxsize=16)
+def parse_params(text: str):
+    """"scrypt$ln=14,r=8,p=1" -> (схема, параметры). ValueError, если не разобрать."""
+    scheme, _, values = text.partition("$")
+    names = _PARAM_NAMES.get(scheme)
+    if names is None:
+        raise ValueError(f"неизвестная схема хэша пароля: {scheme!r}")
+    params = dict(item.split("=", 1) for item in values.split(",") if "=" in item)
+    if set(params) != set(names):
+        raise ValueError(f"параметры {scheme}: нужны {', '.join(names)}")
+    result = tuple((name, int(params[name])) for name in names)
+    if any(v <= 0 for _, v in result):
+        raise ValueError(f"параметры {scheme} должны быть положительными")
+    if scheme == SCRYPT and not HAVE_SCRYPT:
+        raise ValueError("hashlib собран без scrypt")
+    return scheme, result
+
+
+def current_params():
+    """Параметры для новых записей: из PASSWORD_KDF или DEFAULT_PARAMS."""
+    text = os.environ.get(ENV_PARAMS)
+    return parse_params(text) if text else DEFAULT_PARAMS
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii").rstrip("=")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.b64decode(text + "=" * (-len(text) % 4), validate=True)
+
+
+def derive(password: str, scheme, params, salt: bytes) -> bytes:
+    data = password.encode("utf-8")
+    p = dict(params)
+    if scheme == SCRYPT:
+        n = 1 << p["ln"]
+        # памяти scrypt нужно ~128*r*n байт; лимит OpenSSL по умолчанию - 32 МБ
+        maxmem = 128 * p["r"] * (n + p["p"] + 2) + (1 << 20)
+        return hashlib.scrypt(data, salt=salt, n=n, r=p["r"], p=p["p"],
+                              maxmem=maxmem, dklen=DIGEST_SIZE)
+    return hashlib.pbkdf2_hmac("sha256", data, salt, p["i"], DIGEST_SIZE)
+
+
+def make_record(password: str, params=None) -> str:
+    """Новая запись для пароля со свежей солью."""
+    scheme, values = params or current_params()
+    salt = os.urandom(SALT_SIZE)
+    digest = derive(password, scheme, values, salt)
+    return f"${format_params(scheme, values)}${_b64encode(salt)}${_b64encode(digest)}"
+
+
+def parse_record(record: str):
+    """Разбирает запись "$схема$параметры$соль$хэш"; None, если это не она."""
+    parts = record.split("$")
+    if len(parts) != 5 or parts[0]:
+        return None
+    try:
+        scheme, values = parse_params(f"{parts[1]}${parts[2]}")
+        return KdfRecord(scheme, values, _b64decode(parts[3]), _b64decode(parts[4]))
+    except ValueError:
+        return None
+
+
+def verify(rec: KdfRecord, password: str) -> bool:
+    digest = derive(password, rec.scheme, rec.params, rec.salt)
+    return hmac.compare_digest(digest, rec.digest)
+
+
+def needs_upgrade(rec: KdfRecord) -> bool:
+    """Запись сделана не с текущими параметрами - пересчитать при входе."""
+    return (rec.scheme, rec.params) != current_params()
+
+
+def measure(scheme, params, repeat=3) -> float:
+    """Лучшее из repeat время одной проверки, в секундах."""
+    salt = os.urandom(SALT_SIZE)
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        derive("calibrate", scheme, params, salt)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(target_ms: float, scheme=None):
+    """Подбирает стоимость, при которой проверка занимает около target_ms.
+
+    Возвращает ((схема, параметры), измеренное время в секундах).
+    """
+    scheme = scheme or DEFAULT_PARAMS[0]
+    target = target_ms / 1000
+    if scheme == SCRYPT:
+        # время scrypt растёт вдвое с каждым ln: идём вверх, пока не перешагнём цель
+        prev = None
+        for ln in range(10, 25):
+            params = (("ln", ln), ("r", 8), ("p", 1))
+            elapsed = measure(scheme, params)
+            if elapsed >= target:
+                if prev and target - prev[1] < elapsed - target:
+                    return (scheme, prev[0]), prev[1]
+                return (scheme, params), elapsed
+            prev = (params, elapsed)
+        return (scheme, prev[0]), prev[1]
+    # PBKDF2 линеен по числу итераций: меряем на пробном и масштабируем
+    probe = 20000
+    elapsed = measure(scheme, (("i", probe),))
+    iterations = max(1000, round(probe * target / elapsed, -3))
+    params = (("i", int(iterations)),)
+    return (scheme, params), measure(scheme, params)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m passwords calibrate",
+                                     description="Подбор стоимости хэша пароля под время проверки")
+    parser.add_argument("--target-ms", type=float, default=50.0,
+                        help="желаемое время одной проверки, мс (по умолчанию 50)")
+    parser.add_argument("--scheme", choices=sorted(_PARAM_NAMES), default=DEFAULT_PARAMS[0],
+                        help=f"схема (по умолчанию {DEFAULT_PARAMS[0]})")
+    args = parser.parse_args(argv)
+    if args.scheme == SCRYPT and not HAVE_SCRYPT:
+        parser.error("hashlib собран без scrypt")
+
+    (scheme, params), elapsed = calibrate(args.target_ms, args.scheme)
+    text = format_params(scheme, params)
+    print(f"{text}: {elapsed * 1000:.1f} мс на проверку, "
+          f"~{1 / elapsed:.1f} входов в секунду на ядро")
+    print(f"export {ENV_PARAMS}='{text}'")
+    return 0
@@ -0,0 +1,199 @@
+"""
+Проверка сложности пароля (общая для infolaba2.py и infolaba22.py).
+
+Правило - минимальная длина и набор классов символов, из которых в пароле
+должно встретиться не меньше min_classes (по умолчанию - все). Класс
+каждого символа считается один раз и запоминается в таблице, дальше проверка -
+поиск по словарю и OR битовых масок; проход по паролю заканчивается, как
+только встретились все классы.
+
+Проверка файла паролей (по одному в строке), например для аудита утёкшей базы:
+
+    python -m passwords audit leaked.txt --min-length 8 --classes latin_lower,latin_upper,digit
+"""
+
+import argparse
+import json
+import sys
+from collections import namedtuple
+
+# имя класса -> (название для сообщений, признак символа)
+CLASSES = {
+    "latin_lower": ("строчная латиница", lambda ch: "a" <= ch <= "z"),
+    "latin_upper": ("заглавная латиница", lambda ch: "A" <= ch <= "Z"),
+    "cyrillic_lower": ("строчная кириллица", lambda ch: "а" <= ch <= "я"),  # а–я
+    "cyrillic_upper": ("заглавная кириллица", lambda ch: "А" <= ch <= "Я"),  # А–Я
+    "digit_or_sign": ("цифра или знак", lambda ch: ch.isdigit() or not ch.isalnum()),
+    "digit": ("цифра", lambda ch: ch.isdigit()),
+    "sign": ("знак", lambda ch: not ch.isalnum()),
+}
+
+DEFAULT_CLASSES = ("latin_lower", "latin_upper", "cyrillic_lower", "cyrillic_upper",
+                   "digit_or_sign")
+MIN_LENGTH = 6
+
+Result = namedtuple("Result", "ok too_short missing")
+
+
+class _ClassTable(dict):
+    """Символ -> битовая маска его классов; заполняется при первой встрече символа."""
+
+    def __init__(self, predicates):
+        super().__init__()
+        self.predicates = predicates
+
+    def __missing__(self, ch):
+        mask = 0
+        for bit, predicate in enumerate(self.predicates):
+            if predicate(ch):
+                mask |= 1 << bit
+        self[ch] = mask
+        return mask
+
+
+class Policy:
+    """Правило сложности: минимальная длина и обязательные классы символов."""
+
+    def __init__(self, min_length=MIN_LENGTH, classes=DEFAULT_CLASSES, min_classes=None):
+        unknown = [name for name in classes if name not in CLASSES]
+        if unknown:
+            raise ValueError(f"неизвестные классы символов: {', '.join(unknown)}")
+        if not classes:
+            raise ValueError("нужен хотя бы один класс символов")
+        self.min_length = min_length
+        self.classes = tuple(classes)
+        self.min_classes = len(self.classes) if min_classes is None else min_classes
+        self.full = (1 << len(self.classes)) - 1
+        self.table = _ClassTable([CLASSES[name][1] for name in self.classes])
+        # маска -> (сколько классов есть, каких нет) для всех возможных масок
+        self.by_mask = [
+            (bin(mask).count("1"),
+             tuple(name for bit, name in enumerate(self.classes) if not mask >> bit & 1))
+            for mask in range(self.full + 1)
+        ]
+
+    def mask(self, password: str) -> int:
+        """Битовая маска встретившихся в пароле классов."""
+        table = self.table
+        full = self.full
+        mask = 0
+        for ch in password:
+            mask |= table[ch]
+            if mask == full:
+                break
+        return mask
+
+    def check(self, password: str) -> Result:
+        count, missing = self.by_mask[self.mask(password)]
+        too_short = len(password) < self.min_length
+        return Result(not too_short and count >= self.min_classes, too_short, missing)
+
+    def is_ok(self, password: str) -> bool:
+        """То же, что check(...).ok, без лишней работы для коротких паролей."""
+        if len(password) < self.min_length:
+            return False
+        return self.by_mask[self.mask(password)][0] >= self.min_classes
+
+    def describe(self, result: Result) -> str:
+        """Почему пароль не прошёл проверку - для сообщения пользователю."""
+        reasons = []
+        if result.too_short:
+            reasons.append(f"меньше {self.min_length} символов")
+        if result.missing and not result.ok:
+            reasons.append("нет: " + ", ".join(CLASSES[name][0] for name in result.missing))
+        return "; ".join(reasons)
+
+
+DEFAULT_POLICY = Policy()
+
+
+def check_many(passwords, policy=DEFAULT_POLICY):
+    """Проверяет пароли по одному: выдаёт (пароль, Result)."""
+    check = policy.check
+    for password in passwords:
+        yield password, check(password)
+
+
+def iter_password_file(path, encoding="utf-8"):
+    """Пароли из файла, по одному в строке; байты, которые не декодируются, заменяются."""
+    with open(path, "r", encoding=encoding, errors="replace", newline="\n",
+              buffering=1 << 20) as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def audit(passwords, policy=DEFAULT_POLICY, on_fail=None):
+    """Сводка по набору паролей: сколько всего, сколько прошло, сколько коротких
+    и скольким непрошедшим не хватило каждого класса.
+
+    on_fail(пароль, Result) вызывается для каждого непрошедшего пароля.
+    """
+    total = passed = too_short = 0
+    min_length = policy.min_length
+    min_classes = policy.min_classes
+    by_mask = policy.by_mask
+    mask_counts = [0] * len(by_mask)
+    for password in passwords:
+        total += 1
+        mask = policy.mask(password)
+        count, missing = by_mask[mask]
+        short = len(password) < min_length
+        if not short and count >= min_classes:
+            passed += 1
+            continue
+        too_short += short
+        mask_counts[mask] += 1
+        if on_fail is not None:
+            on_fail(password, Result(False, short, missing))
+
+    # недостающие классы считаем по маскам, а не по каждому паролю
+    missing = dict.fromkeys(policy.classes, 0)
+    for mask, count in enumerate(mask_counts):
+        for name in by_mask[mask][1]:
+            missing[name] += count
+    return {"total": total, "passed": passed, "failed": total - passed,
+            "too_short": too_short, "missing": missing}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m passwords audit",
+                                     description="Проверка сложности паролей из файла")
+    parser.add_argument("file", help="файл паролей, по одному в строке ('-' - stdin)")
+    parser.add_argument("--min-length", type=int, default=MIN_LENGTH,
+                        help=f"минимальная длина (по умолчанию {MIN_LENGTH})")
+    parser.add_argument("--classes", default=",".join(DEFAULT_CLASSES),
+                        help="классы символов через запятую; известные: " + ", ".join(CLASSES))
+    parser.add_argument("--min-classes", type=int,
+                        help="сколько классов должно встретиться (по умолчанию все)")
+    parser.add_argument("--encoding", default="utf-8", help="кодировка файла")
+    parser.add_argument("--failed", action="store_true",
+                        help="печатать непрошедшие пароли с причиной")
+    parser.add_argument("--json", action="store_true", help="сводка в JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        policy = Policy(args.min_length, [c for c in args.classes.split(",") if c],
+                        args.min_classes)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.file == "-":
+        sys.stdin.reconfigure(encoding=args.encoding, errors="replace")
+        passwords = (line.rstrip("\r\n") for line in sys.stdin)
+    else:
+        passwords = iter_password_file(args.file, args.encoding)
+
+    on_fail = None
+    if args.failed:
+        def on_fail(password, result):
+            print(f"{password}\t{policy.describe(result)}")
+
+    summary = audit(passwords, policy, on_fail)
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False))
+    else:
+        print(f"Всего: {summary['total']}, прошли: {summary['passed']}, "
+              f"не прошли: {summary['failed']} (короткие: {summary['too_short']})")
+        for name, count in summary["missing"].items():
+            print(f"  нет класса «{CLASSES[name][0]}»: {count}")
+    return 0
@@ -0,0 +1,173 @@
+"""
+Пакетная проверка паролей.
+
+Все учётные записи загружаются в словарь, дальше каждая проверка - поиск
+по словарю и сравнение хэша. Счётчики неудачных попыток и блокировки
+живут в памяти и сбрасываются на диск пачкой: не чаще раза в FLUSH_INTERVAL
+секунд или после FLUSH_EVENTS изменений, и обязательно при выходе.
+
+Протокол - строки UTF-8, запрос "пользователь<TAB>пароль", ответ
+"пользователь<TAB>РЕЗУЛЬТАТ", где РЕЗУЛЬТАТ:
+    OK       - пароль верный
+    DENIED   - неверный пароль (после MAX_ATTEMPTS подряд - блокировка)
+    BLOCKED  - учётная запись заблокирована
+    SETUP    - пароль ещё не задан (MAGIC)
+    UNKNOWN  - нет такого пользователя
+    ERROR    - строка запроса не распознана
+
+Старые записи (xor16) после успешного входа заменяются записью kdf.py.
+
+    python -m passwords serve --db users.tsv < requests.txt
+    python -m passwords serve --db users.tsv --socket /run/passwords.sock
+"""
+
+import argparse
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+
+import metrics
+
+from .credentials import load_credentials, save_credentials
+from .hashing import (BLOCKED, BLOCKED_MARKS, DENIED, ERROR, LOCKED, MAX_ATTEMPTS, OK, SETUP,
+                      SETUP_MARKS, UNKNOWN, hash_password, needs_upgrade, verify_password)
+
+FLUSH_INTERVAL = 1.0
+FLUSH_EVENTS = 1000
+READ_SIZE = 64 * 1024
+
+
+class PasswordService:
+    """Индекс учётных записей в памяти с отложенной записью счётчиков."""
+
+    def __init__(self, db_path, max_attempts=MAX_ATTEMPTS):
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.index = load_credentials(db_path)
+        self.lock = threading.Lock()
+        self.pending = 0  # изменений с последней записи на диск
+        self.last_flush = time.monotonic()
+
+    def check(self, user, password) -> str:
+        with self.lock:
+            cred = self.index.get(user)
+            if cred is None:
+                return UNKNOWN
+            if cred.record in BLOCKED_MARKS:
+                return LOCKED
+            if cred.record in SETUP_MARKS:
+                return SETUP
+            parsed = cred.parsed
+
+        # медленный хэш считаем без блокировки: hashlib отпускает GIL,
+        # и проверки разных пользователей идут параллельно
+        ok = verify_password(parsed, password)
+        upgraded = hash_password(password) if ok and needs_upgrade(parsed) else None
+
+        with self.lock:
+            if cred.record in BLOCKED_MARKS:
+                return LOCKED  # заблокировали, пока считали хэш
+            if ok:
+                if upgraded and cred.parsed is parsed:
+                    cred.set_record(upgraded)
+                    self.pending += 1
+                if cred.attempts:
+                    cred.attempts = 0
+                    self.pending += 1
+                return OK
+            cred.attempts += 1
+            if cred.attempts >= self.max_attempts:
+                cred.set_record(BLOCKED)
+            self.pending += 1
+            return DENIED
+
+    def handle_line(self, line: bytes) -> bytes:
+        text = line.decode("utf-8", errors="replace").rstrip("\r")
+        user, sep, password = text.partition("\t")
+        result = self.check(user, password) if sep else ERROR
+        if metrics.ENABLED:
+            metrics.inc("password_logins_total", result=result)
+        return f"{user}\t{result}\n".encode("utf-8")
+
+    def maybe_flush(self):
+        """Пишет счётчики на диск, если накопилось достаточно или прошло время."""
+        if self.pending and (self.pending >= FLUSH_EVENTS
+                             or time.monotonic() - self.last_flush >= FLUSH_INTERVAL):
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            if self.pending:
+                save_credentials(self.db_path, self.index)
+                self.pending = 0
+            self.last_flush = time.monotonic()
+
+    def serve_stream(self, rfile, wfile):
+        """Обрабатывает поток запросов: всё, что уже пришло, - одной пачкой."""
+        rest = b""
+        while True:
+            data = rfile.read1(READ_SIZE)
+            if not data:
+                break
+            lines = (rest + data).split(b"\n")
+            rest = lines.pop()
+            wfile.write(b"".join(self.handle_line(line) for line in lines if line))
+            wfile.flush()
+            self.maybe_flush()
+        if rest:
+            wfile.write(self.handle_line(rest))
+            wfile.flush()
+
+
+def _flusher(service, stop):
+    # чтобы счётчики попали на диск и при редких запросах
+    while not stop.wait(FLUSH_INTERVAL):
+        service.maybe_flush()
+
+
+def serve_socket(service, path):
+    """Принимает соединения на unix-сокете, каждое - в своём потоке."""
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            service.serve_stream(self.rfile, self.wfile)
+
+    if os.path.exists(path):
+        os.remove(path)
+    stop = threading.Event()
+    threading.Thread(target=_flusher, args=(service, stop), daemon=True).start()
+    with socketserver.ThreadingUnixStreamServer(path, Handler) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            os.remove(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m passwords serve",
+                                     description="Пакетная проверка паролей по файлу учётных записей")
+    parser.add_argument("--db", required=True, help="файл учётных записей (см. credentials.py)")
+    parser.add_argument("--socket", metavar="PATH",
+                        help="слушать unix-сокет вместо stdin/stdout")
+    parser.add_argument("--max-attempts", type=int, default=MAX_ATTEMPTS,
+                        help=f"неудачных попыток до блокировки (по умолчанию {MAX_ATTEMPTS})")
+    args = parser.parse_args(argv)
+
+    service = PasswordService(args.db, args.max_attempts)
+    # SIGTERM завершает так же, как Ctrl+C - счётчики успевают записаться
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        if args.socket:
+            serve_socket(service, args.socket)
+        else:
+            service.serve_stream(sys.stdin.buffer, sys.stdout.buffer)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.flush()
+    return 0
@@ -0,0 +1,198 @@
+"""
+Файл пароля, общий для нескольких одновременно запущенных программ (infolaba22.py).
+
+В файле - запись пароля (см. hashing.py), второй строкой - число неудачных
+попыток подряд, третьей - занятые сейчас попытки (процесс:время_нс):
+
+    $scrypt$ln=14,r=8,p=1$<соль>$<хэш>
+    1
+    4121:1760000000000000000 4133:1760000000100000000
+
+Файл без второй строки (как раньше) - счётчик 0, без третьей - занятых
+попыток нет. Любое изменение делается под эксклюзивной блокировкой fcntl на
+соседнем файле <файл>.lock и пишется во временный файл с последующим
+переименованием: файл всегда целый, даже если программа упала посреди
+записи, а счётчик один на все процессы.
+
+Попытка входа занимается до проверки пароля: в файл дописывается метка
+процесса, потом без блокировки считается медленный хэш, и по результату
+метка убирается, а счётчик увеличивается или сбрасывается. Так сколько бы
+процессов ни подбирали пароль одновременно, неверных проверок вместе будет
+не больше max_attempts, а блокировка держится лишь на время чтения и записи
+маленького файла. Если все попытки заняты проверками в других процессах,
+вход ждёт их окончания (до WAIT_TIMEOUT секунд).
+
+Попытка, занятая упавшим процессом (процесса больше нет или метка старше
+STALE_AFTER секунд), считается неудачной: её забирает следующий вход, и если
+неудачных набралось max_attempts, в файл пишется метка блокировки.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+import metrics
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки, остаётся только атомарная запись
+    fcntl = None
+
+from .hashing import (BLOCKED, BLOCKED_MARKS, DENIED, ERROR, LOCKED, MAX_ATTEMPTS, OK, SETUP,
+                      SETUP_MARKS, hash_password, needs_upgrade, parse_record, verify_password)
+
+# сколько ждать, пока другие процессы освободят занятые попытки
+WAIT_TIMEOUT = 5.0
+WAIT_STEP = 0.005
+# попытка, занятая дольше, считается брошенной, даже если процесс ещё жив
+STALE_AFTER = 60.0
+
+
+def _alive(pid) -> bool:
+    if os.name != "posix":
+        return True  # на Windows os.kill завершает процесс - там остаётся только STALE_AFTER
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # процесс есть, но чужой
+    return True
+
+
+def _stale(mark, now_ns) -> bool:
+    pid, _, started = mark.partition(":")
+    if not (pid.isdigit() and started.isdigit()):
+        return True
+    return now_ns - int(started) > STALE_AFTER * 1e9 or not _alive(int(pid))
+
+
+class PasswordFile:
+    """Файл пароля со счётчиком неудачных попыток."""
+
+    def __init__(self, path, max_attempts=MAX_ATTEMPTS):
+        self.path = os.fspath(path)
+        self.lock_path = self.path + ".lock"
+        self.max_attempts = max_attempts
+
+    @contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        # отдельный файл блокировки: сам файл пароля при записи подменяется новым
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def read(self):
+        """(запись, неудачных попыток). Без блокировки: файл заменяется только целиком."""
+        record, failed, _ = self._read()
+        return record, failed
+
+    def _read(self):
+        # (запись, неудачных попыток, занятые попытки)
+        with open(self.path, "r", encoding="utf-8", errors="ignore") as f:
+            lines = f.read().split("\n")
+        fields = lines[0].split()
+        record = fields[0] if fields else ""
+        failed = lines[1].strip() if len(lines) > 1 else ""
+        failed = int(failed) if failed.isdigit() else 0
+        held = lines[2].split() if len(lines) > 2 else []
+        return record, failed, held
+
+    def _write(self, record, failed, held=()):
+        text = record
+        if failed or held:
+            text = f"{record}\n{failed}\n"
+            if held:
+                text += " ".join(held) + "\n"
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    def setup(self, password) -> bool:
+        """Задаёт пароль, если он ещё не задан. False - его уже задал кто-то другой."""
+        record = hash_password(password)
+        with self._locked():
+            if self.read()[0] not in SETUP_MARKS:
+                return False
+            self._write(record, 0)
+        return True
+
+    def login(self, password):
+        """Одна попытка входа: (результат, сколько попыток осталось).
+
+        Результаты - как у service.py: OK, DENIED, BLOCKED, SETUP, ERROR
+        (запись не распознана). После неверной попытки, исчерпавшей лимит,
+        в файл пишется метка блокировки и возвращается (DENIED, 0).
+        """
+        result = self._login(password)
+        if metrics.ENABLED:
+            metrics.inc("password_logins_total", result=result[0])
+        return result
+
+    def _login(self, password):
+        deadline = time.monotonic() + WAIT_TIMEOUT
+        mark = None
+        while True:
+            with self._locked():
+                record, failed, held = self._read()
+                if record in BLOCKED_MARKS:
+                    return LOCKED, 0
+                if record in SETUP_MARKS:
+                    return SETUP, self.max_attempts
+                parsed = parse_record(record)
+                if parsed is None:
+                    return ERROR, 0
+                # попытки упавших процессов - неудачные
+                now = time.time_ns()
+                live = [m for m in held if not _stale(m, now)]
+                failed += len(held) - len(live)
+                if failed >= self.max_attempts:
+                    self._write(BLOCKED, 0)
+                    return LOCKED, 0
+                if failed + len(live) < self.max_attempts:
+                    mark = f"{os.getpid()}:{now}"
+                    self._write(record, failed, live + [mark])
+                    break
+                if len(live) < len(held):
+                    self._write(record, failed, live)
+            # все попытки заняты проверками в других процессах - ждём, чем они кончатся
+            if time.monotonic() >= deadline:
+                return LOCKED, 0
+            time.sleep(WAIT_STEP)
+
+        ok = verify_password(parsed, password)
+        upgraded = hash_password(password) if ok and needs_upgrade(parsed) else None
+
+        with self._locked():
+            current, failed, held = self._read()
+            if current in BLOCKED_MARKS:
+                return (LOCKED if ok else DENIED), 0
+            # метки нет - попытку уже сочли брошенной и посчитали неудачной
+            counted = mark not in held
+            if not counted:
+                held.remove(mark)
+            if ok:
+                # запись мог обновить параллельный вход с тем же паролем - тогда не трогаем её
+                self._write(upgraded if upgraded and current == record else current, 0, held)
+                return OK, self.max_attempts
+            if not counted:
+                failed += 1
+            if failed >= self.max_attempts:
+                self._write(BLOCKED, 0)
+                return DENIED, 0
+            self._write(current, failed, held)
+            return DENIED, self.max_attempts - failed - len(held)
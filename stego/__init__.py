@@ -0,0 +1,6 @@
+"""
+Стеганография в текстовых контейнерах (общая часть laba3_hide.py и laba3_extract.py).
+
+codecs - способы прятать биты в строках (пробел в конце, хвосты из пробелов и табуляций, промежутки между словами)
+corpus - сообщение, разложенное по многим контейнерам, с индексом их ёмкости
+"""
@@ -0,0 +1,261 @@
+"""
+Способы прятать биты в строках текстового контейнера (кодеки).
+
+Каждый кодек знает, сколько бит несёт строка (line_capacity), как записать
+их в строку (encode_line) и прочитать обратно (decode_line). Сообщение идёт
+в кодек и из него байтами: кодеки с постоянным числом бит на строку
+раскладывают байт по строкам через таблицу, а не по биту.
+
+Строки, до которых сообщение не дошло, остаются как были. Нулевыми битами
+они читаются только у space; у trailN и words в нетронутой строке может
+оказаться что угодно, поэтому laba3_hide.py дописывает за сообщением
+нулевой байт, а в корпусе (corpus.py) конец части задаёт заголовок.
+
+    space    - 1 бит: пробел в конце строки (схема laba3_hide.py, по умолчанию)
+    trail2   - 2 бита: два пробельных символа в конце строки, пробел = 0, табуляция = 1
+    trail4   - 4 бита, так же
+    trail8   - 8 бит (байт на строку), так же
+    words    - по биту на промежуток между словами: один пробел = 0, два = 1
+
+    python -m stego capacity container.txt
+"""
+
+import abc
+import re
+from itertools import chain, islice, repeat
+
+BLOCK_SIZE = 1 << 20
+BATCH_LINES = 8192  # строк в памяти за раз при чтении кодеком с постоянной ёмкостью строки
+
+
+def count_lines(path, block_size=BLOCK_SIZE) -> int:
+    """Сколько строк увидит текстовый режим: переводы строк плюс хвост без '\\n'."""
+    count = 0
+    last = b"\n"
+    with open(path, "rb", buffering=0) as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            count += block.count(b"\n")
+            last = block[-1:]
+    return count + (last != b"\n")
+
+
+# значение строки (0..15) -> цифра; строка цифр потом разбирается как одно большое число
+_DIGITS = bytes.maketrans(bytes(range(16)), b"0123456789abcdef")
+
+
+class Codec(abc.ABC):
+    """Общая часть: поток строк <-> поток байт сообщения через line_capacity/encode_line/decode_line."""
+
+    name = None
+    bits_per_line = None  # если у всех строк одинаково - ёмкость считается по числу строк
+
+    def line_capacity(self, line) -> int:
+        return self.bits_per_line
+
+    @abc.abstractmethod
+    def encode_line(self, line, value, nbits) -> str:
+        """Строка (без '\\n') с nbits битами value, старший бит первым."""
+
+    @abc.abstractmethod
+    def decode_line(self, line):
+        """(значение, число бит) из строки без '\\n'."""
+
+    def capacity(self, path) -> int:
+        """Сколько бит влезет в контейнер."""
+        if self.bits_per_line is not None:
+            return count_lines(path) * self.bits_per_line
+        with open(path, "r", encoding="windows-1251", buffering=BLOCK_SIZE) as f:
+            return sum(self.line_capacity(line.rstrip("\n")) for line in f)
+
+    def _fixed(self) -> bool:
+        # байт целиком раскладывается по строкам: 1, 2, 4 или 8 бит на строку
+        return self.bits_per_line in (1, 2, 4, 8)
+
+    def _byte_values(self):
+        # байт -> значения его строк, старшие биты первыми; считается один раз
+        table = self.__dict__.get("_table")
+        if table is None:
+            n = self.bits_per_line
+            mask = (1 << n) - 1
+            table = self._table = [tuple(byte >> shift & mask for shift in range(8 - n, -1, -n))
+                                   for byte in range(256)]
+        return table
+
+    def encode_lines(self, lines, blocks):
+        """Строки (без '\\n') с байтами из blocks. Кончаются вместе с сообщением;
+        последняя строка добивается нулями. ValueError, если строк не хватило."""
+        if self._fixed():
+            return self._encode_fixed(lines, blocks)
+        return self._encode_packed(lines, blocks)
+
+    def _encode_fixed(self, lines, blocks):
+        n = self.bits_per_line
+        table = self._byte_values()
+        encode = self.encode_line
+        lines = iter(lines)
+        for block in blocks:
+            count = 0
+            # значения - первыми: когда они кончатся, лишняя строка не будет прочитана
+            for value, line in zip(chain.from_iterable(map(table.__getitem__, block)), lines):
+                yield encode(line.rstrip("\n"), value, n)
+                count += 1
+            if count < len(block) * 8 // n:
+                raise ValueError("Контейнер слишком мал для сообщения")
+
+    def _encode_packed(self, lines, blocks):
+        # биты копятся в числе acc (nacc штук) и забираются по ёмкости строки
+        data = chain.from_iterable(blocks)
+        acc = next(data, None)
+        if acc is None:
+            return
+        nacc = 8
+        for line in lines:
+            line = line.rstrip("\n")
+            nbits = self.line_capacity(line)
+            if not nbits:
+                yield line
+                continue
+            while nacc < nbits:
+                byte = next(data, None)
+                if byte is None:
+                    break
+                acc = acc << 8 | byte
+                nacc += 8
+            if nacc < nbits:
+                acc <<= nbits - nacc
+                nacc = nbits
+            nacc -= nbits
+            yield self.encode_line(line, acc >> nacc, nbits)
+            acc &= (1 << nacc) - 1
+            if not nacc:
+                acc = next(data, None)
+                if acc is None:
+                    return
+                nacc = 8
+        raise ValueError("Контейнер слишком мал для сообщения")
+
+    def iter_bytes(self, lines, block_size=BLOCK_SIZE):
+        """Байты из строк блоками не больше примерно block_size; неполный последний байт отбрасывается."""
+        if self._fixed():
+            return self._decode_fixed(lines, block_size)
+        return self._decode_packed(lines, block_size)
+
+    def _decode_fixed(self, lines, block_size):
+        n = self.bits_per_line
+        per_byte = 8 // n
+        decode = self.decode_line
+        size = max(min(block_size * per_byte, BATCH_LINES) // per_byte, 1) * per_byte
+        lines = iter(lines)
+        while True:
+            batch = list(islice(lines, size))
+            values = bytes([decode(line.rstrip("\n"))[0] for line in batch])
+            whole = len(values) - len(values) % per_byte
+            if whole:
+                if n == 8:
+                    yield values[:whole]
+                else:
+                    yield int(values[:whole].translate(_DIGITS), 1 << n).to_bytes(whole // per_byte, "big")
+            if len(batch) < size:
+                return
+
+    def _decode_packed(self, lines, block_size):
+        acc = nacc = 0
+        out = bytearray()
+        for line in lines:
+            value, nbits = self.decode_line(line.rstrip("\n"))
+            if not nbits:
+                continue
+            acc = acc << nbits | value
+            nacc += nbits
+            if nacc >= 8:
+                count = nacc // 8
+                nacc -= count * 8
+                out += (acc >> nacc).to_bytes(count, "big")
+                acc &= (1 << nacc) - 1
+                if len(out) >= block_size:
+                    yield bytes(out)
+                    out.clear()
+        if out:
+            yield bytes(out)
+
+
+class SpaceCodec(Codec):
+    name = "space"
+    bits_per_line = 1
+
+    def encode_line(self, line, value, nbits):
+        return line + " " if value else line
+
+    def decode_line(self, line):
+        return (1 if line.endswith(" ") else 0), 1
+
+
+class TrailingCodec(Codec):
+    """nbits пробельных символов в конце строки; прежний хвост из пробелов убирается."""
+
+    def __init__(self, nbits):
+        self.name = f"trail{nbits}"
+        self.bits_per_line = nbits
+        # значение -> хвост строки, и обратно
+        self.runs = ["".join("\t" if value >> shift & 1 else " "
+                             for shift in range(nbits - 1, -1, -1))
+                     for value in range(1 << nbits)]
+        self.values = {run: value for value, run in enumerate(self.runs)}
+
+    def encode_line(self, line, value, nbits):
+        return line.rstrip(" \t") + self.runs[value]
+
+    def decode_line(self, line):
+        run = line[len(line.rstrip(" \t")):]
+        # хвост другой длины - строка не тронута
+        return self.values.get(run, 0), self.bits_per_line
+
+
+_GAP = re.compile(r"[ \t]+")
+# ширина промежутка (не больше 2) -> бит
+_GAP_BITS = bytes.maketrans(b"\x01\x02", b"01")
+# бит -> промежуток
+_GAPS = {"0": " ", "1": "  "}
+
+
+class WordGapCodec(Codec):
+    """Промежутки между словами: один пробел - 0, два - 1. Отступ и хвост строки не меняются."""
+
+    name = "words"
+
+    @staticmethod
+    def _split(line):
+        body = line.strip(" \t")
+        start = len(line) - len(line.lstrip(" \t"))
+        return line[:start], body, line[start + len(body):]
+
+    def line_capacity(self, line):
+        return len(_GAP.findall(line.strip(" \t")))
+
+    def encode_line(self, line, value, nbits):
+        lead, body, trail = self._split(line)
+        words = _GAP.split(body)
+        gaps = map(_GAPS.__getitem__, format(value, f"0{nbits}b"))
+        return lead + "".join(chain.from_iterable(zip(words, chain(gaps, [""])))) + trail
+
+    def decode_line(self, line):
+        gaps = _GAP.findall(line.strip(" \t"))
+        if not gaps:
+            return 0, 0
+        bits = bytes(map(min, map(len, gaps), repeat(2))).translate(_GAP_BITS)
+        return int(bits, 2), len(gaps)
+
+
+CODECS = {codec.name: codec for codec in (SpaceCodec(), TrailingCodec(2), TrailingCodec(4),
+                                          TrailingCodec(8), WordGapCodec())}
+DEFAULT = "space"
+
+
+def get_codec(name) -> Codec:
+    try:
+        return CODECS[name]
+    except KeyError:
+        raise ValueError(f"неизвестный кодек {name!r}; есть: {', '.join(CODECS)}") from None
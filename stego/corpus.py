@@ -0,0 +1,278 @@
+"""
+Сообщение, разложенное по многим контейнерам (корпус файлов).
+
+Ёмкость контейнера - число строк, умноженное на число бит в строке у
+выбранного кодека (stego/codecs.py; по умолчанию бит на строку). Строки
+считаются по сырым байтам (count(b"\\n") блоками), без декодирования, и
+запоминаются в индексе <корпус>/.stego_index.json вместе с размером и mtime:
+при следующем запуске пересчитываются только изменённые файлы.
+
+Сообщение режется на части, каждая часть - в свой контейнер, перед частью
+заголовок HEADER: метка, id сообщения, номер части, число частей, длина
+всего сообщения и длина части. Поэтому при извлечении порядок файлов не
+важен, а нулевые байты в сообщении допустимы (конец части - по длине, а не
+по NUL). Контейнеры выбираются по индексу: наименьший, в который влезает
+остаток, иначе наибольший из оставшихся.
+
+    python -m stego index CORPUS
+    python -m stego hide CORPUS MESSAGE OUT_DIR [--jobs N] [--codec NAME]
+    python -m stego extract OUT_DIR MESSAGE [--jobs N] [--codec NAME]
+"""
+
+import argparse
+import bisect
+import json
+import os
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from laba3_extract import take_bytes
+from laba3_hide import embed_data, iter_data_blocks
+
+from .codecs import CODECS, DEFAULT, count_lines, get_codec
+
+INDEX_NAME = ".stego_index.json"
+INDEX_VERSION = 1
+
+MAGIC = b"LB3S"
+# метка, id сообщения, номер части, частей всего, длина сообщения, длина части
+HEADER = struct.Struct(">4s4sHHQI")
+# байт за раз при чтении части: заголовок не должен тянуть за собой весь файл
+PART_BLOCK = 4096
+
+
+def capacity(bits) -> int:
+    """Сколько байт сообщения влезет в контейнер из bits бит (за вычетом заголовка)."""
+    return max(bits // 8 - HEADER.size, 0)
+
+
+def _map(func, items, jobs):
+    if jobs > 1 and len(items) > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            return list(pool.map(func, items, chunksize=max(1, len(items) // (jobs * 4))))
+    return [func(item) for item in items]
+
+
+def _list_files(root):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name == INDEX_NAME or name.startswith(INDEX_NAME + "."):
+                continue
+            yield os.path.relpath(os.path.join(dirpath, name), root)
+
+
+def load_index(root) -> dict:
+    try:
+        with open(os.path.join(root, INDEX_NAME), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != INDEX_VERSION:
+        return {}
+    return data["files"]
+
+
+def save_index(root, files):
+    path = os.path.join(root, INDEX_NAME)
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"version": INDEX_VERSION, "files": files}, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _skip(rel, err):
+    print(f"Пропущен {rel}: {err}", file=sys.stderr)
+
+
+def _count_lines(path):
+    # ошибка - результатом, а не исключением: один файл не должен ронять весь пул
+    try:
+        return count_lines(path)
+    except OSError as e:
+        return e
+
+
+def build_index(root, jobs=1) -> dict:
+    """Обновляет индекс корпуса: {путь: [размер, mtime_ns, строк]}.
+
+    Файлы, которые не удалось прочитать, пропускаются (с сообщением в stderr).
+    """
+    old = load_index(root)
+    files = {}
+    todo = []
+    for rel in _list_files(root):
+        try:
+            st = os.stat(os.path.join(root, rel))
+        except OSError as e:
+            _skip(rel, e)
+            continue
+        entry = old.get(rel)
+        if entry and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+            files[rel] = entry
+        else:
+            files[rel] = [st.st_size, st.st_mtime_ns, None]
+            todo.append(rel)
+    counts = _map(_count_lines, [os.path.join(root, rel) for rel in todo], jobs)
+    for rel, lines in zip(todo, counts):
+        if isinstance(lines, OSError):
+            _skip(rel, lines)
+            del files[rel]
+        else:
+            files[rel][2] = lines
+    if files != old:
+        save_index(root, files)
+    return files
+
+
+def container_bits(root, files, codec=DEFAULT, jobs=1) -> dict:
+    """Ёмкость контейнеров индекса в битах для кодека: {путь: бит}.
+
+    Для кодеков с постоянным числом бит на строку - прямо по индексу,
+    для остальных (words) каждый файл приходится прочитать.
+    """
+    codec = get_codec(codec)
+    if codec.bits_per_line is not None:
+        return {rel: lines * codec.bits_per_line for rel, (_, _, lines) in files.items()}
+    rels = list(files)
+    return dict(zip(rels, _map(codec.capacity, [os.path.join(root, rel) for rel in rels], jobs)))
+
+
+def plan(bits, length):
+    """Раскладывает length байт по контейнерам ({путь: ёмкость в битах}):
+    [(путь, смещение, длина части)]. ValueError, если всего корпуса не хватает.
+    Пустое сообщение - одна пустая часть, а если места нет совсем - ни одной.
+    """
+    # (ёмкость, путь) по возрастанию; путь - чтобы порядок не зависел от словаря
+    free = sorted((capacity(n), rel) for rel, n in bits.items() if capacity(n) > 0)
+    total = sum(cap for cap, _ in free)
+    if total < length:
+        raise ValueError(f"Корпус слишком мал для сообщения: влезет {total} байт из {length}")
+    parts = []
+    offset = 0
+    while offset < length or (not parts and free):
+        rest = length - offset
+        i = bisect.bisect_left(free, (rest, ""))
+        cap, rel = free.pop(i if i < len(free) else -1)
+        size = min(cap, rest)
+        parts.append((rel, offset, size))
+        offset += size
+    return parts
+
+
+def _hide_part(task):
+    container, output, header, data, codec = task
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    embed_data(container, iter_data_blocks(header + data), output, codec)
+    return output
+
+
+def hide(root, message_path, out_dir, jobs=1, codec=DEFAULT):
+    """Прячет сообщение в контейнеры корпуса; результаты - в out_dir под теми же путями."""
+    files = build_index(root, jobs)
+    with open(message_path, "rb") as f:
+        message = f.read()
+    parts = plan(container_bits(root, files, codec, jobs), len(message))
+    message_id = os.urandom(4)
+    tasks = []
+    for number, (rel, offset, size) in enumerate(parts):
+        header = HEADER.pack(MAGIC, message_id, number, len(parts), len(message), size)
+        tasks.append((os.path.join(root, rel), os.path.join(out_dir, rel), header,
+                      message[offset:offset + size], codec))
+    return _map(_hide_part, tasks, jobs)
+
+
+def read_part(path, codec=DEFAULT):
+    """(заголовок, данные) части из файла или None, если в файле её нет."""
+    try:
+        with open(path, "r", encoding="windows-1251", buffering=1 << 20) as f:
+            blocks = get_codec(codec).iter_bytes(f, PART_BLOCK)
+            raw, rest = take_bytes(blocks, HEADER.size)
+            if len(raw) < HEADER.size:
+                return None
+            header = HEADER.unpack(raw)
+            if header[0] != MAGIC:
+                return None
+            data, _ = take_bytes(blocks, header[5], rest)
+    except (OSError, UnicodeDecodeError):
+        return None
+    if len(data) < header[5]:
+        return None
+    return header[1:], data
+
+
+def extract(root, output_path, jobs=1, codec=DEFAULT) -> int:
+    """Собирает сообщение из частей в файлах каталога root. Возвращает его длину."""
+    paths = [os.path.join(root, rel) for rel in _list_files(root)]
+    messages = {}
+    for found in _map(partial(read_part, codec=codec), paths, jobs):
+        if found is None:
+            continue
+        (message_id, number, count, length, _), data = found
+        messages.setdefault((message_id, count, length), {})[number] = data
+    complete = [(key, parts) for key, parts in messages.items() if len(parts) == key[1]]
+    if not complete:
+        raise ValueError("Не найдено ни одного полного сообщения")
+    if len(complete) > 1:
+        raise ValueError("В каталоге части нескольких сообщений")
+    (_, count, length), parts = complete[0]
+    message = b"".join(parts[i] for i in range(count))
+    if len(message) != length:
+        raise ValueError("Длина собранного сообщения не совпадает с заголовком")
+    with open(output_path, "wb") as f:
+        f.write(message)
+    return length
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m stego",
+                                     description="Сообщение в корпусе контейнеров")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("index", help="обновить индекс ёмкости корпуса")
+    p.add_argument("corpus")
+    p = sub.add_parser("hide", help="спрятать сообщение в корпусе")
+    p.add_argument("corpus")
+    p.add_argument("message")
+    p.add_argument("out_dir")
+    p = sub.add_parser("extract", help="собрать сообщение из файлов каталога")
+    p.add_argument("directory")
+    p.add_argument("output")
+    p = sub.add_parser("capacity", help="ёмкость контейнеров у каждого кодека")
+    p.add_argument("containers", nargs="+")
+    for name, p in sub.choices.items():
+        if name == "capacity":
+            continue
+        p.add_argument("--jobs", type=int, default=1, help="число процессов (по умолчанию 1)")
+        p.add_argument("--codec", default=DEFAULT, choices=CODECS,
+                       help=f"кодек, см. stego/codecs.py (по умолчанию {DEFAULT})")
+    args = parser.parse_args(argv)
+
+    if args.command == "capacity":
+        # для одиночного контейнера (laba3_hide.py): бит и байт сообщения
+        for path in args.containers:
+            print(path)
+            for name, codec in CODECS.items():
+                bits = codec.capacity(path)
+                print(f"  {name:<8} {bits:>12} бит  {bits // 8:>10} байт")
+        return 0
+
+    try:
+        if args.command == "index":
+            files = build_index(args.corpus, args.jobs)
+            bits = container_bits(args.corpus, files, args.codec, args.jobs)
+            total = sum(capacity(n) for n in bits.values())
+            print(f"Контейнеров: {len(files)}, ёмкость: {total} байт")
+        elif args.command == "hide":
+            outputs = hide(args.corpus, args.message, args.out_dir, args.jobs, args.codec)
+            print(f"Сообщение скрыто в {len(outputs)} контейнерах:")
+            for path in outputs:
+                print(f"  {path}")
+        else:
+            length = extract(args.directory, args.output, args.jobs, args.codec)
+            print(f"Сообщение извлечено: {length} байт")
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 1
+    return 0
@@ -0,0 +1,13 @@
+"""
+Тесты запускаются из корня репозитория: python -m pytest -q tests
+
+Пакеты (integrity, passwords, stego) и скрипты лежат в корне, а не
+устанавливаются, поэтому корень добавляется в sys.path.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
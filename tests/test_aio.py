@@ -0,0 +1,35 @@
+from integrity import aio
+from integrity.scanner import scan_dir
+
+
+def _tree(root, dirs):
+    for i in range(dirs):
+        sub = root / f"d{i:03}"
+        sub.mkdir()
+        (sub / "f.txt").write_bytes(bytes(range(i % 200, i % 200 + 40)))
+
+
+def test_same_result_as_scan_dir(tmp_path):
+    _tree(tmp_path, 30)
+    (tmp_path / "top.txt").write_bytes(b"top level file")
+    manifest = str(tmp_path / "hashes.json")
+    expected = list(scan_dir(str(tmp_path), manifest))
+    assert list(aio.scan_async(str(tmp_path), manifest, concurrency=3)) == expected
+
+
+def test_listings_prefetched_within_bound(tmp_path, monkeypatch):
+    # каталог с сотнями подкаталогов по одному файлу: обход забегает вперёд не больше чем
+    # на N * QUEUE_PER_OP файлов (= каталогов) и ещё столько же списков запрашивает заранее
+    _tree(tmp_path, 200)
+    listed = []
+    list_dir = aio._list_dir
+
+    def counting(path, *args):
+        listed.append(path)
+        return list_dir(path, *args)
+
+    monkeypatch.setattr(aio, "_list_dir", counting)
+    results = aio.scan_async(str(tmp_path), str(tmp_path / "hashes.json"), concurrency=2)
+    next(results)
+    assert len(listed) <= 1 + 2 * (2 * aio.QUEUE_PER_OP) + 1
+    assert len(list(results)) == 199
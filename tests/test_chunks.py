@@ -0,0 +1,103 @@
+"""Поблочный манифест (chunks.py): диапазоны изменений и режим append_only."""
+
+import os
+
+import pytest
+
+from integrity import api
+from integrity.chunks import ChunkPolicy, changed_ranges, reusable_chunks
+from integrity.cli import main as cli_main
+
+POLICY = ChunkPolicy(threshold=1024, size=256, append_only=True)
+
+
+def _tree(root):
+    (root / "small.txt").write_bytes(b"short")
+    (root / "log.bin").write_bytes(bytes(range(256)) * 8)  # 2048 байт - поблочный
+    return root
+
+
+def _changes(root, chunking):
+    events = []
+    api.verify(str(root), chunking=chunking,
+               on_change=lambda kind, path, ranges=None, source=None: events.append(
+                   (kind, path, ranges)))
+    return events
+
+
+@pytest.mark.parametrize("mode", [{}, {"aio": 4}, {"jobs": 2}])
+def test_append_only_small_file_changed(tmp_path, mode):
+    # файл без кусков: раньше reusable_chunks падал с KeyError: 'chunks'
+    root = _tree(tmp_path)
+    api.scan(str(root), chunking=POLICY, **mode)
+    with open(root / "small.txt", "ab") as f:
+        f.write(b" and longer")
+    events = []
+    changes = api.verify(str(root), chunking=POLICY, stats={},
+                         on_change=lambda kind, path, ranges=None, source=None: events.append(
+                             (kind, path)), **mode)
+    assert changes == 1
+    assert events == [("changed", "small.txt")]
+    assert not os.path.exists(root / "hash.json.new.tmp")
+
+
+def test_append_only_cli(tmp_path, capsys):
+    root = _tree(tmp_path)
+    args = ["--chunk-threshold", "1024", "--chunk-size", "256", "--append-only"]
+    assert cli_main(["scan", str(root)] + args) == 0
+    with open(root / "small.txt", "ab") as f:
+        f.write(b"!")
+    assert cli_main(["verify", str(root), "--json"] + args) == 1
+    assert '"path": "small.txt"' in capsys.readouterr().out
+
+
+def test_append_only_reuses_head_of_grown_file(tmp_path):
+    root = _tree(tmp_path)
+    api.scan(str(root), chunking=POLICY)
+    with open(root / "log.bin", "ab") as f:
+        f.write(bytes(range(1, 41)))  # повтор "ab" * 2n XOR16 не заметит
+    assert _changes(root, POLICY) == [("changed", "log.bin", [[2048, 2088]])]
+    # после записи в середину полный перехэш видит изменение, append_only - нет
+    with open(root / "log.bin", "r+b") as f:
+        f.seek(10)
+        f.write(b"X")
+    assert _changes(root, ChunkPolicy(1024, 256)) == [
+        ("changed", "log.bin", [[0, 256], [2048, 2088]])]
+
+
+def test_reusable_chunks_without_chunks():
+    meta = {"size": 10, "mtime_ns": 2, "ino": 1, "dev": 1}
+    old = {"hash": 1, "size": 5, "mtime_ns": 1, "ino": 1, "dev": 1}
+    assert reusable_chunks(POLICY, meta, old, None) == []
+    old_chunked = dict(old, size=512, chunk_size=256, chunks=[1, 2])
+    meta_grown = dict(meta, size=600)
+    assert reusable_chunks(POLICY, meta_grown, old_chunked, 256) == [1, 2]
+    assert reusable_chunks(POLICY, dict(meta_grown, ino=2), old_chunked, 256) == []
+
+
+def test_changed_ranges():
+    old = {"size": 1000, "chunk_size": 256, "chunks": [1, 2, 3, 4]}
+    new = {"size": 1200, "chunk_size": 256, "chunks": [1, 9, 3, 4, 5]}
+    assert changed_ranges(old, new) == [[256, 512], [1024, 1200]]
+    assert changed_ranges({"hash": 1}, new) is None
+
+
+@pytest.mark.parametrize("size", ["0", "1"])
+def test_chunk_size_below_two_rejected(tmp_path, capsys, size):
+    # кусок 0 или 1 байт - пустой список кусков и нулевой хэш у каждого файла
+    with pytest.raises(SystemExit) as exc:
+        cli_main(["scan", str(tmp_path), "--chunk-threshold", "1", "--chunk-size", size])
+    assert exc.value.code == 2
+    assert "размер куска должен быть не меньше 2 байт" in capsys.readouterr().err
+    assert not (tmp_path / "hash.json").exists()
+    with pytest.raises(ValueError):
+        ChunkPolicy(threshold=1, size=int(size))
+
+
+def test_smallest_chunk_size(tmp_path):
+    _tree(tmp_path)
+    api.scan(str(tmp_path), chunking=ChunkPolicy(threshold=1024, size=2))
+    with open(tmp_path / "log.bin", "r+b") as f:
+        f.seek(100)
+        f.write(b"\xff")
+    assert _changes(tmp_path, None) == [("changed", "log.bin", [[100, 102]])]
@@ -0,0 +1,136 @@
+"""Командная строка (integrity/cli.py): коды выхода и обновление эталона при проверке."""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from integrity import api, scanner
+from integrity.cli import EXIT_CHANGED, EXIT_ERROR, EXIT_OK, main
+from integrity.manifest import open_manifest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _tree(root):
+    root.mkdir(exist_ok=True)
+    (root / "sub").mkdir()
+    (root / "a.txt").write_bytes(bytes(range(1, 80)))
+    (root / "sub" / "b.txt").write_bytes(bytes(range(80, 200)))
+    return root
+
+
+def _records(root):
+    _, records = open_manifest(str(root / "hash.json"))
+    return dict(records)
+
+
+@pytest.mark.parametrize("command", ["check", "verify"])
+def test_check_and_verify_exit_codes(tmp_path, capsys, command):
+    root = _tree(tmp_path / "root")
+    if command == "verify":
+        assert main(["verify", str(root)]) == EXIT_ERROR  # нет hash.json
+        assert "не найден" in capsys.readouterr().out
+        api.scan(str(root))
+    else:
+        assert main(["check", str(root)]) == EXIT_OK  # создаёт hash.json
+        assert "Хэши сохранены (2 файлов)" in capsys.readouterr().out
+    assert main([command, str(root)]) == EXIT_OK
+    (root / "a.txt").write_bytes(b"changed")
+    assert main([command, str(root)]) == EXIT_CHANGED
+    assert "Файл изменён: a.txt" in capsys.readouterr().out
+    assert main([command, str(tmp_path / "missing")]) == EXIT_ERROR
+
+
+def test_scan_exit_codes(tmp_path, capsys):
+    root = _tree(tmp_path / "root")
+    assert main(["scan", str(root), "--json"]) == EXIT_OK
+    assert json.loads(capsys.readouterr().out)["files"] == 2
+    # пересоздание: изменения не ищутся, код - 0
+    (root / "a.txt").write_bytes(b"changed")
+    assert main(["scan", str(root)]) == EXIT_OK
+    assert main(["scan", str(root), str(tmp_path / "missing")]) == EXIT_ERROR
+
+
+def test_worst_code_of_several_roots(tmp_path, capsys):
+    ok = _tree(tmp_path / "ok")
+    changed = _tree(tmp_path / "changed")
+    api.scan(str(ok))
+    api.scan(str(changed))
+    (changed / "new.txt").write_bytes(b"new")
+    assert main(["verify", str(ok), str(changed)]) == EXIT_CHANGED
+    assert main(["verify", str(ok), str(changed), str(tmp_path / "missing")]) == EXIT_ERROR
+    out = capsys.readouterr().out
+    assert f"{changed}: Файл добавлен: new.txt" in out
+
+
+def test_read_error_is_exit_2(tmp_path, monkeypatch, capsys):
+    root = _tree(tmp_path / "root")
+    api.scan(str(root))
+    xor16_file = scanner.xor16_file
+
+    def failing(path, *args):
+        if path.endswith("b.txt"):
+            raise OSError("нет доступа")
+        return xor16_file(path, *args)
+
+    monkeypatch.setattr(scanner, "xor16_file", failing)
+    assert main(["verify", str(root), "--paranoid"]) == EXIT_ERROR
+    assert "нет доступа" in capsys.readouterr().err
+    assert main(["scan", str(root)]) == EXIT_ERROR
+
+
+def test_diff_exit_codes(tmp_path, capsys):
+    root = _tree(tmp_path / "root")
+    old = str(tmp_path / "old.json")
+    new = str(tmp_path / "new.json")
+    api.scan(str(root), old)
+    api.scan(str(root), new)
+    assert main(["diff", old, new]) == EXIT_OK
+    (root / "sub" / "b.txt").write_bytes(b"changed")
+    api.scan(str(root), new)
+    assert main(["diff", old, new]) == EXIT_CHANGED
+    assert f"Файл изменён: {os.path.join('sub', 'b.txt')}" in capsys.readouterr().out
+    assert main(["diff", old, str(tmp_path / "missing.json")]) == EXIT_ERROR
+    assert "Ошибка" in capsys.readouterr().err
+
+
+def test_bad_arguments_and_key(tmp_path):
+    root = _tree(tmp_path / "root")
+    with pytest.raises(SystemExit) as exc:
+        main(["verify", str(root), "--jobs", "x"])
+    assert exc.value.code == EXIT_ERROR
+    assert main(["verify", str(root), "--key-file", str(tmp_path / "no-key")]) == EXIT_ERROR
+
+
+def test_module_exit_code(tmp_path):
+    # python -m integrity передаёт код выхода процессу
+    root = _tree(tmp_path / "root")
+    run = [sys.executable, "-m", "integrity"]
+    assert subprocess.run(run + ["check", str(root)], cwd=ROOT,
+                          stdout=subprocess.DEVNULL).returncode == EXIT_OK
+    (root / "a.txt").write_bytes(b"changed")
+    assert subprocess.run(run + ["verify", str(root)], cwd=ROOT,
+                          stdout=subprocess.DEVNULL).returncode == EXIT_CHANGED
+
+
+def test_verify_refreshes_stat_not_reference_hashes(tmp_path):
+    root = _tree(tmp_path / "root")
+    api.scan(str(root))
+    before = _records(root)
+
+    # touch: содержимое то же - stat в эталоне обновляется, изменений нет
+    os.utime(root / "a.txt", ns=(10 ** 18, 10 ** 18))
+    assert api.verify(str(root)) == 0
+    after = _records(root)
+    assert after["a.txt"]["mtime_ns"] == 10 ** 18
+    assert after["a.txt"]["hash"] == before["a.txt"]["hash"]
+
+    # изменённый файл: эталонный хэш остаётся прежним, изменение видно и в следующий раз
+    (root / "sub" / "b.txt").write_bytes(b"changed")
+    (root / "new.txt").write_bytes(b"new")
+    assert api.verify(str(root)) == 2
+    assert _records(root) == after
+    assert api.verify(str(root)) == 2
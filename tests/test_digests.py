@@ -0,0 +1,111 @@
+"""Алгоритмы хэширования (integrity/digests.py): сверка с zlib/hashlib и манифест с несколькими алгоритмами."""
+
+import hashlib
+import os
+import random
+import zlib
+
+import pytest
+
+from integrity import api
+from integrity.digests import ALGORITHMS, file_digest, only_xor16, parse_algorithms
+from integrity.manifest import open_manifest, read_header
+from xor16 import BLOCK_SIZE, xor16_bytes, xor16_file_chunks
+
+REFERENCE = {
+    "xor16": xor16_bytes,
+    "crc32": zlib.crc32,
+    "adler32": zlib.adler32,
+    "sha256": lambda data: hashlib.sha256(data).hexdigest(),
+    "blake2b": lambda data: hashlib.blake2b(data).hexdigest(),
+}
+ALL = tuple(REFERENCE)
+SIZES = [0, 1, 2, 3, 1000, BLOCK_SIZE, BLOCK_SIZE + 7, 3 * BLOCK_SIZE + 1]
+
+
+def _data(size):
+    return random.Random(size).randbytes(size)
+
+
+def _file(tmp_path, data):
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_all_algorithms_covered():
+    assert sorted(ALGORITHMS) == sorted(REFERENCE)
+
+
+@pytest.mark.parametrize("name", ALL)
+@pytest.mark.parametrize("size", SIZES)
+def test_file_digest_matches_reference(tmp_path, name, size):
+    data = _data(size)
+    assert file_digest(_file(tmp_path, data), (name,)) == (REFERENCE[name](data), None)
+
+
+@pytest.mark.parametrize("name", ALL)
+def test_incremental_update(name):
+    data = _data(5001)
+    rnd = random.Random(1)
+    h = ALGORITHMS[name]()
+    pos = 0
+    while pos < len(data):
+        step = rnd.randrange(0, 300)
+        h.update(memoryview(data)[pos:pos + step])
+        pos += step
+    assert h.value() == REFERENCE[name](data)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_several_algorithms_in_one_read(tmp_path, size):
+    data = _data(size)
+    path = _file(tmp_path, data)
+    assert file_digest(path, ALL) == ([REFERENCE[name](data) for name in ALL], None)
+    order = ("blake2b", "crc32")
+    assert file_digest(path, order)[0] == [REFERENCE[name](data) for name in order]
+
+
+def test_chunks_are_xor16(tmp_path):
+    data = _data(10001)
+    path = _file(tmp_path, data)
+    value, chunks = file_digest(path, ("sha256", "crc32"), chunk_size=1024)
+    assert value == [REFERENCE["sha256"](data), REFERENCE["crc32"](data)]
+    assert chunks == xor16_file_chunks(path, 1024)
+    assert file_digest(path, ("xor16",), chunk_size=1024) == (xor16_bytes(data), chunks)
+
+
+def test_parse_algorithms():
+    assert parse_algorithms("xor16") == ("xor16",)
+    assert parse_algorithms(" SHA256 , crc32,") == ("sha256", "crc32")
+    for text in ("", ",", "md5", "sha256,md5"):
+        with pytest.raises(ValueError):
+            parse_algorithms(text)
+    assert only_xor16(["xor16"]) and not only_xor16(("xor16", "sha256"))
+
+
+def test_manifest_round_trip_with_several_algorithms(tmp_path):
+    root = tmp_path / "root"
+    (root / "sub").mkdir(parents=True)
+    files = {"a.bin": _data(100), os.path.join("sub", "b.bin"): _data(BLOCK_SIZE + 3),
+             "empty": b""}
+    for rel, data in files.items():
+        (root / rel).write_bytes(data)
+    algorithms = ("sha256", "xor16", "adler32", "blake2b", "crc32")
+    assert api.scan(str(root), algorithms=algorithms) == 3
+
+    path = str(root / "hash.json")
+    assert read_header(path)["algorithms"] == list(algorithms)
+    _, records = open_manifest(path)
+    hashes = {rel: entry["hash"] for rel, entry in records}
+    assert hashes == {rel: [REFERENCE[name](data) for name in algorithms]
+                      for rel, data in files.items()}
+
+    # при проверке алгоритмы берутся из заголовка
+    stats = {}
+    assert api.verify(str(root), paranoid=True, stats=stats) == 0
+    assert stats["hashed"] == 3
+    (root / "a.bin").write_bytes(_data(101)[:100])
+    events = []
+    api.verify(str(root), on_change=lambda kind, rel, *args: events.append((kind, rel)))
+    assert events == [("changed", "a.bin")]
@@ -0,0 +1,119 @@
+"""Записи медленного хэша (passwords/kdf.py, hashing.py): разбор, проверка, выбор параметров, переход со старого хэша."""
+
+import pytest
+
+from passwords import kdf
+from passwords.hashing import OK, legacy_hash, needs_upgrade, parse_record, verify_password
+from passwords.state import PasswordFile
+
+PASSWORD = "Пароль1aA!"
+CHEAP = "pbkdf2-sha256$i=1000"
+PARAMS = kdf.parse_params(CHEAP)
+
+needs_scrypt = pytest.mark.skipif(not kdf.HAVE_SCRYPT, reason="hashlib собран без scrypt")
+
+
+@pytest.fixture
+def cheap_kdf(monkeypatch):
+    monkeypatch.setenv(kdf.ENV_PARAMS, CHEAP)
+
+
+@pytest.mark.parametrize("params", [CHEAP, pytest.param("scrypt$ln=4,r=8,p=1", marks=needs_scrypt)])
+def test_record_round_trip(params):
+    scheme, values = kdf.parse_params(params)
+    record = kdf.make_record(PASSWORD, (scheme, values))
+    assert record.startswith(f"${params}$")
+    assert "=" not in record.split("$", 3)[3]
+    rec = parse_record(record)
+    assert rec == kdf.parse_record(record)
+    assert (rec.scheme, rec.params) == (scheme, values)
+    assert len(rec.salt) == kdf.SALT_SIZE and len(rec.digest) == kdf.DIGEST_SIZE
+    assert verify_password(rec, PASSWORD)
+    assert not verify_password(rec, PASSWORD + "x")
+    # соль каждый раз новая
+    assert kdf.make_record(PASSWORD, (scheme, values)) != record
+
+
+@pytest.mark.parametrize("record", [
+    "$pbkdf2-sha256$i=1000$c2FsdA",                    # не хватает поля
+    "$pbkdf2-sha256$i=1000$c2FsdA$ZGlnZXN0$лишнее",    # лишнее поле
+    "x$pbkdf2-sha256$i=1000$c2FsdA$ZGlnZXN0",          # не с '$'
+    "$md5$i=1000$c2FsdA$ZGlnZXN0",                     # неизвестная схема
+    "$pbkdf2-sha256$n=1000$c2FsdA$ZGlnZXN0",           # не те параметры
+    "$pbkdf2-sha256$i=abc$c2FsdA$ZGlnZXN0",            # не число
+    "$pbkdf2-sha256$i=0$c2FsdA$ZGlnZXN0",              # не положительное
+    "$pbkdf2-sha256$i=-5$c2FsdA$ZGlnZXN0",
+    "$scrypt$ln=14,r=8$c2FsdA$ZGlnZXN0",               # не хватает параметра
+    "$pbkdf2-sha256$i=1000$c2Fs*A$ZGlnZXN0",           # не base64
+    "$pbkdf2-sha256$i=1000$c2FsdA$Z",                  # обрезанный base64
+])
+def test_malformed_record(record):
+    assert kdf.parse_record(record) is None
+    assert parse_record(record) is None
+    assert not verify_password(None, PASSWORD)
+
+
+@pytest.mark.parametrize("text", ["", "abc", "12.5", "MAGIC", "BLOCKED"])
+def test_not_a_hash(text):
+    assert parse_record(text) is None
+    assert not needs_upgrade(None)
+
+
+def test_legacy_integer_record():
+    parsed = parse_record(str(legacy_hash(PASSWORD)))
+    assert parsed == legacy_hash(PASSWORD)
+    assert verify_password(parsed, PASSWORD)
+    assert not verify_password(parsed, "другой")
+    assert needs_upgrade(parsed)
+    # xor16 по два байта: пароль с переставленными парами тоже проходит - поэтому и переход
+    assert verify_password(parse_record(str(legacy_hash("Password"))), "ssPardwo")
+
+
+def test_current_params_from_environment(monkeypatch):
+    monkeypatch.delenv(kdf.ENV_PARAMS, raising=False)
+    assert kdf.current_params() == kdf.DEFAULT_PARAMS
+    monkeypatch.setenv(kdf.ENV_PARAMS, CHEAP)
+    assert kdf.current_params() == (kdf.PBKDF2, (("i", 1000),))
+    assert parse_record(kdf.make_record(PASSWORD)).params == (("i", 1000),)
+    monkeypatch.setenv(kdf.ENV_PARAMS, "md5$i=1")
+    with pytest.raises(ValueError):
+        kdf.current_params()
+
+
+@pytest.mark.parametrize("text", ["md5$i=1", "pbkdf2-sha256$", "pbkdf2-sha256$i=0",
+                                  "pbkdf2-sha256$i=1,j=2", "scrypt$ln=14"])
+def test_bad_params(text):
+    with pytest.raises(ValueError):
+        kdf.parse_params(text)
+
+
+def test_needs_upgrade_follows_current_params(monkeypatch):
+    rec = parse_record(kdf.make_record(PASSWORD, PARAMS))
+    monkeypatch.setenv(kdf.ENV_PARAMS, CHEAP)
+    assert not needs_upgrade(rec)
+    monkeypatch.setenv(kdf.ENV_PARAMS, "pbkdf2-sha256$i=2000")
+    assert needs_upgrade(rec)
+
+
+def test_legacy_record_upgraded_on_login(tmp_path, cheap_kdf):
+    path = tmp_path / "password.txt"
+    path.write_text(str(legacy_hash(PASSWORD)), encoding="utf-8")
+    store = PasswordFile(path)
+    assert store.login("неверный")[0] != OK
+    assert store.read() == (str(legacy_hash(PASSWORD)), 1)
+    assert store.login(PASSWORD)[0] == OK
+    record, failed = store.read()
+    assert failed == 0
+    rec = parse_record(record)
+    assert (rec.scheme, rec.params) == PARAMS
+    assert not needs_upgrade(rec)
+    assert store.login(PASSWORD)[0] == OK
+    assert store.read()[0] == record
+
+
+def test_record_upgraded_when_params_change(tmp_path, monkeypatch):
+    path = tmp_path / "password.txt"
+    path.write_text(kdf.make_record(PASSWORD, PARAMS), encoding="utf-8")
+    monkeypatch.setenv(kdf.ENV_PARAMS, "pbkdf2-sha256$i=1500")
+    assert PasswordFile(path).login(PASSWORD)[0] == OK
+    assert parse_record(PasswordFile(path).read()[0]).params == (("i", 1500),)
@@ -0,0 +1,118 @@
+"""Манифест JSON Lines (manifest.py) и сверка слиянием потоков (compare.py)."""
+
+import json
+import os
+
+import pytest
+
+from integrity import api
+from integrity.compare import merge_join
+from integrity.manifest import open_manifest, path_key, read_header, write_manifest
+
+
+def _events(root, **kwargs):
+    events = []
+    api.verify(str(root), on_change=lambda kind, path, ranges=None, source=None: events.append(
+        (kind, path)), **kwargs)
+    return events
+
+
+def _tree(root):
+    (root / "a").mkdir()
+    (root / "a" / "b.txt").write_text("b")
+    (root / "a.txt").write_text("a.txt")
+    (root / "z.txt").write_text("z")
+    return root
+
+
+def test_roundtrip_sorted_by_path_key(tmp_path):
+    path = str(tmp_path / "hash.json")
+    records = [("a.txt", {"hash": 1, "size": 1, "mtime_ns": 2, "ino": 3, "dev": 4}),
+               (os.path.join("a", "b"), {"hash": 2}),
+               ("big", {"hash": 3, "size": 9, "mtime_ns": 2, "ino": 5, "dev": 4,
+                        "chunk_size": 4, "chunks": [1, 2, 0]})]
+    records.sort(key=lambda rec: path_key(rec[0]))
+    assert [rec[0] for rec in records] == [os.path.join("a", "b"), "a.txt", "big"]
+    assert write_manifest(path, iter(records), 42, ("xor16", "sha256")) == 3
+    header = read_header(path)
+    assert header["scanned_ns"] == 42 and header["algorithms"] == ["xor16", "sha256"]
+    scanned_ns, stream = open_manifest(path)
+    assert scanned_ns == 42 and list(stream) == records
+
+
+def test_legacy_versions(tmp_path):
+    v1 = tmp_path / "v1.json"
+    v1.write_text(json.dumps({"b": 2, "a": 1}))
+    assert open_manifest(str(v1))[0] == 0
+    assert list(open_manifest(str(v1))[1]) == [("a", {"hash": 1}), ("b", {"hash": 2})]
+    v2 = tmp_path / "v2.json"
+    v2.write_text(json.dumps({"version": 2, "scanned_ns": 7,
+                              "files": {"x": {"hash": 5, "size": 1}}}))
+    scanned_ns, stream = open_manifest(str(v2))
+    assert scanned_ns == 7 and list(stream) == [("x", {"hash": 5, "size": 1})]
+    assert read_header(str(v2))["algorithms"] == ["xor16"]
+
+
+def test_merge_join():
+    old = [("a", 1), ("b", 2), ("d", 4)]
+    new = [("b", 20), ("c", 30), ("d", 4)]
+    assert list(merge_join(old, new)) == [("a", 1, None), ("b", 2, 20), ("c", None, 30),
+                                          ("d", 4, 4)]
+
+
+def test_verify_reports_changes(tmp_path):
+    root = _tree(tmp_path)
+    assert api.scan(str(root)) == 3
+    assert _events(root) == []
+    (root / "a" / "b.txt").write_text("changed")
+    (root / "z.txt").unlink()
+    (root / "new.txt").write_text("new")
+    assert _events(root) == [("changed", os.path.join("a", "b.txt")), ("added", "new.txt"),
+                             ("deleted", "z.txt")]
+
+
+def test_verify_uses_stat_cache(tmp_path):
+    root = _tree(tmp_path)
+    for name in ("a.txt", "z.txt", os.path.join("a", "b.txt")):
+        os.utime(root / name, ns=(10 ** 18, 10 ** 18))  # старше скана - кэшу можно верить
+    api.scan(str(root))
+    stats = {}
+    api.verify(str(root), stats=stats)
+    assert stats["hashed"] == 0 and stats["cached"] == 3
+    stats = {}
+    api.verify(str(root), paranoid=True, stats=stats)
+    assert stats["hashed"] == 3
+
+
+def test_failed_write_removes_tmp(tmp_path):
+    path = str(tmp_path / "hash.json")
+
+    def records():
+        yield "a", {"hash": 1}
+        raise RuntimeError("обход упал")
+
+    with pytest.raises(RuntimeError):
+        write_manifest(path, records(), 0)
+    assert os.listdir(tmp_path) == []
+
+
+def test_verify_closes_streams_on_error(tmp_path, monkeypatch):
+    root = _tree(tmp_path)
+    api.scan(str(root))
+    (root / "z.txt").write_text("changed")
+    opened = []
+
+    def tracking_open(path, key=None):
+        scanned_ns, stream = open_manifest(path, key)
+        opened.append(stream)
+        return scanned_ns, stream
+
+    def on_change(*args, **kwargs):
+        raise RuntimeError("обработчик упал")
+
+    monkeypatch.setattr(api, "open_manifest", tracking_open)
+    with pytest.raises(RuntimeError):
+        api.verify(str(root), on_change=on_change)
+    assert len(opened) == 2
+    assert all(stream.gi_frame is None for stream in opened)  # генераторы закрыты
+    assert sorted(os.listdir(root)) == ["a", "a.txt", "hash.json", "z.txt"]
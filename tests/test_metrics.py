@@ -0,0 +1,58 @@
+"""Метрики (metrics.py): счётчики, гистограммы, вывод и цена выключенных метрик."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def enabled():
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.disable()
+    metrics.reset()
+
+
+def test_counters_and_histograms(enabled):
+    add = metrics.counter("t_total", kind="x")
+    add()
+    metrics.inc("t_total", 4, kind="x")
+    metrics.observe("t_seconds", 0.003)
+    metrics.observe("t_seconds", 100)
+    data = metrics.snapshot()
+    assert {"name": "t_total", "labels": {"kind": "x"}, "value": 5} in data["counters"]
+    (h,) = [h for h in data["histograms"] if h["name"] == "t_seconds"]
+    assert h["count"] == 2 and h["buckets"][-1] == ["+Inf", 2]
+    assert dict(h["buckets"])[0.005] == 1
+    text = metrics.to_prometheus()
+    assert 't_total{kind="x"} 5' in text
+    assert 't_seconds_bucket{le="+Inf"} 2' in text
+    metrics.reset()
+    add(2)  # ячейка та же и после reset
+    assert {"name": "t_total", "labels": {"kind": "x"}, "value": 2} in metrics.snapshot()["counters"]
+
+
+def test_scan_records_files(enabled, tmp_path):
+    from integrity import api
+    (tmp_path / "a").write_text("abcd")
+    api.scan(str(tmp_path))
+    counters = {(c["name"], tuple(c["labels"].items())): c["value"]
+                for c in metrics.snapshot()["counters"]}
+    assert counters[("integrity_files_total", (("source", "hashed"),))] == 1
+    assert counters[("integrity_hashed_bytes_total", ())] == 4
+
+
+def test_import_does_not_load_multiprocessing():
+    code = "import sys, integrity.api; print('multiprocessing' in sys.modules)"
+    env = {k: v for k, v in os.environ.items() if k not in (metrics.ENV_METRICS,
+                                                             metrics.ENV_PROFILE)}
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True, env=env)
+    assert out.stdout.strip() == "False"
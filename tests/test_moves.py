@@ -0,0 +1,94 @@
+"""Перемещения, переименования и копии при сверке (moves.py)."""
+
+import os
+
+import pytest
+
+from integrity import api
+from integrity.compare import ADDED, DELETED
+from integrity.moves import DUPLICATE, MOVED, RENAMED
+
+STRONG = ("xor16", "sha256")
+
+
+def _tree(root):
+    (root / "docs").mkdir()
+    (root / "docs" / "a.txt").write_bytes(bytes(range(1, 101)))
+    (root / "docs" / "b.txt").write_bytes(bytes(range(50, 180)))
+    (root / "keep.txt").write_bytes(b"unchanged content")
+
+
+def _verify(root):
+    events = []
+
+    def on_change(kind, rel_path, ranges=None, source=None):
+        events.append((kind, rel_path, source))
+
+    api.verify(str(root), on_change=on_change, moves=True)
+    return sorted(events)
+
+
+def _swap_words(data):
+    # другое содержимое того же размера и с тем же XOR16: слова меняются местами
+    return data[2:4] + data[0:2] + data[4:]
+
+
+def test_move_and_rename(tmp_path):
+    _tree(tmp_path)
+    api.scan(str(tmp_path), algorithms=STRONG)
+    (tmp_path / "other").mkdir()
+    os.rename(tmp_path / "docs" / "a.txt", tmp_path / "other" / "a.txt")
+    os.rename(tmp_path / "docs" / "b.txt", tmp_path / "docs" / "c.txt")
+    assert _verify(tmp_path) == [(MOVED, os.path.join("other", "a.txt"), os.path.join("docs", "a.txt")),
+                                 (RENAMED, os.path.join("docs", "c.txt"), os.path.join("docs", "b.txt"))]
+
+
+def test_duplicate_confirmed_from_disk(tmp_path):
+    # без криптографического хэша в манифесте копия подтверждается sha256 с диска
+    _tree(tmp_path)
+    api.scan(str(tmp_path))
+    (tmp_path / "copy.txt").write_bytes((tmp_path / "docs" / "a.txt").read_bytes())
+    assert _verify(tmp_path) == [(DUPLICATE, "copy.txt", os.path.join("docs", "a.txt"))]
+
+
+def test_duplicate_weak_collision(tmp_path):
+    _tree(tmp_path)
+    api.scan(str(tmp_path))
+    (tmp_path / "copy.txt").write_bytes(_swap_words((tmp_path / "docs" / "a.txt").read_bytes()))
+    assert _verify(tmp_path) == [(ADDED, "copy.txt", None)]
+
+
+@pytest.mark.parametrize("algorithms", [("xor16",), STRONG])
+def test_rename_with_weak_collision_is_not_hidden(tmp_path, algorithms):
+    # переименование и правка на месте с тем же размером и XOR16 (тот же inode):
+    # без sha256 в манифесте это не переименование, а удаление и добавление
+    _tree(tmp_path)
+    api.scan(str(tmp_path), algorithms=algorithms)
+    old = tmp_path / "docs" / "a.txt"
+    new = tmp_path / "docs" / "renamed.txt"
+    os.rename(old, new)
+    data = new.read_bytes()
+    with open(new, "r+b") as f:
+        f.write(_swap_words(data))
+    assert _verify(tmp_path) == [(ADDED, os.path.join("docs", "renamed.txt"), None),
+                                 (DELETED, os.path.join("docs", "a.txt"), None)]
+
+
+def test_rename_without_strong_digest(tmp_path):
+    # нетронутый файл, но хэш в манифесте только XOR16: подтвердить нечем
+    _tree(tmp_path)
+    api.scan(str(tmp_path))
+    os.rename(tmp_path / "docs" / "a.txt", tmp_path / "docs" / "z.txt")
+    assert _verify(tmp_path) == [(ADDED, os.path.join("docs", "z.txt"), None),
+                                 (DELETED, os.path.join("docs", "a.txt"), None)]
+
+
+def test_diff_reports_moves(tmp_path):
+    _tree(tmp_path)
+    old = str(tmp_path / "old.json")
+    api.scan(str(tmp_path), old, algorithms=STRONG)
+    os.rename(tmp_path / "docs" / "a.txt", tmp_path / "a.txt")
+    new = str(tmp_path / "new.json")
+    api.scan(str(tmp_path), new, algorithms=STRONG)
+    events = [e for e in api.diff(old, new, moves=True) if not e[1].endswith(".json")]
+    assert events == [(MOVED, "a.txt", os.path.join("docs", "a.txt"))]
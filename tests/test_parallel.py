@@ -0,0 +1,36 @@
+from integrity import parallel
+from integrity.scanner import scan_dir
+
+
+def _tree(root):
+    for i in range(10):
+        (root / f"f{i}.txt").write_bytes(bytes(range(i, i + 50)))
+    (root / "bad.txt").write_bytes(b"unreadable")
+
+
+def test_same_result_as_scan_dir(tmp_path):
+    _tree(tmp_path)
+    manifest = str(tmp_path / "hashes.json")
+    stats = {}
+    expected = list(scan_dir(str(tmp_path), manifest))
+    assert list(parallel.scan_parallel(str(tmp_path), manifest, 2, stats=stats)) == expected
+    assert stats == {"hashed": 11, "cached": 0, "errors": 0}
+
+
+def test_batch_error_is_reported_per_file(tmp_path, monkeypatch, capsys):
+    # пул запускается через fork, так что подмена видна и в процессах пула
+    _tree(tmp_path)
+    file_digest = parallel.file_digest
+
+    def failing(path, *args):
+        if path.endswith("bad.txt"):
+            raise ValueError("не читается")
+        return file_digest(path, *args)
+
+    monkeypatch.setattr(parallel, "file_digest", failing)
+    stats = {}
+    found = list(parallel.scan_parallel(str(tmp_path), str(tmp_path / "hashes.json"), 2,
+                                        stats=stats))
+    assert [rel for rel, _ in found] == [f"f{i}.txt" for i in range(10)]
+    assert stats == {"hashed": 10, "cached": 0, "errors": 1}
+    assert "bad.txt: не читается" in capsys.readouterr().err
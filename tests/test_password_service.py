@@ -0,0 +1,122 @@
+"""Пакетная проверка паролей (passwords/service.py): результаты, счётчики, поток запросов."""
+
+import io
+
+import pytest
+
+from passwords import kdf, service
+from passwords.credentials import load_credentials
+from passwords.hashing import (BLOCKED, DENIED, ERROR, LOCKED, OK, SETUP, UNKNOWN, legacy_hash,
+                               parse_record)
+from passwords.service import PasswordService
+
+PASSWORD = "Пароль1aA!"
+PARAMS = kdf.parse_params("pbkdf2-sha256$i=1000")
+
+
+@pytest.fixture(autouse=True)
+def cheap_kdf(monkeypatch):
+    monkeypatch.setenv(kdf.ENV_PARAMS, kdf.format_params(*PARAMS))
+
+
+def _db(tmp_path, *lines):
+    path = tmp_path / "users.tsv"
+    path.write_text("".join(line + "\n" for line in lines), encoding="utf-8")
+    return str(path)
+
+
+def _service(tmp_path, **kwargs):
+    record = kdf.make_record(PASSWORD, PARAMS)
+    db = _db(tmp_path, "# комментарий", "", f"anna\t{record}", "boris\tMAGIC",
+             "vera\tSTOP\t0", f"gleb\t{record}\t2")
+    return PasswordService(db, **kwargs)
+
+
+def test_result_codes(tmp_path):
+    svc = _service(tmp_path)
+    assert svc.check("anna", PASSWORD) == OK
+    assert svc.check("anna", "неверный") == DENIED
+    assert svc.check("boris", PASSWORD) == SETUP
+    assert svc.check("vera", PASSWORD) == LOCKED
+    assert svc.check("нет такого", PASSWORD) == UNKNOWN
+    assert svc.handle_line("anna".encode("utf-8")) == f"anna\t{ERROR}\n".encode("utf-8")
+
+
+def test_attempts_reset_and_lockout(tmp_path):
+    svc = _service(tmp_path, max_attempts=3)
+    assert [svc.check("anna", "неверный") for _ in range(2)] == [DENIED, DENIED]
+    assert svc.index["anna"].attempts == 2
+    assert svc.check("anna", PASSWORD) == OK
+    assert svc.index["anna"].attempts == 0
+    assert [svc.check("anna", "неверный") for _ in range(3)] == [DENIED] * 3
+    assert svc.index["anna"].record == BLOCKED
+    assert svc.check("anna", PASSWORD) == LOCKED
+    # счётчик из файла учитывается: у gleb осталась одна попытка
+    assert svc.check("gleb", "неверный") == DENIED
+    assert svc.check("gleb", PASSWORD) == LOCKED
+
+
+def test_legacy_record_upgraded_on_login(tmp_path):
+    svc = PasswordService(_db(tmp_path, f"anna\t{legacy_hash(PASSWORD)}"))
+    assert svc.check("anna", "неверный") == DENIED
+    assert isinstance(svc.index["anna"].parsed, int)
+    assert svc.check("anna", PASSWORD) == OK
+    record = svc.index["anna"].record
+    assert parse_record(record).params == PARAMS[1]
+    svc.flush()
+    assert load_credentials(svc.db_path)["anna"].record == record
+    assert svc.check("anna", PASSWORD) == OK
+
+
+class _ShortReads(io.RawIOBase):
+    # отдаёт по 5 байт: строки запросов рвутся между чтениями
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._data.read(min(len(buffer), 5))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def test_serve_stream_round_trip(tmp_path):
+    svc = _service(tmp_path)
+    requests = (f"anna\t{PASSWORD}\nanna\tневерный\r\n\nboris\tx\nплохая строка\n"
+                f"нет\tx\nanna\t{PASSWORD}").encode("utf-8")
+    out = io.BytesIO()
+    svc.serve_stream(io.BufferedReader(_ShortReads(requests), buffer_size=16), out)
+    assert out.getvalue().decode("utf-8").splitlines() == [
+        f"anna\t{OK}", f"anna\t{DENIED}", f"boris\t{SETUP}", f"плохая строка\t{ERROR}",
+        f"нет\t{UNKNOWN}", f"anna\t{OK}"]
+
+
+def test_counters_flushed_in_batches(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "FLUSH_INTERVAL", 3600.0)
+    monkeypatch.setattr(service, "FLUSH_EVENTS", 2)
+    svc = _service(tmp_path)
+    svc.serve_stream(io.BufferedReader(io.BytesIO(b"anna\t1\n")), io.BytesIO())
+    # одно изменение - ещё в памяти, файл не тронут
+    assert svc.pending == 1
+    assert load_credentials(svc.db_path)["anna"].attempts == 0
+    svc.serve_stream(io.BufferedReader(io.BytesIO(b"anna\t2\n")), io.BytesIO())
+    assert svc.pending == 0
+    assert load_credentials(svc.db_path)["anna"].attempts == 2
+    # по времени: накопилось мало, но интервал прошёл
+    monkeypatch.setattr(service, "FLUSH_INTERVAL", 0.0)
+    svc.check("anna", PASSWORD)
+    svc.maybe_flush()
+    saved = load_credentials(svc.db_path)
+    assert saved["anna"].attempts == 0
+    assert saved["gleb"].attempts == 2
+    assert list(saved) == ["anna", "boris", "vera", "gleb"]
+
+
+def test_flush_without_changes_keeps_file(tmp_path):
+    svc = _service(tmp_path)
+    before = open(svc.db_path, encoding="utf-8").read()
+    svc.check("anna", PASSWORD)
+    svc.flush()
+    assert open(svc.db_path, encoding="utf-8").read() == before
@@ -0,0 +1,120 @@
+"""Файл пароля со счётчиком попыток (passwords/state.py): лимит на все процессы, запись, брошенные попытки."""
+
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from passwords import kdf, state
+from passwords.hashing import BLOCKED, DENIED, LOCKED, OK
+from passwords.state import PasswordFile
+
+PASSWORD = "Пароль1aA!"
+# дешёвый kdf: в тестах важны блокировки, а не стоимость хэша
+PARAMS = kdf.parse_params("pbkdf2-sha256$i=1000")
+
+
+@pytest.fixture
+def cheap_kdf(monkeypatch):
+    monkeypatch.setenv(kdf.ENV_PARAMS, kdf.format_params(*PARAMS))
+
+
+@pytest.fixture
+def record():
+    return kdf.make_record(PASSWORD, PARAMS)
+
+
+def _password_file(tmp_path, text):
+    path = tmp_path / "password.txt"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def _dead_pid():
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()
+    return proc.pid
+
+
+def _guess(path, count):
+    return [PasswordFile(path).login("неверный")[0] for _ in range(count)]
+
+
+def test_wrong_password_locks_out(tmp_path, cheap_kdf, record):
+    path = _password_file(tmp_path, record)
+    store = PasswordFile(path, max_attempts=3)
+    assert store.login("неверный") == (DENIED, 2)
+    assert store.read() == (record, 1)
+    assert store.login(PASSWORD) == (OK, 3)
+    assert store.read() == (record, 0)
+    assert [store.login("неверный") for _ in range(3)] == [(DENIED, 2), (DENIED, 1), (DENIED, 0)]
+    assert path.read_text(encoding="utf-8") == BLOCKED
+    assert store.login(PASSWORD) == (LOCKED, 0)
+
+
+@pytest.mark.skipif(state.fcntl is None, reason="нужна блокировка fcntl")
+def test_concurrent_guesses_share_the_limit(tmp_path, cheap_kdf, record):
+    path = _password_file(tmp_path, record)
+    with multiprocessing.get_context("fork").Pool(6) as pool:
+        results = sum(pool.starmap(_guess, [(str(path), 5)] * 6), [])
+    assert results.count(DENIED) <= 3
+    assert results.count(OK) == 0
+    assert path.read_text(encoding="utf-8") == BLOCKED
+
+
+def test_write_is_atomic(tmp_path, cheap_kdf, record, monkeypatch):
+    # запись падает до переименования: старый файл цел, временного не осталось
+    path = _password_file(tmp_path, record)
+
+    def fail(src, dst):
+        raise OSError("диск отвалился")
+
+    monkeypatch.setattr(state.os, "replace", fail)
+    with pytest.raises(OSError):
+        PasswordFile(path).login(PASSWORD)
+    assert path.read_text(encoding="utf-8") == record
+    assert [name for name in os.listdir(tmp_path) if ".tmp" in name] == []
+
+
+def test_orphaned_reservation_counts_as_failure(tmp_path, cheap_kdf, record):
+    # процесс упал посреди проверки: его попытка неудачная, но вход с верным паролем проходит
+    path = _password_file(tmp_path, f"{record}\n0\n{_dead_pid()}:{time.time_ns()}\n")
+    store = PasswordFile(path, max_attempts=3)
+    assert store.login("неверный") == (DENIED, 1)
+    assert store.read() == (record, 2)
+    assert store.login(PASSWORD) == (OK, 3)
+    assert path.read_text(encoding="utf-8") == record
+
+
+@pytest.mark.parametrize("held", ["{dead}:{now} {dead}:{now} {dead}:{now}",
+                                  "{live}:{old} {live}:{old} {live}:{old}"])
+def test_orphaned_reservations_block(tmp_path, cheap_kdf, record, held):
+    # все попытки заняты упавшими (или зависшими) процессами - блокировка сразу, без ожидания
+    now = time.time_ns()
+    held = held.format(dead=_dead_pid(), live=os.getpid(), now=now,
+                       old=now - int(state.STALE_AFTER * 2e9))
+    path = _password_file(tmp_path, f"{record}\n0\n{held}\n")
+    started = time.monotonic()
+    assert PasswordFile(path, max_attempts=3).login(PASSWORD) == (LOCKED, 0)
+    assert time.monotonic() - started < state.WAIT_TIMEOUT
+    assert path.read_text(encoding="utf-8") == BLOCKED
+
+
+def test_old_format_counter_at_limit_blocks(tmp_path, cheap_kdf, record):
+    # файл прежней версии: попытки заняты процессами, которых уже нет
+    path = _password_file(tmp_path, f"{record}\n3\n")
+    assert PasswordFile(path, max_attempts=3).login(PASSWORD) == (LOCKED, 0)
+    assert path.read_text(encoding="utf-8") == BLOCKED
+
+
+def test_live_reservations_wait_without_blocking(tmp_path, cheap_kdf, record, monkeypatch):
+    # попытки заняты живыми проверками: ждём и отказываем, но файл не блокируем
+    monkeypatch.setattr(state, "WAIT_TIMEOUT", 0.05)
+    now = time.time_ns()
+    text = f"{record}\n1\n{os.getpid()}:{now} {os.getpid()}:{now + 1}\n"
+    path = _password_file(tmp_path, text)
+    assert PasswordFile(path, max_attempts=3).login(PASSWORD) == (LOCKED, 0)
+    assert path.read_text(encoding="utf-8") == text
@@ -0,0 +1,116 @@
+"""Сложность пароля (passwords/policy.py): совпадение с исходной проверкой лабораторной и аудит."""
+
+import json
+import random
+
+import pytest
+
+from passwords import policy
+from passwords.policy import DEFAULT_CLASSES, Policy, audit, check_many
+
+# символы на границах диапазонов и те, что легко отнести не туда:
+# ё/Ё вне а–я, цифры других письменностей, пробелы, диакритика, эмодзи
+CORPUS = ("azAZmM`{@[" "аяАЯёЁжЖ" "09\u0663\u07c0²" " \t\u00a0\u2003" "!-_.,/\\" "éÉßµçñ" "Ωωλ"
+          "中文" "\U0001f600" "\u0301\u200b" "ıİ")
+
+
+def reference(password: str) -> dict:
+    # проверка из исходной лабораторной (infolaba2.py): цепочка elif по символам
+    found = dict.fromkeys(DEFAULT_CLASSES, False)
+    for ch in password:
+        if 'a' <= ch <= 'z':
+            found["latin_lower"] = True
+        elif 'A' <= ch <= 'Z':
+            found["latin_upper"] = True
+        elif 'а' <= ch <= 'я':
+            found["cyrillic_lower"] = True
+        elif 'А' <= ch <= 'Я':
+            found["cyrillic_upper"] = True
+        elif ch.isdigit() or (not ch.isalnum()):
+            found["digit_or_sign"] = True
+    return found
+
+
+def reference_ok(password: str) -> bool:
+    return len(password) >= 6 and all(reference(password).values())
+
+
+def _passwords(count=3000, seed=1):
+    # в половину паролей подмешаны все пять классов, чтобы часть проходила
+    rnd = random.Random(seed)
+    passwords = []
+    for i in range(count):
+        chars = [rnd.choice(CORPUS) for _ in range(rnd.randrange(0, 14))]
+        if i % 2:
+            chars += rnd.sample("aAбБ1", 5)
+            rnd.shuffle(chars)
+        passwords.append("".join(chars))
+    return passwords
+
+
+@pytest.mark.parametrize("ch", CORPUS)
+def test_character_classes_match_reference(ch):
+    result = Policy(min_length=0).check(ch)
+    expected = tuple(name for name, found in reference(ch).items() if not found)
+    assert result.missing == expected
+
+
+def test_check_matches_reference():
+    checker = Policy()
+    passwords = _passwords() + ["aA1бБ_", "aAбБ1", "aAбБёЁ", "ЖжZz 7", "aAбБ\u0663x",
+                               "aAбБ\u0301x"]
+    expected = [reference_ok(p) for p in passwords]
+    assert [checker.check(p).ok for p in passwords] == expected
+    assert [checker.is_ok(p) for p in passwords] == expected
+    assert [(p, r.ok) for p, r in check_many(passwords)] == list(zip(passwords, expected))
+    # корпус не вырожден: есть и прошедшие, и непрошедшие
+    assert 0 < sum(expected) < len(passwords)
+
+
+def test_result_reasons():
+    checker = Policy()
+    result = checker.check("aБ1")
+    assert result == (False, True, ("latin_upper", "cyrillic_lower"))
+    assert checker.describe(result) == "меньше 6 символов; нет: заглавная латиница, строчная кириллица"
+    assert checker.describe(checker.check("aAбБ1_")) == ""
+
+
+def test_min_classes_and_other_classes():
+    checker = Policy(4, ("latin_lower", "digit", "sign"), min_classes=2)
+    assert checker.check("abcd12").ok
+    assert checker.check("ab!d").ok
+    assert not checker.check("abcdef").ok
+    assert checker.check("abcdef").missing == ("digit", "sign")
+    with pytest.raises(ValueError):
+        Policy(classes=("latin_lower", "greek"))
+    with pytest.raises(ValueError):
+        Policy(classes=())
+
+
+def test_audit_matches_check():
+    checker = Policy()
+    passwords = _passwords(seed=2)
+    failed = []
+    summary = audit(passwords, checker, on_fail=lambda p, r: failed.append((p, r)))
+    results = [checker.check(p) for p in passwords]
+    assert summary["total"] == len(passwords)
+    assert summary["passed"] == sum(r.ok for r in results)
+    assert summary["failed"] == len(failed) == summary["total"] - summary["passed"]
+    assert summary["too_short"] == sum(r.too_short for r in results)
+    assert failed == [(p, r) for p, r in zip(passwords, results) if not r.ok]
+    assert summary["missing"] == {name: sum(name in r.missing for r in results if not r.ok)
+                                  for name in DEFAULT_CLASSES}
+
+
+def test_audit_command(tmp_path, capsys):
+    path = tmp_path / "leaked.txt"
+    path.write_bytes("aA1бБ_\r\nкороткий\nqwerty12\n".encode("utf-8") + b"\xff\xfe\n")
+    assert policy.main([str(path), "--classes", "latin_lower,digit", "--json"]) == 0
+    summary = json.loads(capsys.readouterr().out)
+    assert summary == {"total": 4, "passed": 2, "failed": 2, "too_short": 1,
+                       "missing": {"latin_lower": 2, "digit": 2}}
+    assert policy.main([str(path), "--failed"]) == 0
+    out = capsys.readouterr().out
+    assert "короткий\t" in out and "Всего: 4, прошли: 1" in out
+    with pytest.raises(SystemExit):
+        policy.main([str(path), "--classes", "latin,digit"])
@@ -0,0 +1,208 @@
+"""Правила обхода (integrity/rules.py): шаблоны .gitignore, отбор файлов, пропуск каталогов."""
+
+import os
+import re
+import stat
+from types import SimpleNamespace
+
+import pytest
+
+from integrity import api, scanner
+from integrity.rules import Rules, _compile, _glob, translate
+
+
+@pytest.mark.parametrize("part, matches, other", [
+    ("*.tmp", ["a.tmp", ".tmp"], ["a.tmpx", "d/a.tmp"]),
+    ("?.c", ["a.c"], ["ab.c", "/.c"]),
+    ("[abc].txt", ["a.txt", "c.txt"], ["d.txt", "ab.txt"]),
+    ("[!abc]x", ["dx", "-x"], ["ax", "/x"]),
+    ("[^a-c]x", ["dx"], ["bx", "/x"]),
+    ("file[0-9]", ["file7"], ["filex", "file10"]),
+    ("[]]x", ["]x"], ["x", "]]x"]),
+    ("[!]]x", ["ax"], ["]x"]),
+    ("[abc", ["[abc"], ["a"]),
+    ("\\*", ["*"], ["a"]),
+    ("a\\[b]", ["a[b]"], ["ab"]),
+    ("a.b+c", ["a.b+c"], ["aXb+c", "a.bbc"]),
+])
+def test_glob(part, matches, other):
+    regex = re.compile(_glob(part))
+    assert [name for name in matches if regex.fullmatch(name)] == matches
+    assert [name for name in other if regex.fullmatch(name)] == []
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("", None),
+    ("   ", None),
+    ("# комментарий", None),
+    ("*.tmp", ("(?:.*/)?[^/]*\\.tmp", False, False)),
+    ("/build", ("build", False, False)),
+    ("logs/", ("(?:.*/)?logs", False, True)),
+    ("/out/", ("out", False, True)),
+    ("docs/**/*.pdf", ("docs/(?:.*/)?[^/]*\\.pdf", False, False)),
+    ("cache/**", ("cache/.*", False, False)),
+    ("**/tmp", ("(?:.*/)?tmp", False, False)),
+    ("!keep.tmp", ("(?:.*/)?keep\\.tmp", True, False)),
+    ("!/dist/", ("dist", True, True)),
+    ("\\!important", ("(?:.*/)?!important", False, False)),
+    ("\\#notes", ("(?:.*/)?\\#notes", False, False)),
+    ("a/b\n", ("a/b", False, False)),
+])
+def test_translate(pattern, expected):
+    assert translate(pattern) == expected
+
+
+def test_compile_groups_runs_in_reverse():
+    compiled = _compile(["*.a", "*.b", "", "# x", "!keep.a", "d1/", "d2/", "*.c"])
+    assert [(regex.pattern, negate, dir_only) for regex, negate, dir_only in compiled] == [
+        ("(?:(?:.*/)?[^/]*\\.c)", False, False),
+        ("(?:(?:.*/)?d1)|(?:(?:.*/)?d2)", False, True),
+        ("(?:(?:.*/)?keep\\.a)", True, False),
+        ("(?:(?:.*/)?[^/]*\\.a)|(?:(?:.*/)?[^/]*\\.b)", False, False),
+    ]
+
+
+EXCLUDED = [
+    # шаблоны, путь, каталог ли, исключён ли
+    (["*.tmp"], "a.tmp", False, True),
+    (["*.tmp"], "x/y/a.tmp", False, True),
+    (["*.tmp"], "a.tmp.txt", False, False),
+    (["/build"], "build", True, True),
+    (["/build"], "src/build", True, False),
+    (["build"], "src/build", True, True),
+    (["src/gen"], "src/gen", True, True),
+    (["src/gen"], "x/src/gen", True, False),
+    (["logs/"], "logs", True, True),
+    (["logs/"], "logs", False, False),
+    (["logs/"], "a/logs", True, True),
+    (["docs/**/*.pdf"], "docs/a.pdf", False, True),
+    (["docs/**/*.pdf"], "docs/x/y/a.pdf", False, True),
+    (["docs/**/*.pdf"], "other/docs/a.pdf", False, False),
+    (["cache/**"], "cache/a/b", False, True),
+    (["cache/**"], "cache", True, False),
+    (["**/tmp"], "a/b/tmp", True, True),
+    (["*.tmp", "!keep.tmp"], "keep.tmp", False, False),
+    (["*.tmp", "!keep.tmp"], "d/keep.tmp", False, False),
+    (["*.tmp", "!keep.tmp"], "lose.tmp", False, True),
+    (["!keep.tmp", "*.tmp"], "keep.tmp", False, True),  # побеждает последнее правило
+    (["*.tmp", "!*.tmp", "a.tmp"], "a.tmp", False, True),
+    (["*.tmp", "!*.tmp", "a.tmp"], "b.tmp", False, False),
+    (["d/", "!d/"], "d", True, False),
+    (["d/", "!d"], "d", True, False),
+    (["d", "!d/"], "d", False, True),  # "!d/" про каталоги, файл d остаётся исключённым
+    (["\\!important"], "!important", False, True),
+    (["!important"], "important", False, False),
+    (["[!a]b"], "cb", False, True),
+    (["[!a]b"], "ab", False, False),
+    (["a[!x]b"], "a/b", False, False),
+    (["x[0-9].log"], "d/x5.log", False, True),
+    (["x[0-9].log"], "d/xa.log", False, False),
+    (["a?c"], "a/c", False, False),
+]
+
+
+@pytest.mark.parametrize("patterns, path, is_dir, expected", EXCLUDED)
+def test_excluded(patterns, path, is_dir, expected):
+    assert Rules(patterns).excluded(path.replace("/", os.sep), is_dir) is expected
+
+
+@pytest.mark.parametrize("rules, path, is_symlink, expected", [
+    (Rules(), "a.txt", False, True),
+    (Rules(["*.tmp"]), "a.tmp", False, False),
+    (Rules(include=["*.py"]), "a/b.py", False, True),
+    (Rules(include=["*.py"]), "a/b.txt", False, False),
+    (Rules(include=["/src/**"]), "src/x/y.c", False, True),
+    (Rules(include=["/src/**"]), "lib/src/y.c", False, False),
+    (Rules(["test_*"], include=["*.py"]), "test_a.py", False, False),
+    (Rules(types=["file"]), "link", True, False),
+    (Rules(types=["symlink"]), "link", True, True),
+    (Rules(types=["symlink"]), "a.txt", False, True),  # обычный файл решает accepts
+])
+def test_wants(rules, path, is_symlink, expected):
+    assert rules.wants(path.replace("/", os.sep), is_symlink) is expected
+
+
+def _st(size, mode=stat.S_IFREG | 0o644):
+    return SimpleNamespace(st_size=size, st_mode=mode)
+
+
+@pytest.mark.parametrize("rules, st, is_symlink, expected", [
+    (Rules(), _st(0), False, True),
+    (Rules(min_size=10), _st(9), False, False),
+    (Rules(min_size=10), _st(10), False, True),
+    (Rules(max_size=10), _st(10), False, True),
+    (Rules(max_size=10), _st(11), False, False),
+    (Rules(types=["file"]), _st(5), False, True),
+    (Rules(types=["file"]), _st(0, stat.S_IFIFO | 0o644), False, False),
+    (Rules(types=["other"]), _st(0, stat.S_IFIFO | 0o644), False, True),
+    (Rules(types=["symlink"]), _st(5), True, True),
+    (Rules(types=["symlink"], max_size=4), _st(5), True, False),
+])
+def test_accepts(rules, st, is_symlink, expected):
+    assert rules.accepts(st, is_symlink) is expected
+
+
+def test_bad_type():
+    with pytest.raises(ValueError):
+        Rules(types=["file", "pipe"])
+
+
+class _Entry:
+    def __init__(self, dev=None, error=None):
+        self.dev = dev
+        self.error = error
+
+    def stat(self, follow_symlinks=True):
+        if self.error:
+            raise self.error
+        return SimpleNamespace(st_dev=self.dev)
+
+
+def test_prune_one_filesystem(tmp_path):
+    rules = Rules(["skip/"], one_filesystem=True)
+    root_dev = rules.root_device(str(tmp_path))
+    assert root_dev == os.stat(tmp_path).st_dev
+    assert rules.prune("skip", _Entry(root_dev), root_dev)
+    assert not rules.prune("same", _Entry(root_dev), root_dev)
+    assert rules.prune("mnt", _Entry(root_dev + 1), root_dev)
+    assert not rules.prune("gone", _Entry(error=FileNotFoundError()), root_dev)
+    assert Rules().root_device(str(tmp_path)) is None
+    assert not Rules().prune("mnt", _Entry(root_dev + 1), None)
+
+
+def test_round_trip_dict():
+    rules = Rules(["*.tmp", "!a.tmp"], ["*.txt"], True, 1, 100, ["file"])
+    again = Rules.from_dict(rules.to_dict())
+    assert again.to_dict() == rules.to_dict()
+    assert Rules.from_dict(None) is None
+
+
+def test_excluded_directory_is_never_listed(tmp_path, monkeypatch):
+    for rel in ["a.txt", "a.tmp", "keep.tmp", "node_modules/pkg/index.js",
+                "node_modules/keep.tmp", "src/b.txt", "src/build/out.o", "build/x.o"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rel.encode())
+    listed = []
+    list_dir = scanner._list_dir
+
+    def recording(path, root, stats):
+        listed.append(os.path.relpath(path, root))
+        return list_dir(path, root, stats)
+
+    monkeypatch.setattr(scanner, "_list_dir", recording)
+    rules = Rules(["node_modules/", "*.tmp", "!keep.tmp", "/build/"])
+    found = [rel for rel, _ in scanner.scan_dir(str(tmp_path), str(tmp_path / "hash.json"),
+                                                 rules=rules)]
+    assert sorted(listed) == [".", "src", os.path.join("src", "build")]
+    assert found == ["a.txt", "keep.tmp", os.path.join("src", "b.txt"),
+                     os.path.join("src", "build", "out.o")]
+
+    # правила сохраняются в манифесте: при проверке исключённое не считается удалённым
+    api.scan(str(tmp_path), rules=rules)
+    listed.clear()
+    (tmp_path / "node_modules" / "new.js").write_bytes(b"new")
+    events = []
+    api.verify(str(tmp_path), on_change=lambda kind, path, *args, **kwargs: events.append(path))
+    assert events == []
+    assert "node_modules" not in listed
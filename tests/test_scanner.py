@@ -0,0 +1,115 @@
+"""Обход и stat-кэш (integrity/scanner.py): когда файл не перечитывается."""
+
+import os
+
+import pytest
+
+from integrity import scanner
+from integrity.scanner import RACY_NS, cache_hit, scan_dir
+
+OLD_NS = 10 ** 18  # 2001 год: задолго до любого сканирования в тестах
+
+
+def _meta(**changes):
+    meta = {"size": 10, "mtime_ns": OLD_NS, "ino": 5, "dev": 1}
+    meta.update(changes)
+    return meta
+
+
+@pytest.mark.parametrize("old, meta, scanned_ns, chunk_size, expected", [
+    (_meta(hash=1), _meta(), OLD_NS + RACY_NS, None, True),
+    (None, _meta(), OLD_NS + RACY_NS, None, False),
+    ({"hash": 1}, _meta(), OLD_NS + RACY_NS, None, False),  # старый манифест без stat
+    (_meta(hash=1), _meta(mtime_ns=OLD_NS + 1), OLD_NS + 2 * RACY_NS, None, False),
+    (_meta(hash=1), _meta(size=11), OLD_NS + RACY_NS, None, False),
+    (_meta(hash=1), _meta(ino=6), OLD_NS + RACY_NS, None, False),
+    (_meta(hash=1), _meta(dev=2), OLD_NS + RACY_NS, None, False),
+    # изменён в пределах RACY_NS до прошлого сканирования - мог поменяться в том же тике
+    (_meta(hash=1), _meta(), OLD_NS + RACY_NS - 1, None, False),
+    (_meta(hash=1), _meta(), OLD_NS, None, False),
+    # файл стал поблочным или сменился размер куска
+    (_meta(hash=1), _meta(), OLD_NS + RACY_NS, 4, False),
+    (_meta(hash=1, chunk_size=4), _meta(), OLD_NS + RACY_NS, 4, True),
+    (_meta(hash=1, chunk_size=4), _meta(), OLD_NS + RACY_NS, 8, False),
+])
+def test_cache_hit(old, meta, scanned_ns, chunk_size, expected):
+    assert cache_hit(old, meta, scanned_ns, chunk_size) is expected
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    # пути файлов, которые scan_dir действительно прочитал
+    paths = []
+    xor16_file = scanner.xor16_file
+
+    def counting(path, *args):
+        paths.append(os.path.basename(path))
+        return xor16_file(path, *args)
+
+    monkeypatch.setattr(scanner, "xor16_file", counting)
+    return paths
+
+
+def _tree(root):
+    for i, name in enumerate(["a.txt", "b.txt", "c.txt"]):
+        (root / name).write_bytes(bytes(range(i * 40, i * 40 + 40)))
+        os.utime(root / name, ns=(OLD_NS, OLD_NS))
+
+
+def _scan(root, cache=None, scanned_ns=OLD_NS + RACY_NS, stats=None):
+    records = scan_dir(str(root), str(root / "hash.json"), iter(cache or []), scanned_ns,
+                       stats=stats)
+    return list(records)
+
+
+def test_unchanged_files_not_read(tmp_path, reads):
+    _tree(tmp_path)
+    first = _scan(tmp_path)
+    assert reads == ["a.txt", "b.txt", "c.txt"]
+    reads.clear()
+    stats = {}
+    assert _scan(tmp_path, first, stats=stats) == first
+    assert reads == []
+    assert stats == {"hashed": 0, "cached": 3, "errors": 0}
+
+
+def test_changed_stat_is_rehashed(tmp_path, reads):
+    _tree(tmp_path)
+    first = _scan(tmp_path)
+    # a: только mtime; b: размер; c: то же содержимое и mtime, но новый inode
+    os.utime(tmp_path / "a.txt", ns=(OLD_NS + 1, OLD_NS + 1))
+    with open(tmp_path / "b.txt", "ab") as f:
+        f.write(b"!")
+    os.utime(tmp_path / "b.txt", ns=(OLD_NS, OLD_NS))
+    data = (tmp_path / "c.txt").read_bytes()
+    (tmp_path / "c.new").write_bytes(data)
+    os.utime(tmp_path / "c.new", ns=(OLD_NS, OLD_NS))
+    os.replace(tmp_path / "c.new", tmp_path / "c.txt")
+    reads.clear()
+    second = dict(_scan(tmp_path, first))
+    assert reads == ["a.txt", "b.txt", "c.txt"]
+    first = dict(first)
+    assert second["a.txt"]["hash"] == first["a.txt"]["hash"]
+    assert second["b.txt"]["hash"] != first["b.txt"]["hash"]
+    assert second["c.txt"]["ino"] != first["c.txt"]["ino"]
+
+
+def test_racy_window_is_rehashed(tmp_path, reads):
+    # файл изменён за секунду до прошлого сканирования - даже с тем же stat его перечитываем
+    _tree(tmp_path)
+    first = _scan(tmp_path, scanned_ns=OLD_NS + RACY_NS // 2)
+    reads.clear()
+    _scan(tmp_path, first, scanned_ns=OLD_NS + RACY_NS // 2)
+    assert reads == ["a.txt", "b.txt", "c.txt"]
+    reads.clear()
+    _scan(tmp_path, first, scanned_ns=OLD_NS + RACY_NS)
+    assert reads == []
+
+
+def test_paranoid_ignores_cache(tmp_path, reads):
+    _tree(tmp_path)
+    first = _scan(tmp_path)
+    reads.clear()
+    list(scan_dir(str(tmp_path), str(tmp_path / "hash.json"), iter(first), OLD_NS + RACY_NS,
+                  paranoid=True))
+    assert reads == ["a.txt", "b.txt", "c.txt"]
@@ -0,0 +1,176 @@
+"""Двоичный снимок манифеста (snapshot.py): формат, поиск, подпись HMAC."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from integrity import api
+from integrity.manifest import open_manifest, path_key, read_header, write_manifest
+from integrity.snapshot import COMPRESSION, Snapshot, SnapshotFormat, write_snapshot
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEY = b"secret"
+
+RECORDS = sorted([
+    ("a.txt", {"hash": 1, "size": 1, "mtime_ns": 2, "ino": 3, "dev": 4}),
+    (os.path.join("a", "b"), {"hash": 65535, "size": 0, "mtime_ns": -5, "ino": 2 ** 63,
+                              "dev": 1}),
+    ("old", {"hash": 7}),  # версия 1 - без stat
+    ("sha", {"hash": [12, "ab" * 32], "size": 3, "mtime_ns": 1, "ino": 1, "dev": 1}),
+    ("big", {"hash": 3, "size": 9, "mtime_ns": 2, "ino": 5, "dev": 4,
+             "chunk_size": 4, "chunks": [1, 2, 0]}),
+    ("имя с пробелом", {"hash": 2, "size": 1, "mtime_ns": 2, "ino": 6, "dev": 4}),
+], key=lambda rec: path_key(rec[0]))
+
+
+def _write(tmp_path, compression="none", key=None, name="hash.json"):
+    path = str(tmp_path / name)
+    write_manifest(path, iter(RECORDS), 42, ("xor16",), {"exclude": ["*.tmp"]},
+                   SnapshotFormat(compression, key))
+    return path
+
+
+@pytest.mark.parametrize("compression", COMPRESSION)
+@pytest.mark.parametrize("key", [None, KEY])
+def test_roundtrip(tmp_path, compression, key):
+    path = _write(tmp_path, compression, key)
+    header = read_header(path)
+    assert header["format"] == "snapshot" and header["compression"] == compression
+    assert header["signed"] == (key is not None) and header["count"] == len(RECORDS)
+    assert header["scanned_ns"] == 42 and header["filters"] == {"exclude": ["*.tmp"]}
+    scanned_ns, stream = open_manifest(path, key)
+    assert scanned_ns == 42 and list(stream) == RECORDS
+    with Snapshot(path, key) as snap:
+        assert len(snap) == len(RECORDS)
+        assert [snap.record(i) for i in range(len(snap))] == RECORDS
+        for rel_path, entry in RECORDS:
+            assert snap.find(rel_path) == entry
+        assert snap.find("a") is None and snap.find("zzz") is None and snap.find("") is None
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / "empty")
+    assert write_snapshot(path, iter(()), {"scanned_ns": 1}, "lzma") == 0
+    with Snapshot(path) as snap:
+        assert list(snap) == [] and snap.find("x") is None
+
+
+def test_lookup_text_and_snapshot(tmp_path):
+    text = str(tmp_path / "text.json")
+    write_manifest(text, iter(RECORDS), 42)
+    snap = _write(tmp_path, "zlib", KEY)
+    for rel_path, entry in RECORDS:
+        assert api.lookup(text, rel_path) == entry
+        assert api.lookup(snap, rel_path, KEY) == entry
+    assert api.lookup(text, "nope") is None
+
+
+@pytest.mark.parametrize("compression", COMPRESSION)
+def test_tampering_rejected(tmp_path, compression):
+    path = _write(tmp_path, compression, KEY)
+    data = open(path, "rb").read()
+    for offset in range(0, len(data), 7):
+        broken = bytearray(data)
+        broken[offset] ^= 0x10
+        with open(path, "wb") as f:
+            f.write(broken)
+        with pytest.raises(ValueError):
+            _, stream = open_manifest(path, KEY)
+            list(stream)
+
+
+def test_key_rules(tmp_path):
+    signed = _write(tmp_path, key=KEY, name="signed")
+    unsigned = _write(tmp_path, name="unsigned")
+    text = str(tmp_path / "text")
+    write_manifest(text, iter(RECORDS), 0)
+    with pytest.raises(ValueError, match="ключ не тот"):
+        open_manifest(signed, b"other")
+    with pytest.raises(ValueError, match="нужен ключ"):
+        open_manifest(signed)
+    with pytest.raises(ValueError, match="не подписан"):
+        open_manifest(unsigned, KEY)  # подпись нельзя просто стереть
+    with pytest.raises(ValueError, match="не подписан"):
+        open_manifest(text, KEY)  # и нельзя подменить снимок на JSON
+    assert list(open_manifest(unsigned)[1]) == RECORDS
+
+
+@pytest.mark.parametrize("compression", COMPRESSION)
+def test_truncated_or_corrupt(tmp_path, compression):
+    path = _write(tmp_path, compression)
+    data = open(path, "rb").read()
+    for size in (0, 10, len(data) - 1):
+        with open(path, "wb") as f:
+            f.write(data[:size])
+        with pytest.raises(ValueError):
+            Snapshot(path).close()
+
+
+def test_failed_write_removes_tmp(tmp_path):
+    def records():
+        yield RECORDS[0]
+        raise RuntimeError("обход упал")
+
+    with pytest.raises(RuntimeError):
+        write_snapshot(str(tmp_path / "x"), records(), {}, "zlib", KEY)
+    assert os.listdir(tmp_path) == []
+
+
+def test_verify_keeps_snapshot_format(tmp_path):
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.txt").write_text("a")
+    (root / "b.txt").write_text("b")
+    api.scan(str(root), snapshot=SnapshotFormat("lzma", KEY))
+    (root / "b.txt").write_text("changed")
+    events = []
+    assert api.verify(str(root), key=KEY, on_change=lambda *args, **kw: events.append(
+        args[:2])) == 1
+    assert events == [("changed", "b.txt")]
+    header = read_header(str(root / "hash.json"))
+    assert header["compression"] == "lzma" and header["signed"]
+    with pytest.raises(ValueError):
+        api.verify(str(root))
+
+
+def test_export_roundtrip(tmp_path):
+    snap = _write(tmp_path, "zlib", KEY)
+    text = str(tmp_path / "export.json")
+    assert api.export(snap, text, KEY) == len(RECORDS)
+    assert "format" not in read_header(text)
+    assert list(open_manifest(text)[1]) == RECORDS
+    again = str(tmp_path / "again")
+    api.export(text, again, KEY, SnapshotFormat("none", KEY))
+    assert list(open_manifest(again, KEY)[1]) == RECORDS
+
+
+def test_import_is_light():
+    code = ("import sys, integrity.api; "
+            "print(sorted(m for m in ('lzma', 'mmap', 'tempfile', 'integrity.snapshot') "
+            "if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True,
+                         text=True, check=True)
+    assert out.stdout.strip() == "[]"
+
+
+def _infolaba1(args, stdin=""):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "infolaba1.py")] + args,
+                          input=stdin, capture_output=True, text=True)
+
+
+def test_infolaba1_key_errors(tmp_path):
+    out = _infolaba1(["--key-file", str(tmp_path / "missing")])
+    assert out.returncode == 2 and out.stdout.startswith("Ошибка:")
+    assert "Traceback" not in out.stderr
+    key_file = tmp_path / "key"
+    key_file.write_bytes(KEY + b"\n")
+    root = tmp_path / "tree"
+    root.mkdir()
+    (root / "a.txt").write_text("a")
+    assert _infolaba1(["--snapshot", "--key-file", str(key_file)], f"{root}\n").returncode == 0
+    out = _infolaba1([], f"{root}\n")
+    assert out.returncode == 2 and "нужен ключ" in out.stdout
+    out = _infolaba1(["--key-file", str(key_file)], f"{root}\n")
+    assert out.returncode == 0 and "изменений нет" in out.stdout
@@ -0,0 +1,195 @@
+"""Сокрытие в строках текста (laba3_*, stego/codecs.py) и в корпусе контейнеров (stego/corpus.py)."""
+
+import os
+import random
+import shutil
+
+import pytest
+
+from laba3_extract import decode_message
+from laba3_hide import encode_message
+from stego import corpus
+from stego.codecs import CODECS, Codec
+
+
+def _container(path, count, seed=1):
+    # строки с разным числом слов; у части - хвост из пробелов и табуляций,
+    # чтобы нетронутые строки у trailN и words читались не нулями
+    rnd = random.Random(seed)
+    words = ["альфа", "beta", "гамма", "delta", "эпсилон", "zeta"]
+    lines = []
+    for _ in range(count):
+        line = " ".join(rnd.choice(words) for _ in range(rnd.randrange(1, 12)))
+        if rnd.random() < 0.3:
+            line = line.replace(" ", "  ", 1) + rnd.choice([" \t", "\t\t\t\t", "  \t \t \t\t"])
+        lines.append(line)
+    path.write_text("\n".join(lines) + "\n", encoding="windows-1251")
+    return path
+
+
+def _container_lines(count):
+    rnd = random.Random(count)
+    return [" ".join("w" * rnd.randrange(1, 6) for _ in range(rnd.randrange(2, 9)))
+            for _ in range(count)]
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+@pytest.mark.parametrize("size", [0, 1, 3, 200])
+def test_message_round_trip(tmp_path, codec, size):
+    container = _container(tmp_path / "container.txt", 2000)
+    message = tmp_path / "message.bin"
+    message.write_bytes(random.Random(size).randbytes(size).replace(b"\0", b"\1"))
+    encode_message(str(container), str(message), str(tmp_path / "stego.txt"), codec)
+    decode_message(str(tmp_path / "stego.txt"), str(tmp_path / "out.bin"), codec)
+    assert (tmp_path / "out.bin").read_bytes() == message.read_bytes()
+
+
+def test_space_codec_matches_default_path(tmp_path):
+    # тот же текст должен получаться и через быстрый путь, и через кодек
+    container = _container(tmp_path / "container.txt", 300)
+    lines = container.read_text(encoding="windows-1251").splitlines()
+    lines = [line.rstrip(" \t") for line in lines]
+    data = bytes(range(1, 30))
+    expected = [line + " " if data[i // 8] >> (7 - i % 8) & 1 else line
+                for i, line in enumerate(lines[:len(data) * 8])]
+    assert list(CODECS["space"].encode_lines(lines, [data[:5], data[5:]])) == expected
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_codec_bytes_round_trip(codec):
+    codec = CODECS[codec]
+    lines = _container_lines(1000)
+    data = random.Random(3).randbytes(97)
+    encoded = list(codec.encode_lines(lines, [data[:10], data[10:]]))
+    assert b"".join(codec.iter_bytes(encoded, block_size=7))[:len(data)] == data
+    if codec.bits_per_line:
+        assert len(encoded) == len(data) * 8 // codec.bits_per_line
+
+
+@pytest.mark.parametrize("codec", sorted(CODECS))
+def test_too_small_container(codec):
+    with pytest.raises(ValueError):
+        list(CODECS[codec].encode_lines(["a b"] * 3, [b"0123456789"]))
+
+
+def test_codec_is_abstract():
+    with pytest.raises(TypeError):
+        Codec()
+
+
+@pytest.mark.parametrize("codec", ["space", "trail4", "words"])
+def test_corpus_round_trip(tmp_path, codec):
+    root = tmp_path / "corpus"
+    root.mkdir()
+    for i in range(4):
+        _container(root / f"c{i}.txt", 600, seed=i)
+    message = tmp_path / "message.bin"
+    message.write_bytes(random.Random(5).randbytes(150))
+    out_dir = tmp_path / "out"
+    corpus.hide(str(root), str(message), str(out_dir), codec=codec)
+    assert corpus.extract(str(out_dir), str(tmp_path / "got.bin"), codec=codec) == 150
+    assert (tmp_path / "got.bin").read_bytes() == message.read_bytes()
+
+
+def test_plan_empty_message():
+    assert corpus.plan({}, 0) == []
+    assert corpus.plan({"a.txt": 8}, 0) == []
+    bits = (corpus.HEADER.size + 10) * 8
+    assert corpus.plan({"a.txt": bits}, 0) == [("a.txt", 0, 0)]
+    with pytest.raises(ValueError):
+        corpus.plan({"a.txt": bits}, 11)
+
+
+def test_index_skips_unreadable_files(tmp_path, capsys):
+    _container(tmp_path / "ok.txt", 10)
+    (tmp_path / "gone.txt").symlink_to(tmp_path / "missing.txt")
+    files = corpus.build_index(str(tmp_path))
+    assert list(files) == ["ok.txt"]
+    assert files["ok.txt"][2] == 10
+    assert "gone.txt" in capsys.readouterr().err
+
+
+def _corpus(root, sizes):
+    root.mkdir()
+    for i, count in enumerate(sizes):
+        _container(root / f"c{i}.txt", count, seed=i)
+    return root
+
+
+def test_index_reuses_unchanged_files(tmp_path, monkeypatch):
+    root = _corpus(tmp_path / "corpus", [50, 60, 70])
+    (root / "sub").mkdir()
+    _container(root / "sub" / "d.txt", 80, seed=9)
+    counted = []
+    count_lines = corpus.count_lines
+
+    def counting(path):
+        counted.append(os.path.relpath(path, root))
+        return count_lines(path)
+
+    monkeypatch.setattr(corpus, "count_lines", counting)
+    files = corpus.build_index(str(root))
+    assert sorted(counted) == sorted(files) == ["c0.txt", "c1.txt", "c2.txt",
+                                                os.path.join("sub", "d.txt")]
+    assert [files[rel][2] for rel in sorted(files)] == [50, 60, 70, 80]
+    assert os.path.exists(root / corpus.INDEX_NAME)
+
+    # ничего не менялось - ни одного файла не читаем, индекс тот же
+    counted.clear()
+    assert corpus.build_index(str(root)) == files
+    assert counted == []
+
+    # изменился один файл, один удалён - пересчитан только изменённый
+    _container(root / "c1.txt", 65, seed=1)
+    os.remove(root / "c2.txt")
+    again = corpus.build_index(str(root))
+    assert counted == ["c1.txt"]
+    assert again["c1.txt"][2] == 65 and "c2.txt" not in again
+    assert again["c0.txt"] == files["c0.txt"]
+    assert corpus.load_index(str(root)) == again
+
+
+def test_plan_short_and_exact():
+    bits = {"a.txt": (corpus.HEADER.size + 10) * 8,
+            "b.txt": (corpus.HEADER.size + 30) * 8,
+            "c.txt": (corpus.HEADER.size + 20) * 8,
+            "tiny.txt": corpus.HEADER.size * 8}
+    with pytest.raises(ValueError):
+        corpus.plan(bits, 61)
+    # ровно по ёмкости: заняты все контейнеры, каждый целиком, крохотный - нет
+    parts = corpus.plan(bits, 60)
+    assert sorted(parts) == [("a.txt", 50, 10), ("b.txt", 0, 30), ("c.txt", 30, 20)]
+    # остаток влезает в наименьший подходящий контейнер
+    assert corpus.plan(bits, 15) == [("c.txt", 0, 15)]
+    assert corpus.plan(bits, 10) == [("a.txt", 0, 10)]
+    assert corpus.plan(bits, 45) == [("b.txt", 0, 30), ("c.txt", 30, 15)]
+
+
+@pytest.mark.parametrize("codec", ["trail4", "words"])
+def test_corpus_shuffled_with_foreign_file(tmp_path, codec):
+    root = _corpus(tmp_path / "corpus", [120, 200, 150, 90, 170])
+    bits = corpus.container_bits(str(root), corpus.build_index(str(root)), codec)
+    caps = sorted(corpus.capacity(n) for n in bits.values())
+    # сообщение больше любого контейнера, но меньше всего корпуса
+    size = caps[-1] + caps[-2] // 2
+    message = tmp_path / "message.bin"
+    message.write_bytes(random.Random(7).randbytes(size))
+    outputs = corpus.hide(str(root), str(message), str(tmp_path / "out"), codec=codec)
+    assert len(outputs) > 1
+
+    # файлы под другими именами и в другом порядке, рядом - чужие
+    mixed = tmp_path / "mixed"
+    (mixed / "deep").mkdir(parents=True)
+    names = [f"z{i}.txt" for i in range(len(outputs))]
+    random.Random(3).shuffle(names)
+    for i, (path, name) in enumerate(zip(outputs, names)):
+        shutil.copy(path, mixed / ("deep" if i % 2 else "") / name)
+    shutil.copy(root / "c0.txt", mixed / "a_foreign.txt")
+    (mixed / "b_binary.bin").write_bytes(random.Random(8).randbytes(3000))
+    assert corpus.extract(str(mixed), str(tmp_path / "got.bin"), codec=codec) == size
+    assert (tmp_path / "got.bin").read_bytes() == message.read_bytes()
+
+    # без одной части сообщение не собирается
+    os.remove(mixed / "deep" / names[1])
+    with pytest.raises(ValueError):
+        corpus.extract(str(mixed), str(tmp_path / "got.bin"), codec=codec)
@@ -0,0 +1,232 @@
+"""Режим наблюдения (integrity/watch.py): события inotify, переполнение очереди, пачки событий."""
+
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from integrity import api, watch
+from integrity.watch import (IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_IGNORED, IN_ISDIR,
+                             IN_MODIFY, IN_MOVED_FROM, IN_MOVED_TO, IN_Q_OVERFLOW, Watcher)
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"),
+                                reason="режим наблюдения только для Linux (inotify)")
+
+
+def _tree(root):
+    (root / "sub").mkdir()
+    (root / "a.txt").write_bytes(bytes(range(1, 60)))
+    (root / "sub" / "b.txt").write_bytes(bytes(range(60, 140)))
+
+
+@pytest.fixture
+def watcher(tmp_path, capsys):
+    _tree(tmp_path)
+    w = Watcher(str(tmp_path), str(tmp_path / "hash.json"))
+    w.load()
+    capsys.readouterr()
+    yield w
+    w.inotify.close()
+
+
+def _wd(w, rel_path="."):
+    path = os.path.normpath(os.path.join(w.root, rel_path))
+    return next(wd for wd, directory in w.dirs.items() if os.path.normpath(directory) == path)
+
+
+def _events(capsys):
+    out = capsys.readouterr().out
+    return sorted((rec["event"], rec["path"]) for rec in map(json.loads, out.splitlines()))
+
+
+def test_load_emits_changes_since_manifest(tmp_path, capsys):
+    _tree(tmp_path)
+    api.scan(str(tmp_path))
+    (tmp_path / "a.txt").write_bytes(b"changed while not watching")
+    (tmp_path / "new.txt").write_bytes(b"new")
+    os.remove(tmp_path / "sub" / "b.txt")
+    w = Watcher(str(tmp_path), str(tmp_path / "hash.json"))
+    try:
+        w.load()
+    finally:
+        w.inotify.close()
+    assert _events(capsys) == [("added", "new.txt"), ("changed", "a.txt"),
+                               ("deleted", os.path.join("sub", "b.txt"))]
+    assert sorted(w.dirs.values()) == [str(tmp_path), str(tmp_path / "sub")]
+
+
+def test_create_modify_delete(watcher, capsys):
+    root = watcher.root
+    with open(os.path.join(root, "c.txt"), "wb") as f:
+        f.write(b"created")
+    watcher.handle(_wd(watcher), IN_CREATE, "c.txt")
+    watcher.handle(_wd(watcher), IN_CLOSE_WRITE, "c.txt")
+    with open(os.path.join(root, "a.txt"), "ab") as f:
+        f.write(b"more")
+    watcher.handle(_wd(watcher), IN_MODIFY, "a.txt")
+    os.remove(os.path.join(root, "sub", "b.txt"))
+    watcher.handle(_wd(watcher, "sub"), IN_DELETE, "b.txt")
+    assert watcher.touched == {"c.txt", "a.txt", os.path.join("sub", "b.txt")}
+    watcher.process()
+    assert _events(capsys) == [("added", "c.txt"), ("changed", "a.txt"),
+                               ("deleted", os.path.join("sub", "b.txt"))]
+    assert watcher.touched == set()
+    assert sorted(watcher.entries) == ["a.txt", "c.txt"]
+
+    # манифест после сброса совпадает с диском
+    watcher.flush()
+    events = []
+    api.verify(root, on_change=lambda kind, path, *args, **kwargs: events.append(path))
+    assert events == []
+
+
+def test_touch_without_change_is_silent(watcher, capsys):
+    watcher.handle(_wd(watcher), IN_CLOSE_WRITE, "a.txt")
+    watcher.handle(_wd(watcher), IN_DELETE, "never-existed.txt")
+    watcher.process()
+    assert _events(capsys) == []
+
+
+def test_rename_directory(watcher, capsys):
+    root = watcher.root
+    os.rename(os.path.join(root, "sub"), os.path.join(root, "moved"))
+    watcher.handle(_wd(watcher), IN_MOVED_FROM | IN_ISDIR, "sub")
+    watcher.handle(_wd(watcher), IN_MOVED_TO | IN_ISDIR, "moved")
+    watcher.process()
+    assert _events(capsys) == [("added", os.path.join("moved", "b.txt")),
+                               ("deleted", os.path.join("sub", "b.txt"))]
+    # на новый каталог поставлено наблюдение
+    assert os.path.join(root, "moved") in watcher.dirs.values()
+
+
+def test_new_directory_with_files(watcher, capsys):
+    root = watcher.root
+    os.makedirs(os.path.join(root, "new", "deep"))
+    with open(os.path.join(root, "new", "deep", "d.txt"), "wb") as f:
+        f.write(b"deep")
+    watcher.handle(_wd(watcher), IN_CREATE | IN_ISDIR, "new")
+    watcher.process()
+    assert _events(capsys) == [("added", os.path.join("new", "deep", "d.txt"))]
+    assert os.path.join(root, "new", "deep") in watcher.dirs.values()
+
+
+def test_queue_overflow_rechecks_everything(watcher, capsys):
+    root = watcher.root
+    with open(os.path.join(root, "a.txt"), "wb") as f:
+        f.write(b"rewritten")
+    os.remove(os.path.join(root, "sub", "b.txt"))
+    os.makedirs(os.path.join(root, "late"))
+    with open(os.path.join(root, "late", "e.txt"), "wb") as f:
+        f.write(b"late")
+    watcher.handle(-1, IN_Q_OVERFLOW, "")
+    watcher.process()
+    assert _events(capsys) == [("added", os.path.join("late", "e.txt")), ("changed", "a.txt"),
+                               ("deleted", os.path.join("sub", "b.txt"))]
+
+
+def test_manifest_and_removed_watches_ignored(watcher, capsys):
+    watcher.handle(_wd(watcher), IN_CLOSE_WRITE, "hash.json")
+    watcher.handle(_wd(watcher), IN_CLOSE_WRITE, "hash.json.tmp")
+    assert watcher.touched == set()
+    wd = _wd(watcher, "sub")
+    watcher.handle(wd, IN_IGNORED, "")
+    assert wd not in watcher.dirs
+    watcher.handle(wd, IN_CREATE, "x.txt")  # событие от снятого наблюдения
+    assert watcher.touched == set()
+
+
+class _Clock:
+    # шаги в тестах - двоичные дроби, чтобы время складывалось без погрешности
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class _ScriptedInotify:
+    """События по сценарию: [(через сколько секунд, [(wd, маска, имя)])]."""
+
+    def __init__(self, clock, script):
+        self.clock = clock
+        self.script = list(script)
+        self.timeouts = []
+        self.watches = 0
+
+    def add_watch(self, path, mask=None):
+        self.watches += 1
+        return self.watches  # корень обходится первым - у него 1
+
+    def read(self, timeout):
+        self.timeouts.append(timeout)
+        if not self.script:
+            raise KeyboardInterrupt
+        delay, events = self.script.pop(0)
+        self.clock.now += delay
+        return events() if callable(events) else events
+
+    def close(self):
+        pass
+
+
+def _run(tmp_path, monkeypatch, script):
+    clock = _Clock()
+    monkeypatch.setattr(watch, "time", SimpleNamespace(monotonic=clock, time=time.time,
+                                                       time_ns=time.time_ns))
+    monkeypatch.setattr(watch, "DEBOUNCE", 0.125)
+    monkeypatch.setattr(watch, "MAX_DELAY", 0.5)
+    monkeypatch.setattr(watch, "FLUSH_INTERVAL", 10)
+    _tree(tmp_path)
+    w = Watcher(str(tmp_path), str(tmp_path / "hash.json"))
+    w.inotify.close()
+    w.inotify = _ScriptedInotify(clock, script)
+    processed = []
+    process = w.process
+
+    def recording():
+        processed.append((clock.now - 100.0, sorted(w.touched)))
+        process()
+
+    w.process = recording
+    w.run()
+    return w, processed
+
+
+def test_burst_processed_once_after_pause(tmp_path, monkeypatch):
+    write = (1, IN_MODIFY, "a.txt")
+    w, processed = _run(tmp_path, monkeypatch, [
+        (1.0, [write]), (0.03125, [write]), (0.03125, [write, (1, IN_CLOSE_WRITE, "a.txt")]),
+        (0.125, []),
+    ])
+    assert processed == [(1.1875, ["a.txt"])]
+    # в покое ждём без таймаута, после события - паузу DEBOUNCE
+    assert w.inotify.timeouts[:4] == [None, 0.125, 0.125, 0.125]
+
+
+def test_continuous_events_processed_after_max_delay(tmp_path, monkeypatch):
+    # события без пауз: пачка всё равно обрабатывается через MAX_DELAY после первого,
+    # остаток - при выходе
+    script = [(0.0625, [(1, IN_MODIFY, "a.txt")]) for _ in range(20)]
+    w, processed = _run(tmp_path, monkeypatch, script)
+    assert [t for t, _ in processed] == [0.5625, 1.125, 1.25]
+    # таймаут не выходит за MAX_DELAY с первого события, после обработки - до сброса манифеста
+    assert w.inotify.timeouts[:10] == [None] + [0.125] * 7 + [0.0625, 10 - 0.5625]
+
+
+def test_flush_waits_for_interval(tmp_path, monkeypatch):
+    def change():
+        (tmp_path / "a.txt").write_bytes(b"changed")
+        return [(1, IN_MODIFY, "a.txt")]
+
+    w, processed = _run(tmp_path, monkeypatch, [(1.0, change), (0.125, [])])
+    assert processed == [(1.125, ["a.txt"])]
+    # изменение в памяти: следующее ожидание - до сброса манифеста
+    assert w.inotify.timeouts[-1] == 10 - 1.125
+    # при выходе манифест сброшен
+    assert not w.dirty
+    events = []
+    api.verify(str(tmp_path), on_change=lambda kind, path, *args, **kwargs: events.append(path))
+    assert events == []
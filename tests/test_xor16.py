@@ -0,0 +1,92 @@
+import io
+import random
+from functools import reduce
+
+import pytest
+
+import xor16
+
+LENGTHS = [0, 1, 2, 3, 4, 5, 7, 8, 31, 32, 33, 1000, 4097, 65536, 65537]
+
+
+def reference(data) -> int:
+    # как в лабораторной: по два байта, непарный байт дополняется нулём
+    h = 0
+    for i in range(0, len(data), 2):
+        h ^= data[i] << 8 | (data[i + 1] if i + 1 < len(data) else 0)
+    return h
+
+
+def _data(length, seed=0):
+    return random.Random(length * 31 + seed).randbytes(length)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_fold_int_matches_reference(length):
+    data = _data(length & ~1)
+    assert xor16._fold_int(data) == reference(data)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_fold_numpy_matches_fold_int(length):
+    pytest.importorskip("numpy")
+    data = _data(length & ~1)
+    assert xor16._fold_numpy(data) == xor16._fold_int(data)
+
+
+@pytest.mark.parametrize("length", LENGTHS)
+def test_bytes_matches_reference(length):
+    data = _data(length)
+    assert xor16.xor16_bytes(data) == reference(data)
+    assert xor16.xor16_bytes(bytearray(data)) == reference(data)
+    assert xor16.xor16_bytes(memoryview(data)) == reference(data)
+
+
+def test_incremental_odd_pieces():
+    data = _data(10001)
+    rnd = random.Random(1)
+    h = xor16.Xor16()
+    pos = 0
+    while pos < len(data):
+        step = rnd.randrange(0, 40)
+        h.update(data[pos:pos + step])
+        pos += step
+    assert h.value() == reference(data)
+
+
+class _ShortReads(io.RawIOBase):
+    # отдаёт не больше 7 байт за раз - нечётные короткие чтения
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        return self._data.read(min(size, 7) if size >= 0 else 7)
+
+
+def test_stream_with_short_reads_and_limit():
+    data = _data(3001)
+    assert xor16.xor16_stream(_ShortReads(data), block_size=64) == reference(data)
+    assert xor16.xor16_stream(_ShortReads(data), block_size=64, limit=1001) == reference(data[:1001])
+
+
+@pytest.mark.parametrize("block_size", [2, 6, 1 << 12, xor16.BLOCK_SIZE])
+def test_file_matches_bytes(tmp_path, block_size):
+    data = _data(100003)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    assert xor16.xor16_file(str(path), block_size) == reference(data)
+
+
+def test_ranges_and_chunks_combine_to_file(tmp_path):
+    data = _data(50001)
+    path = tmp_path / "data.bin"
+    path.write_bytes(data)
+    ranges = [xor16.xor16_file_range(str(path), offset, 4096)
+              for offset in range(0, len(data), 4096)]
+    assert reduce(int.__xor__, ranges) == reference(data)
+    assert reduce(int.__xor__, xor16.xor16_file_chunks(str(path), 4096)) == reference(data)
+    with pytest.raises(ValueError):
+        xor16.xor16_file_range(str(path), 1, 10)
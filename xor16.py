@@ -0,0 +1,144 @@
+"""
+Общий движок XOR16-хэша.
+
+Алгоритм тот же, что и в лабораторных: поток байт разбивается на 16-битные
+слова (big-endian: первый байт = старший), если в конце остаётся один байт —
+дополняем его нулём, затем XOR всех слов. Результат — целое 0..65535.
+
+Раньше файл читался по одному байту (два вызова read на слово), теперь
+читаем крупными блоками и сворачиваем каждый блок целиком: через NumPy,
+если он установлен, иначе через int.from_bytes (свёртка делается внутри C).
+"""
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен
+    np = None
+
+BLOCK_SIZE = 1 << 20  # 1 МиБ, обязательно чётный
+
+
+def _fold_int(data) -> int:
+    """XOR всех big-endian слов блока чётной длины через длинную арифметику."""
+    words = len(data) // 2
+    if words == 0:
+        return 0
+    n = int.from_bytes(data, "big")
+    h = 0
+    # складываем число пополам, пока не останется одно слово
+    while words > 1:
+        if words & 1:
+            h ^= n & 0xFFFF
+            n >>= 16
+            words -= 1
+        half_bits = (words // 2) * 16
+        n = (n >> half_bits) ^ (n & ((1 << half_bits) - 1))
+        words //= 2
+    return (h ^ n) & 0xFFFF
+
+
+def _fold_numpy(data) -> int:
+    """XOR всех big-endian слов блока чётной длины через NumPy."""
+    if not data:
+        return 0
+    arr = np.frombuffer(data, dtype=">u2")
+    return int(np.bitwise_xor.reduce(arr))
+
+
+_fold = _fold_numpy if np is not None else _fold_int
+
+
+def xor16_bytes(data) -> int:
+    """XOR16-хэш от байтовой строки (bytes, bytearray или memoryview)."""
+    data = memoryview(data).cast("B")
+    h = _fold(data[: len(data) & ~1])
+    if len(data) & 1:
+        h ^= data[-1] << 8  # дополняем нулём
+    return h & 0xFFFF
+
+
+class Xor16:
+    """Накопительный XOR16: update() можно вызывать с кусками любой длины.
+
+    Непарный байт переносится в начало следующего куска, поэтому результат
+    совпадает с побайтовым чтением всего потока.
+    """
+
+    def __init__(self):
+        self._h = 0
+        self._carry = None  # непарный байт с прошлого куска
+
+    def update(self, data):
+        data = memoryview(data).cast("B")
+        if not data:
+            return
+        if self._carry is not None:
+            self._h ^= (self._carry << 8) | data[0]
+            data = data[1:]
+            self._carry = None
+        if len(data) & 1:
+            self._carry = data[-1]
+            data = data[:-1]
+        self._h ^= _fold(data)
+
+    def value(self) -> int:
+        h = self._h
+        if self._carry is not None:
+            h ^= self._carry << 8  # дополняем нулём
+        return h & 0xFFFF
+
+
+def xor16_stream(f, block_size: int = BLOCK_SIZE, limit: int = -1) -> int:
+    """XOR16-хэш от бинарного потока.
+
+    Читает блоками по block_size байт (не более limit байт, если limit >= 0).
+    Короткие чтения нечётной длины допустимы (см. Xor16).
+    """
+    h = Xor16()
+    while limit != 0:
+        size = block_size if limit < 0 else min(block_size, limit)
+        chunk = f.read(size)
+        if not chunk:
+            break
+        if limit > 0:
+            limit -= len(chunk)
+        h.update(chunk)
+    return h.value()
+
+
+def xor16_file(path, block_size: int = BLOCK_SIZE) -> int:
+    """XOR16-хэш содержимого файла."""
+    with open(path, "rb", buffering=0) as f:
+        return xor16_stream(f, block_size)
+
+
+def xor16_file_range(path, offset: int, length: int, block_size: int = BLOCK_SIZE) -> int:
+    """XOR16-хэш куска файла [offset, offset + length).
+
+    offset должен быть чётным, тогда слова куска совпадают со словами всего
+    файла, и XOR хэшей всех кусков равен хэшу файла (XOR ассоциативен).
+    """
+    if offset & 1:
+        raise ValueError("смещение куска должно быть чётным")
+    with open(path, "rb", buffering=0) as f:
+        f.seek(offset)
+        return xor16_stream(f, block_size, length)
+
+
+def xor16_file_chunks(path, chunk_size: int, offset: int = 0) -> list:
+    """XOR16-хэши кусков файла по chunk_size байт, начиная с offset.
+
+    chunk_size и offset должны быть чётными; XOR всех хэшей равен хэшу куска
+    файла от offset до конца.
+    """
+    if chunk_size & 1 or offset & 1:
+        raise ValueError("размер и начало кусков должны быть чётными")
+    hashes = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            hashes.append(xor16_bytes(chunk))
+    return hashes